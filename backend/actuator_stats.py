@@ -0,0 +1,313 @@
+"""
+CalZero 액추에이터 캘리브레이션 통계 (누적 집계)
+
+CalibrationStats.jsx가 매번 전체 레코드를 돌며 계산하던 관절별 mean/std/min/max를
+레코드 생성/삭제 때 Welford 방식으로 갱신해 두고, 조회 때는 저장된 집계만 읽는다.
+
+- 범위: fleet (전체), type:<장치 종류>, device:<id>
+- 항목: 관절별 homing_offset, range_min, range_max (숫자가 아닌 값은 건너뜀)
+- 파일: data/.stats/actuator.json (갱신은 잠금 후 원자적으로 교체, 읽기는 잠금 없음)
+- 삭제로 최솟값/최댓값이 빠지면 min/max를 알 수 없으므로 stale로 표시하고 다음 조회 때 다시 계산한다
+- 집계할 때의 저장소 버전(version_source: 장치별 actuator 파일 태그와 장치 목록 태그)을 같이 저장해 두고,
+  조회 시 버전이 다르면 (복원, 초기화, 다른 경로의 쓰기, 파일 직접 수정 등) 전체를 다시 계산한다
+- API 밖에서 장치만 추가되어도 버전이 바뀌므로 다음 조회 때 한 번 다시 계산한다
+- 레코드 저장과 집계 갱신은 같은 잠금 안에서 하므로 다른 워커가 중간 상태를 보고 다시 계산하지 않는다
+"""
+
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+from storage import LockRegistry, atomic_write_json
+
+STATS_SCHEMA = 1
+STATS_METRICS = ("homing_offset", "range_min", "range_max")
+# 응답의 관절 순서 (그 밖의 관절은 뒤에 이름순)
+JOINTS = ("shoulder_pan", "shoulder_lift", "elbow_flex", "wrist_flex", "wrist_roll", "gripper")
+
+# STS3215: 한 바퀴 4096 step, 팔 끝 오차는 330 mm 기준 (CalibrationStats.jsx와 같음)
+TICKS_PER_REV = 4096
+ARM_LENGTH_MM = 330
+
+
+# ==================== Welford ====================
+
+def empty_aggregate():
+    return {"n": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None, "stale": False}
+
+
+def aggregate_add(agg, x):
+    agg["n"] += 1
+    delta = x - agg["mean"]
+    agg["mean"] += delta / agg["n"]
+    agg["m2"] += delta * (x - agg["mean"])
+    if not agg["stale"]:
+        agg["min"] = x if agg["min"] is None else min(agg["min"], x)
+        agg["max"] = x if agg["max"] is None else max(agg["max"], x)
+
+
+def aggregate_remove(agg, x):
+    """add의 역연산 (x가 min/max였으면 stale)"""
+    if agg["n"] <= 1:
+        agg.update(empty_aggregate())
+        return
+    n = agg["n"] - 1
+    mean = (agg["n"] * agg["mean"] - x) / n
+    agg["m2"] = max(agg["m2"] - (x - mean) * (x - agg["mean"]), 0.0)
+    agg["n"], agg["mean"] = n, mean
+    if x <= agg["min"] or x >= agg["max"]:
+        agg["stale"] = True
+
+
+def aggregate_combine(agg, other, sign=1):
+    """두 집계를 합친다 (sign=-1이면 other를 뺀다, 이때 min/max는 stale)"""
+    if not other["n"]:
+        return
+    n = agg["n"] + sign * other["n"]
+    if n <= 0:
+        agg.update(empty_aggregate())
+        return
+    if sign > 0:
+        delta = other["mean"] - agg["mean"]
+        agg["mean"] += delta * other["n"] / n
+        agg["m2"] += other["m2"] + delta * delta * agg["n"] * other["n"] / n
+        agg["stale"] = agg["stale"] or other["stale"]
+        if not agg["stale"]:
+            agg["min"] = other["min"] if agg["min"] is None else min(agg["min"], other["min"])
+            agg["max"] = other["max"] if agg["max"] is None else max(agg["max"], other["max"])
+    else:
+        mean = (agg["n"] * agg["mean"] - other["n"] * other["mean"]) / n
+        delta = other["mean"] - mean
+        agg["m2"] = max(agg["m2"] - other["m2"] - delta * delta * n * other["n"] / agg["n"], 0.0)
+        agg["mean"] = mean
+        agg["stale"] = True
+    agg["n"] = n
+
+
+def _numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+# ==================== 집계 저장소 ====================
+
+FLEET_SCOPE = "fleet"
+
+
+def device_scope(device_id):
+    return f"device:{device_id}"
+
+
+def type_scope(device_type):
+    return f"type:{device_type}"
+
+
+def scope_key(scope, value=None):
+    """API의 scope (fleet | type | device) -> 집계 키"""
+    if scope == "device":
+        return device_scope(value)
+    if scope == "type":
+        return type_scope(value)
+    return FLEET_SCOPE
+
+
+class ActuatorStats:
+    """범위별 관절 집계
+
+    rebuild_source() -> [(device_id, device_type, calibration_data), ...] 는 전체를 다시 계산할 때만 쓴다.
+    """
+
+    def __init__(self, data_dir, rebuild_source, version_source):
+        self.path = os.path.join(data_dir, ".stats", "actuator.json")
+        self._locks = LockRegistry(os.path.join(data_dir, ".locks"), data_dir)
+        self._rebuild_source = rebuild_source
+        self._version_source = version_source
+        self._cache = None
+        self._cache_sig = None
+        self._guard = threading.Lock()
+
+    def lock(self):
+        """집계 파일 잠금"""
+        return self._locks(self.path)
+
+    # ---------- 파일 ----------
+
+    def _load(self):
+        """저장된 집계 (파일이 바뀌었을 때만 다시 파싱)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._guard:
+            if self._cache_sig == sig:
+                return self._cache
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None  # 다시 계산
+        if data.get("schema") != STATS_SCHEMA:
+            return None
+        with self._guard:
+            self._cache, self._cache_sig = data, sig
+        return data
+
+    def _save(self, data):
+        data["version"] = self._version_source()
+        atomic_write_json(self.path, data)
+
+    def _empty(self):
+        return {"schema": STATS_SCHEMA, "version": None, "device_types": {}, "scopes": {}}
+
+    def _current(self):
+        """갱신용 복사본 (호출자가 잠금 보유, 없거나 저장소 버전과 어긋나 있으면 새로 계산)"""
+        data = self._load()
+        if data is None or data.get("version") != self._version_source():
+            return self._build()
+        return json.loads(json.dumps(data))
+
+    def _build(self):
+        data = self._empty()
+        for device_id, device_type, calibration_data in self._rebuild_source():
+            self._apply(data, device_id, device_type, calibration_data, aggregate_add)
+        return data
+
+    # ---------- 갱신 ----------
+
+    @staticmethod
+    def _scope(data, key):
+        return data["scopes"].setdefault(key, {"records": 0, "joints": {}})
+
+    def _apply(self, data, device_id, device_type, calibration_data, op):
+        """레코드 하나를 세 범위 집계에 더하거나 뺀다"""
+        sign = 1 if op is aggregate_add else -1
+        device_type = data["device_types"].setdefault(str(device_id), device_type)
+        for key in (FLEET_SCOPE, type_scope(device_type), device_scope(device_id)):
+            scope = self._scope(data, key)
+            scope["records"] = max(scope["records"] + sign, 0)
+            for joint, values in (calibration_data or {}).items():
+                if not isinstance(values, dict):
+                    continue
+                metrics = scope["joints"].setdefault(joint, {})
+                for metric in STATS_METRICS:
+                    if _numeric(values.get(metric)):
+                        op(metrics.setdefault(metric, empty_aggregate()), values[metric])
+
+    def _shift(self, data, key, device, sign):
+        """장치 집계 전체를 key 범위에 더하거나 뺀다"""
+        scope = self._scope(data, key)
+        scope["records"] = max(scope["records"] + sign * device["records"], 0)
+        for joint, metrics in device["joints"].items():
+            for metric, agg in metrics.items():
+                target = scope["joints"].setdefault(joint, {}).setdefault(metric, empty_aggregate())
+                aggregate_combine(target, agg, sign)
+
+    def _move_device(self, data, device_id, new_type):
+        """장치 집계를 이전 종류 범위에서 새 종류 범위로 옮긴다"""
+        old_type = data["device_types"].get(str(device_id))
+        device = data["scopes"].get(device_scope(device_id))
+        if old_type is not None and old_type != new_type and device:
+            self._shift(data, type_scope(old_type), device, -1)
+            self._shift(data, type_scope(new_type), device, 1)
+        data["device_types"][str(device_id)] = new_type
+
+    @contextmanager
+    def updating(self):
+        """레코드 쓰기 + 집계 갱신을 한 잠금 안에서 (쓰기 전 집계를 넘겨주고, 예외 없이 끝나면 저장)
+
+            with actuator_stats.updating() as stats:
+                created = storage.insert(...)
+                actuator_stats.add(stats, device_id, device_type, created['calibration_data'])
+        """
+        with self.lock():
+            data = self._current()
+            yield data
+            self._save(data)
+
+    def add(self, data, device_id, device_type, calibration_data):
+        """레코드 생성 반영"""
+        self._move_device(data, device_id, device_type)
+        self._apply(data, device_id, device_type, calibration_data, aggregate_add)
+
+    def remove(self, data, device_id, calibration_data):
+        """레코드 삭제 반영"""
+        device_type = data["device_types"].get(str(device_id), "unknown")
+        self._apply(data, device_id, device_type, calibration_data, aggregate_remove)
+
+    def set_device_type(self, data, device_id, device_type):
+        """장치 종류 변경 반영 (캘리브레이션이 없는 장치는 기록하지 않음)"""
+        if str(device_id) in data["device_types"]:
+            self._move_device(data, device_id, device_type)
+
+    def drop_device(self, data, device_id):
+        """장치 삭제 반영 - 장치 집계를 fleet / 종류 범위에서 뺀다"""
+        device_type = data["device_types"].pop(str(device_id), None)
+        device = data["scopes"].pop(device_scope(device_id), None)
+        if device:
+            self._shift(data, FLEET_SCOPE, device, -1)
+            self._shift(data, type_scope(device_type), device, -1)
+
+    def invalidate(self):
+        """다음 조회 때 전체를 다시 계산 (초기화 / 복원 후)"""
+        with self.lock():
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    # ---------- 조회 ----------
+
+    def scope(self, key):
+        """범위 집계 (없으면 빈 집계). 어긋났거나 stale이 있으면 한 번 다시 계산"""
+        data = self._load()
+        if data is None or data.get("version") != self._version_source() or self._has_stale(data, key):
+            with self.lock():
+                data = self._load()
+                if data is None or data.get("version") != self._version_source() or self._has_stale(data, key):
+                    data = self._build()
+                    self._save(data)
+        return data["scopes"].get(key, {"records": 0, "joints": {}})
+
+    def scopes(self, prefix):
+        """prefix로 시작하는 범위 이름 목록 (예: "type:")"""
+        data = self._load() or {"scopes": {}}
+        return sorted(key for key in data["scopes"] if key.startswith(prefix))
+
+    @staticmethod
+    def _has_stale(data, key):
+        scope = data["scopes"].get(key)
+        return bool(scope) and any(
+            agg["stale"] for metrics in scope["joints"].values() for agg in metrics.values()
+        )
+
+
+def summarize_scope(scope):
+    """집계 -> 관절별 응답 (CalibrationStats.jsx와 같은 모집단 표준편차, 각도 / 330 mm 팔 끝 오차 포함)"""
+    names = scope["joints"]
+    ordered = [j for j in JOINTS if j in names] + sorted(j for j in names if j not in JOINTS)
+    result = []
+    for joint in ordered:
+        metrics = names[joint]
+        entry = {"joint": joint}
+        for metric in STATS_METRICS:
+            agg = metrics.get(metric)
+            if not agg or not agg["n"]:
+                entry[metric] = None
+                continue
+            std = math.sqrt(agg["m2"] / agg["n"])
+            entry[metric] = {
+                "count": agg["n"],
+                "mean": agg["mean"],
+                "std": std,
+                "min": agg["min"],
+                "max": agg["max"],
+                "range": agg["max"] - agg["min"],
+                "std_deg": std * 360 / TICKS_PER_REV,
+                "range_deg": (agg["max"] - agg["min"]) * 360 / TICKS_PER_REV,
+            }
+        homing = entry["homing_offset"]
+        entry["error_330mm"] = (ARM_LENGTH_MM * math.radians(homing["std_deg"])) if homing else None
+        result.append(entry)
+    return result
@@ -0,0 +1,471 @@
+"""
+CalZero 데이터셋 관절 범위 분석
+
+LeRobot 데이터셋(parquet)의 action / observation.state 값을 액추에이터 캘리브레이션의
+range_min / range_max 기준으로 히스토그램화하고 위험/경고 구간 빈도를 센다.
+결과 형식은 frontend DataAnalysis.jsx 의 histogramData 와 같다.
+
+- parquet는 배치 단위로 읽으므로 메모리 사용량은 파일 크기(에피소드 수)와 무관하다
+- 샤드가 여러 개인 데이터셋은 프로세스 풀에서 샤드별 부분 결과를 만든 뒤 merge로 합친다
+- 값은 관절별 -100..100 정규화 값이고, raw 값 = (n + 100) / 200 * (range_max - range_min) + range_min
+- raw 구간은 캘리브레이션 범위를 bins개로 나눈 것이라 정규화 구간과 같은 칸에 들어간다
+- 그래서 누적은 캘리브레이션과 무관한 정규화 값의 고해상도(FINE_BINS) 히스토그램으로 하고,
+  요청한 bins / 캘리브레이션에 맞는 결과는 result()에서 칸을 묶어 만든다
+  (bins가 FINE_BINS의 약수면 직접 센 것과 같고, 아니면 0.1 단위로 근사.
+   에피소드별 구간 빈도는 구간 경계가 정규화 값 정수에 걸리면 정확하고, 아니면 1 단위로 근사)
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from workers import pool_size
+
+JOINTS = ("shoulder_pan", "shoulder_lift", "elbow_flex", "wrist_flex", "wrist_roll", "gripper")
+
+# (결과 키 접두사, parquet 컬럼)
+SERIES = (("action", "action"), ("observationState", "observation.state"))
+EPISODE_COLUMN = "episode_index"
+
+DEFAULT_BINS = 50
+MAX_BINS = 1000
+DANGER_ZONE_PERCENT = 5    # 위험 구간 0~5%
+WARNING_ZONE_PERCENT = 10  # 경고 구간 5~10%
+NORM_MIN, NORM_MAX = -100.0, 100.0
+
+# 누적 해상도 (정규화 값 0.1 단위)
+FINE_BINS = 2000
+# 에피소드별로는 위험/경고 구간이 걸칠 수 있는 양 끝만 정규화 값 1 단위로 보관 (에피소드당 메모리 제한)
+EDGE_STEP = FINE_BINS // 200
+EDGE_BINS = FINE_BINS * WARNING_ZONE_PERCENT // 100 // EDGE_STEP
+
+# 한 번에 디코딩하는 행 수 (메모리 상한)
+BATCH_ROWS = int(os.getenv("CALZERO_ANALYSIS_BATCH_ROWS", "65536"))
+
+# 샤드 분석 프로세스 수 (기본: CPU 코어 수 / API 워커 수)
+ANALYSIS_WORKERS = pool_size("CALZERO_ANALYSIS_WORKERS")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class AnalysisError(ValueError):
+    """분석할 수 없는 입력 (잘못된 parquet, 컬럼 없음 등)"""
+
+
+def resolve_dataset_path(root, relative):
+    """데이터셋 루트 아래의 경로만 허용"""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root:
+        raise AnalysisError("Dataset path must be inside the dataset root")
+    return path
+
+
+def list_column_matrix(column, width):
+    """list<number> 컬럼 -> (N, width) float64 (값이 없거나 null이면 NaN)"""
+    n = len(column)
+    matrix = np.full((n, width), np.nan)
+    if pa.types.is_fixed_size_list(column.type):
+        size = column.type.list_size
+        starts = (np.arange(n) + column.offset) * size
+        lengths = np.full(n, size)
+    elif pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        offsets = column.offsets.to_numpy()
+        starts = offsets[:-1]
+        lengths = np.diff(offsets)
+    else:
+        raise AnalysisError(f"Expected a list column, got {column.type}")
+    if column.null_count:
+        lengths = np.where(column.is_null().to_numpy(zero_copy_only=False), 0, lengths)
+
+    try:
+        values = column.values.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise AnalysisError(f"Expected numeric list values, got {column.type}")
+    for j in range(width):
+        rows = lengths > j
+        matrix[rows, j] = values[starts[rows] + j]
+    return matrix
+
+
+# ==================== 구간 계산 ====================
+
+def zone_bin_counts(bins):
+    """(위험 구간 칸 수, 경고 구간 칸 수) - DataAnalysis.jsx와 같은 내림"""
+    return bins * DANGER_ZONE_PERCENT // 100, bins * WARNING_ZONE_PERCENT // 100
+
+
+def coarse_starts(bins):
+    """bins개 칸 각각이 시작하는 고해상도 칸 번호 (길이 bins + 1, 마지막은 FINE_BINS)"""
+    coarse_of_fine = np.arange(FINE_BINS) * bins // FINE_BINS
+    return np.append(np.searchsorted(coarse_of_fine, np.arange(bins)), FINE_BINS)
+
+
+def to_raw(norm, calib_min, calib_max):
+    """정규화 값 -> raw 값"""
+    return (norm - NORM_MIN) / (NORM_MAX - NORM_MIN) * (calib_max - calib_min) + calib_min
+
+
+def _zone_prefix(key):
+    return "action" if key == "action" else "state"
+
+
+def _range_summary(key, count, norm_min, norm_max, calib_min, calib_max):
+    """{key}Count / MinVal / MaxVal / NormMinVal / NormMaxVal (데이터가 없으면 범위 끝값)"""
+    if not count:
+        raw, norm_min, norm_max = (calib_min, calib_max), NORM_MIN, NORM_MAX
+    else:
+        raw = sorted(to_raw(n, calib_min, calib_max) for n in (norm_min, norm_max))
+    return {
+        f"{key}Count": int(count),
+        f"{key}MinVal": float(raw[0]),
+        f"{key}MaxVal": float(raw[1]),
+        f"{key}NormMinVal": float(norm_min),
+        f"{key}NormMaxVal": float(norm_max),
+    }
+
+
+def _zone_counts(low, high, bins):
+    """양 끝 빈도 (..., EDGE_BINS) -> 위험/경고 구간 빈도 dict (값은 (...) 배열)"""
+    danger, warning = zone_bin_counts(bins)
+    # 구간 경계(고해상도 칸 번호) -> 양 끝 배열의 칸 번호
+    edge = (coarse_starts(bins) + EDGE_STEP // 2) // EDGE_STEP
+    offset = FINE_BINS // EDGE_STEP - EDGE_BINS
+    return {
+        "DangerLow": low[..., :edge[danger]].sum(axis=-1),
+        "DangerHigh": high[..., edge[bins - danger] - offset:].sum(axis=-1) if danger else np.zeros(low.shape[:-1]),
+        "WarningLow": low[..., edge[danger]:edge[warning]].sum(axis=-1),
+        "WarningHigh": high[..., edge[bins - warning] - offset:edge[bins - danger] - offset].sum(axis=-1),
+    }
+
+
+# ==================== 누적 ====================
+
+class JointRangeAccumulator:
+    """정규화 값 고해상도 히스토그램 + min/max + 에피소드별 요약을 배치 단위로 누적
+
+    merge()로 합칠 수 있으므로 샤드마다 따로 만든 뒤 하나로 모은다 (프로세스 간 pickle 전달).
+    to_arrays() / from_arrays()로 저장했다가 다시 불러올 수 있다.
+    에피소드별로는 행 수, count, min/max, 양 끝 EDGE_BINS칸 빈도를 (에피소드 수, ...) 배열로 둔다
+    (에피소드당 수 KB라 에피소드가 많아도 고해상도 히스토그램보다 작다).
+    """
+
+    def __init__(self, joints=JOINTS):
+        self.joints = tuple(joints)
+        joint_count = len(self.joints)
+        self.rows = 0
+        self.files = 0
+        self.counts = {key: np.zeros((joint_count, FINE_BINS), dtype=np.int64) for key, _ in SERIES}
+        self.minimum = {key: np.full(joint_count, np.inf) for key, _ in SERIES}
+        self.maximum = {key: np.full(joint_count, -np.inf) for key, _ in SERIES}
+        self.episodes = self._empty_episodes(0)
+        self._pending = []  # 아직 합치지 않은 배치별 에피소드 요약
+
+    def _empty_episodes(self, size):
+        joint_count = len(self.joints)
+        table = {"ids": np.zeros(size, dtype=np.int64), "rows": np.zeros(size, dtype=np.int64)}
+        for key, _ in SERIES:
+            table[f"{key}.min"] = np.full((size, joint_count), np.inf)
+            table[f"{key}.max"] = np.full((size, joint_count), -np.inf)
+            table[f"{key}.count"] = np.zeros((size, joint_count), dtype=np.int64)
+            table[f"{key}.low"] = np.zeros((size, joint_count, EDGE_BINS), dtype=np.int32)
+            table[f"{key}.high"] = np.zeros((size, joint_count, EDGE_BINS), dtype=np.int32)
+        return table
+
+    def _fine_index(self, values, valid):
+        bin_width = (NORM_MAX - NORM_MIN) / FINE_BINS
+        index = np.floor((np.where(valid, values, NORM_MIN) - NORM_MIN) / bin_width)
+        return np.clip(index, 0, FINE_BINS - 1).astype(np.int64)
+
+    def add(self, key, values, valid=None, index=None):
+        """values: (N, 관절 수) 정규화 값 (NaN/inf는 건너뜀)"""
+        joint_count = len(self.joints)
+        valid = np.isfinite(values) if valid is None else valid
+        index = self._fine_index(values, valid) if index is None else index
+        flat = (index + np.arange(joint_count) * FINE_BINS)[valid]
+        self.counts[key] += np.bincount(flat, minlength=joint_count * FINE_BINS).reshape(joint_count, FINE_BINS)
+        self.minimum[key] = np.minimum(self.minimum[key], np.where(valid, values, np.inf).min(axis=0, initial=np.inf))
+        self.maximum[key] = np.maximum(self.maximum[key], np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf))
+
+    def add_batch(self, batch):
+        """parquet RecordBatch 하나 누적"""
+        names = batch.schema.names
+        matrices = {}
+        for key, column in SERIES:
+            if column in names:
+                values = list_column_matrix(batch.column(names.index(column)), len(self.joints))
+                valid = np.isfinite(values)
+                index = self._fine_index(values, valid)
+                self.add(key, values, valid, index)
+                matrices[key] = (values, valid, index)
+        if EPISODE_COLUMN in names:
+            episodes = batch.column(names.index(EPISODE_COLUMN)).to_numpy(zero_copy_only=False)
+            self._add_episodes(episodes, matrices)
+        self.rows += batch.num_rows
+
+    def _add_episodes(self, episodes, matrices):
+        """배치 안의 에피소드별 요약 (에피소드 수만큼 반복하지 않고 한 번에)"""
+        joint_count = len(self.joints)
+        unique, inverse, rows = np.unique(episodes, return_inverse=True, return_counts=True)
+        size = len(unique)
+        table = self._empty_episodes(size)
+        table["ids"][:] = unique
+        table["rows"][:] = rows
+        cell = inverse[:, None] * joint_count + np.arange(joint_count)
+        for key, (values, valid, index) in matrices.items():
+            cells = cell[valid]
+            table[f"{key}.count"][:] = np.bincount(cells, minlength=size * joint_count).reshape(size, joint_count)
+            np.minimum.at(table[f"{key}.min"].reshape(-1), cells, values[valid])
+            np.maximum.at(table[f"{key}.max"].reshape(-1), cells, values[valid])
+            edge_index = index // EDGE_STEP
+            high_start = FINE_BINS // EDGE_STEP - EDGE_BINS
+            for side, mask in (("low", edge_index < EDGE_BINS), ("high", edge_index >= high_start)):
+                mask &= valid
+                edge = edge_index[mask] if side == "low" else edge_index[mask] - high_start
+                counts = np.bincount(cell[mask] * EDGE_BINS + edge, minlength=size * joint_count * EDGE_BINS)
+                table[f"{key}.{side}"][:] = counts.reshape(size, joint_count, EDGE_BINS)
+        self._pending.append(table)
+
+    def _compact(self):
+        """같은 에피소드 행을 하나로 합친다 (배치/샤드 경계에 걸친 에피소드)"""
+        if not self._pending:
+            return
+        parts = [self.episodes] + self._pending
+        self._pending = []
+        merged = {name: np.concatenate([part[name] for part in parts]) for name in self.episodes}
+        unique, inverse = np.unique(merged["ids"], return_inverse=True)
+        table = self._empty_episodes(len(unique))
+        table["ids"][:] = unique
+        for name, column in merged.items():
+            if name == "ids":
+                continue
+            if name.endswith(".min"):
+                np.minimum.at(table[name], inverse, column)
+            elif name.endswith(".max"):
+                np.maximum.at(table[name], inverse, column)
+            else:
+                np.add.at(table[name], inverse, column)
+        self.episodes = table
+
+    def merge(self, other):
+        """다른 부분 결과를 합친다 (같은 joints여야 함)"""
+        if other.joints != self.joints:
+            raise ValueError("Cannot merge accumulators with different joints")
+        other._compact()
+        self.rows += other.rows
+        self.files += other.files
+        for key, _ in SERIES:
+            self.counts[key] += other.counts[key]
+            self.minimum[key] = np.minimum(self.minimum[key], other.minimum[key])
+            self.maximum[key] = np.maximum(self.maximum[key], other.maximum[key])
+        self._pending.append(other.episodes)
+        return self
+
+    # ---------- 저장 ----------
+
+    def to_arrays(self):
+        """np.savez 용 배열 dict"""
+        self._compact()
+        arrays = {"joints": np.array(self.joints), "rows": np.array(self.rows), "files": np.array(self.files)}
+        for key, _ in SERIES:
+            arrays[f"{key}.counts"] = self.counts[key]
+            arrays[f"{key}.minimum"] = self.minimum[key]
+            arrays[f"{key}.maximum"] = self.maximum[key]
+        for name, column in self.episodes.items():
+            arrays[f"episodes.{name}"] = column
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        accumulator = cls(tuple(str(joint) for joint in arrays["joints"]))
+        accumulator.rows = int(arrays["rows"])
+        accumulator.files = int(arrays["files"])
+        for key, _ in SERIES:
+            accumulator.counts[key] = arrays[f"{key}.counts"]
+            accumulator.minimum[key] = arrays[f"{key}.minimum"]
+            accumulator.maximum[key] = arrays[f"{key}.maximum"]
+        accumulator.episodes = {name: arrays[f"episodes.{name}"] for name in accumulator.episodes}
+        return accumulator
+
+    # ---------- 결과 ----------
+
+    def result(self, calibration_data, bins=DEFAULT_BINS):
+        """DataAnalysis.jsx histogramData 형식 (캘리브레이션이나 데이터가 없는 관절은 제외)"""
+        danger, warning = zone_bin_counts(bins)
+        starts = coarse_starts(bins)
+        joints = []
+        for j, joint in enumerate(self.joints):
+            calib = (calibration_data or {}).get(joint)
+            if not calib:
+                continue
+            if not any(self.counts[key][j].any() for key, _ in SERIES):
+                continue
+            calib_min, calib_max = calib['range_min'], calib['range_max']
+            entry = {
+                "joint": joint,
+                "calibMin": calib_min,
+                "calibMax": calib_max,
+                "binSize": (calib_max - calib_min) / bins,
+                "normBinSize": (NORM_MAX - NORM_MIN) / bins,
+                "dangerBinCount": danger,
+                "warningBinCount": warning,
+            }
+            for key, _ in SERIES:
+                coarse = np.add.reduceat(self.counts[key][j], starts[:-1])
+                zone = _zone_prefix(key)
+                entry.update(_range_summary(key, coarse.sum(), self.minimum[key][j], self.maximum[key][j],
+                                            calib_min, calib_max))
+                entry.update({
+                    f"{key}Bins": coarse.tolist(),
+                    f"{key}Max": int(coarse.max()),
+                    f"{key}NormBins": coarse.tolist(),
+                    f"{key}NormMax": int(coarse.max()),
+                    f"{zone}DangerLow": int(coarse[:danger].sum()),
+                    f"{zone}DangerHigh": int(coarse[bins - danger:].sum()) if danger else 0,
+                    f"{zone}WarningLow": int(coarse[danger:warning].sum()),
+                    f"{zone}WarningHigh": int(coarse[bins - warning:bins - danger].sum()),
+                })
+            joints.append(entry)
+        return joints
+
+    def episode_result(self, calibration_data, bins=DEFAULT_BINS):
+        """에피소드별 관절 요약 (count, min/max, 위험/경고 구간 빈도)
+
+        에피소드가 수천 개여도 빠르도록 관절 단위 배열로 먼저 계산하고 dict는 마지막에 만든다.
+        """
+        self._compact()
+        table = self.episodes
+        columns = {}  # joint -> {결과 키: 에피소드별 값 list}
+        for j, joint in enumerate(self.joints):
+            calib = (calibration_data or {}).get(joint)
+            if not calib:
+                continue
+            calib_min, calib_max = calib['range_min'], calib['range_max']
+            column = columns[joint] = {}
+            for key, _ in SERIES:
+                count = table[f"{key}.count"][:, j]
+                empty = count == 0
+                norm_min = np.where(empty, NORM_MIN, table[f"{key}.min"][:, j])
+                norm_max = np.where(empty, NORM_MAX, table[f"{key}.max"][:, j])
+                raw = np.sort([to_raw(norm_min, calib_min, calib_max), to_raw(norm_max, calib_min, calib_max)], axis=0)
+                column[f"{key}Count"] = count.tolist()
+                column[f"{key}MinVal"] = np.where(empty, calib_min, raw[0]).tolist()
+                column[f"{key}MaxVal"] = np.where(empty, calib_max, raw[1]).tolist()
+                column[f"{key}NormMinVal"] = norm_min.tolist()
+                column[f"{key}NormMaxVal"] = norm_max.tolist()
+                zones = _zone_counts(table[f"{key}.low"][:, j], table[f"{key}.high"][:, j], bins)
+                for name, counts in zones.items():
+                    column[f"{_zone_prefix(key)}{name}"] = counts.astype(np.int64).tolist()
+
+        episodes = []
+        for e, (episode, rows) in enumerate(zip(table["ids"].tolist(), table["rows"].tolist())):
+            joints = {joint: {name: values[e] for name, values in column.items()} for joint, column in columns.items()}
+            episodes.append({"episode_index": episode, "rows": rows, "joints": joints})
+        return episodes
+
+
+def scan_parquet(source, accumulator, batch_rows=BATCH_ROWS):
+    """parquet 파일(경로 또는 파일 객체)을 배치 단위로 읽어 누적"""
+    try:
+        parquet = pq.ParquetFile(source)
+    except (pa.ArrowInvalid, OSError) as e:
+        raise AnalysisError(f"Not a readable parquet file: {e}")
+    with parquet:
+        names = parquet.schema_arrow.names
+        columns = [column for _, column in SERIES if column in names]
+        if not columns:
+            raise AnalysisError("Parquet file has no action / observation.state columns")
+        if EPISODE_COLUMN in names:
+            columns.append(EPISODE_COLUMN)
+        for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+            accumulator.add_batch(batch)
+    accumulator.files += 1
+    accumulator._compact()
+    return accumulator
+
+
+def analysis_result(accumulator, calibration_data, bins=DEFAULT_BINS, include_episodes=True):
+    """누적 결과 -> API 응답"""
+    return {
+        "files": accumulator.files,
+        "rows": accumulator.rows,
+        "bins": bins,
+        "danger_zone_percent": DANGER_ZONE_PERCENT,
+        "warning_zone_percent": WARNING_ZONE_PERCENT,
+        "joints": accumulator.result(calibration_data, bins),
+        "episodes": accumulator.episode_result(calibration_data, bins) if include_episodes else None,
+    }
+
+
+def analyze_parquet(source, calibration_data, bins=DEFAULT_BINS):
+    """parquet 하나의 관절 범위 분석 결과"""
+    return analysis_result(scan_parquet(source, JointRangeAccumulator()), calibration_data, bins)
+
+
+# ==================== 데이터셋 (여러 샤드) ====================
+
+def dataset_files(path):
+    """데이터셋 디렉토리 안의 parquet 샤드 (LeRobot은 data/chunk-XXX/file-XXX.parquet)"""
+    if os.path.isfile(path):
+        return [path]
+    root = os.path.join(path, "data") if os.path.isdir(os.path.join(path, "data")) else path
+    files = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        files.extend(os.path.join(directory, name) for name in sorted(filenames) if name.endswith(".parquet"))
+    return files
+
+
+def scan_shard(path):
+    """프로세스 풀 작업: 샤드 하나의 부분 결과"""
+    return scan_parquet(path, JointRangeAccumulator())
+
+
+def get_pool():
+    """샤드 분석용 프로세스 풀 (처음 사용할 때 생성, 서버 스레드와 섞이지 않게 spawn)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def scan_shards(files, on_result):
+    """샤드를 프로세스 풀에 나눠 읽고 끝나는 순서대로 on_result(path, partial) 호출
+
+    샤드가 하나뿐이면 풀을 거치지 않는다.
+    """
+    if len(files) <= 1:
+        for path in files:
+            on_result(path, scan_shard(path))
+        return
+
+    pool = get_pool()
+    futures = {pool.submit(scan_shard, path): path for path in files}
+    try:
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                partial = future.result()
+            except AnalysisError as e:
+                raise AnalysisError(f"{os.path.basename(path)}: {e}")
+            on_result(path, partial)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
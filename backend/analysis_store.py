@@ -0,0 +1,193 @@
+"""
+CalZero 데이터셋 분석 누적 결과 저장소
+
+데이터셋마다 고해상도 누적 결과(analysis.JointRangeAccumulator)를 디스크에 저장해 두고,
+캘리브레이션이나 bins만 바꾼 요청은 저장된 누적 결과에서 바로 결과를 만든다.
+(누적 결과는 정규화 값 기준이라 캘리브레이션이 바뀌어도 다시 읽을 필요가 없다)
+
+- 위치: <cache_dir>/<데이터셋 경로 해시>/
+    manifest.json            샤드 목록 {상대 경로: 서명}, 현재 합계 파일 이름
+    shards/<서명>.npz        샤드별 부분 결과
+    merged-<상태 해시>.npz    전체 합계
+- 샤드 서명 = (상대 경로, 크기, mtime_ns) 해시
+- 새 샤드만 추가되면 기존 합계에 새 샤드만 더하고, 바뀌거나 지워진 샤드가 있으면
+  저장된 샤드별 결과로 합계를 다시 만든다 (바뀐 샤드만 다시 읽음)
+- 최근 사용한 데이터셋 몇 개의 합계는 프로세스 메모리에도 둔다
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+import analysis
+from storage import LockRegistry, atomic_write_bytes, atomic_write_json
+
+# 누적 형식이 바뀌면 올려서 기존 저장 결과를 버린다
+STORE_SCHEMA = 1
+MEMORY_ENTRIES = 4
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def shard_signature(root, path):
+    st = os.stat(path)
+    rel = os.path.relpath(path, root)
+    return rel, _digest(f"{STORE_SCHEMA}|{rel}|{st.st_size}|{st.st_mtime_ns}")[:32]
+
+
+class DatasetAnalysisStore:
+    """데이터셋 경로 -> 누적 결과 (디스크 + 메모리 LRU)"""
+
+    def __init__(self, cache_dir, memory_entries=MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self._locks = LockRegistry(os.path.join(cache_dir, ".locks"), cache_dir)
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    def _dataset_dir(self, dataset):
+        return os.path.join(self.cache_dir, _digest(os.path.realpath(dataset))[:16])
+
+    # ---------- 파일 ----------
+
+    @staticmethod
+    def _read(path):
+        try:
+            with np.load(path) as arrays:
+                return analysis.JointRangeAccumulator.from_arrays(dict(arrays))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None  # 없거나 쓰다 만 파일 -> 다시 계산
+
+    @staticmethod
+    def _write(path, accumulator):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **accumulator.to_arrays())
+        atomic_write_bytes(path, buffer.getvalue())
+
+    @staticmethod
+    def _read_manifest(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("schema") == STORE_SCHEMA else None
+
+    # ---------- 조회 ----------
+
+    def load(self, dataset, progress=None):
+        """데이터셋 전체 누적 결과 (필요한 샤드만 읽음) -> (accumulator, 정보 dict)
+
+        progress(done, total, path)는 새로 읽는 샤드마다 호출된다.
+        """
+        files = analysis.dataset_files(dataset)
+        if not files:
+            raise analysis.AnalysisError("No parquet files found in dataset")
+        root = dataset if os.path.isdir(dataset) else os.path.dirname(dataset)
+        signatures = dict(shard_signature(root, path) for path in files)
+        paths = {os.path.relpath(path, root): path for path in files}
+        state = _digest(json.dumps(sorted(signatures.items())))[:16]
+        info = {"shards": len(files), "scanned": 0, "reused": len(files)}
+
+        memory_key = (os.path.realpath(dataset), state)
+        with self._memory_lock:
+            cached = self._memory.get(memory_key)
+            if cached is not None:
+                self._memory.move_to_end(memory_key)
+                return cached, info
+
+        dataset_dir = self._dataset_dir(dataset)
+        manifest_path = os.path.join(dataset_dir, "manifest.json")
+        # 같은 데이터셋을 여러 요청/워커가 동시에 계산하지 않도록
+        with self._locks(manifest_path):
+            manifest = self._read_manifest(manifest_path)
+            total = None
+            if manifest and manifest["state"] == state:
+                total = self._read(os.path.join(dataset_dir, manifest["merged"]))
+            if total is None:
+                total, info["scanned"] = self._rebuild(dataset_dir, manifest, signatures, paths, progress)
+                info["reused"] = len(files) - info["scanned"]
+                merged = f"merged-{state}.npz"
+                self._write(os.path.join(dataset_dir, merged), total)
+                atomic_write_json(manifest_path, {
+                    "schema": STORE_SCHEMA,
+                    "dataset": os.path.realpath(dataset),
+                    "state": state,
+                    "merged": merged,
+                    "shards": signatures,
+                })
+                self._prune(dataset_dir, signatures, merged)
+
+        with self._memory_lock:
+            self._memory[memory_key] = total
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return total, info
+
+    def _rebuild(self, dataset_dir, manifest, signatures, paths, progress):
+        """저장된 샤드 결과 + 새로 읽은 샤드로 합계를 만든다 -> (합계, 새로 읽은 샤드 수)"""
+        shard_dir = os.path.join(dataset_dir, "shards")
+        missing = [rel for rel, signature in signatures.items()
+                   if not os.path.exists(os.path.join(shard_dir, f"{signature}.npz"))]
+
+        # 이전 합계에 있던 샤드가 하나도 바뀌거나 빠지지 않았으면 새 샤드만 더한다
+        total = None
+        previous = manifest["shards"] if manifest else None
+        if previous and all(signatures.get(rel) == signature for rel, signature in previous.items()):
+            total = self._read(os.path.join(dataset_dir, manifest["merged"]))
+        if total is None:
+            previous = {}
+            total = analysis.JointRangeAccumulator()
+
+        relative = {path: rel for rel, path in paths.items()}
+        scanned = {}
+        done = 0
+
+        def collect(path, partial):
+            nonlocal done
+            rel = relative[path]
+            self._write(os.path.join(shard_dir, f"{signatures[rel]}.npz"), partial)
+            scanned[rel] = partial
+            done += 1
+            if progress is not None:
+                progress(done, len(missing), path)
+
+        analysis.scan_shards([paths[rel] for rel in missing], collect)
+
+        for rel, signature in signatures.items():
+            if rel in previous:
+                continue
+            partial = scanned.get(rel) or self._read(os.path.join(shard_dir, f"{signature}.npz"))
+            if partial is None:
+                partial = analysis.scan_shard(paths[rel])
+                self._write(os.path.join(shard_dir, f"{signature}.npz"), partial)
+                scanned[rel] = partial
+            total.merge(partial)
+        total.to_arrays()  # 에피소드 표를 합쳐 둔다 (이후 읽기 전용으로 공유)
+        return total, len(scanned)
+
+    def _prune(self, dataset_dir, signatures, merged):
+        """현재 샤드 목록에 없는 부분 결과와 이전 합계 파일 삭제"""
+        keep = {f"{signature}.npz" for signature in signatures.values()}
+        shard_dir = os.path.join(dataset_dir, "shards")
+        for name in os.listdir(shard_dir) if os.path.isdir(shard_dir) else []:
+            if name not in keep:
+                self._remove(os.path.join(shard_dir, name))
+        for name in os.listdir(dataset_dir):
+            if name.startswith("merged-") and name != merged:
+                self._remove(os.path.join(dataset_dir, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
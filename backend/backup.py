@@ -0,0 +1,467 @@
+"""
+CalZero 스트리밍 백업 (NDJSON)
+
+/api/backup 은 전체 데이터를 dict 하나로 만든 뒤 한 번에 직렬화하므로 장치가 많아지면 메모리가 커진다.
+여기서는 레코드를 한 줄에 하나씩 내보내고 (한 번에 컬렉션 하나만 읽음) 통계는 마지막 줄에 누적해 쓴다.
+
+줄 형식 (JSON Lines, 순서 고정):
+    {"kind": "header", "format": "calzero-backup", "format_version": 1, "type": "full", "seq": 120,
+     "version": ..., "created_at": ...}
+    {"kind": "user", "data": {...}}
+    {"kind": "device", "data": {...}}
+    {"kind": "calibration", "device_id": 1, "type": "actuator", "data": {...}}
+    {"kind": "stats", "users_count": ..., "devices_count": ..., "calibrations_count": ..., "calibrations_by_type": {...}}
+compress="gzip"이면 같은 내용을 gzip 스트림으로 압축한다 (.ndjson.gz).
+
+복원(restore_entries)은 같은 형식을 한 줄씩 읽어 검증하고 storage.restore_session()에 넘긴다.
+중간에 잘못된 줄이 있으면 세션이 취소되어 기존 데이터가 그대로 남는다.
+
+증분 백업 (type: "incremental"):
+    seq는 변경 피드(events.py)의 순서 번호로, 전체 백업 헤더의 seq가 첫 증분의 since가 된다.
+    since 이후 이벤트를 레코드 단위 op로 내보내고 사용자 목록은 매번 통째로 넣는다 (사용자 변경은 피드에 없음).
+    {"kind": "header", ..., "type": "incremental", "since": 120, "seq": 135}
+    {"kind": "user", "data": {...}}
+    {"kind": "op", "seq": 121, "action": "upsert" | "delete" | "activate",
+     "collection": "devices" | "calibrations/device_7/handeye", "device_id": 7, "id": 3, "data": {...}}
+    {"kind": "stats", "users_count": ..., "ops_count": ..., "ops_by_action": {...}}
+    복원(restore_chain)은 전체 백업을 읽으면서 컬렉션마다 증분 op를 차례로 적용해 한 세션으로 복원한다.
+    op는 같은 레코드에 여러 번 적용해도 결과가 같으므로 전체 백업 도중의 변경이 증분에 겹쳐도 된다.
+"""
+
+import gzip
+import io
+import itertools
+import json
+import re
+import zlib
+
+from storage import CALIB_TYPES, StorageError
+
+BACKUP_FORMAT = "calzero-backup"
+BACKUP_FORMAT_VERSION = 1
+
+# 응답 청크 크기 (줄을 모아서 보낸다)
+CHUNK_BYTES = 64 * 1024
+
+COMPRESSIONS = ("none", "gzip")
+
+BACKUP_FULL = "full"
+BACKUP_INCREMENTAL = "incremental"
+
+# 변경 이벤트 action -> 증분 op
+OP_ACTIONS = {"create": "upsert", "update": "upsert", "delete": "delete", "activate": "activate"}
+
+_CALIB_COLLECTION_RE = re.compile(r"calibrations/device_(\d+)/(\w+)")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class BackupError(ValueError):
+    """백업 파일 형식 / 레코드 검증 오류"""
+
+
+def _header(backup_type, version, created_at, **fields):
+    return {"kind": "header", "format": BACKUP_FORMAT, "format_version": BACKUP_FORMAT_VERSION,
+            "type": backup_type, **fields, "version": version, "created_at": created_at}
+
+
+def export_entries(storage, users_file, devices_file, calib_file, version, created_at, seq=None):
+    """백업 줄(dict)을 차례로 만든다. calib_file(device_id, calib_type) -> 컬렉션 경로
+
+    seq는 읽기 시작 전의 변경 피드 번호 (이후 증분 백업의 since)
+    """
+    yield _header(BACKUP_FULL, version, created_at, seq=seq)
+
+    users_count = 0
+    for user in storage.iter_records(users_file):
+        users_count += 1
+        yield {"kind": "user", "data": user}
+
+    device_ids = []
+    for device in storage.iter_records(devices_file):
+        device_ids.append(device["id"])
+        yield {"kind": "device", "data": device}
+
+    by_type = dict.fromkeys(CALIB_TYPES, 0)
+    for device_id in device_ids:
+        for calib_type in CALIB_TYPES:
+            for record in storage.iter_records(calib_file(device_id, calib_type)):
+                by_type[calib_type] += 1
+                yield {"kind": "calibration", "device_id": device_id, "type": calib_type, "data": record}
+
+    yield {
+        "kind": "stats",
+        "users_count": users_count,
+        "devices_count": len(device_ids),
+        "calibrations_count": sum(by_type.values()),
+        "calibrations_by_type": by_type,
+    }
+
+
+def encode_ndjson(entries, compress="none", chunk_bytes=CHUNK_BYTES):
+    """줄(dict) -> NDJSON 바이트 청크 (compress="gzip"이면 gzip 스트림)"""
+    compressor = zlib.compressobj(wbits=31) if compress == "gzip" else None
+    buffer = []
+    size = 0
+    for entry in entries:
+        line = json.dumps(entry, ensure_ascii=False).encode('utf-8') + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+# ==================== 복원 ====================
+
+def open_upload(fileobj):
+    """업로드 파일 -> 텍스트 줄 스트림 (gzip이면 헤더 바이트로 감지해 풀면서 읽는다)"""
+    head = fileobj.read(2)
+    fileobj.seek(0)
+    if head == GZIP_MAGIC:
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode='rb')
+    return io.TextIOWrapper(fileobj, encoding='utf-8')
+
+
+def read_ndjson(lines, source=None):
+    """NDJSON 줄 -> (위치, dict). 위치는 오류 메시지용 "line N" (source가 있으면 "<source> line N").
+    첫 줄은 calzero-backup 헤더여야 한다"""
+    prefix = f"{source} " if source else ""
+    header_seen = False
+    try:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            where = f"{prefix}line {number}"
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise BackupError(f"{where}: invalid JSON ({e})") from e
+            if not isinstance(entry, dict):
+                raise BackupError(f"{where}: expected an object")
+            if not header_seen:
+                if entry.get("kind") != "header" or entry.get("format") != BACKUP_FORMAT:
+                    raise BackupError(f"{where}: not a {BACKUP_FORMAT} stream")
+                if entry.get("format_version") != BACKUP_FORMAT_VERSION:
+                    raise BackupError(f"{where}: unsupported format_version {entry.get('format_version')!r}")
+                header_seen = True
+            yield where, entry
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        # 잘린 gzip, 깨진 인코딩 등
+        raise BackupError(f"{prefix}unreadable backup: {e}") from e
+    if not header_seen:
+        raise BackupError(f"{prefix}empty backup")
+
+
+def restore_entries(entries, session, validate, users_file, devices_file, calib_file):
+    """백업 줄을 검증하며 session.add()로 넘긴다 -> (header, stats)
+
+    validate(kind, record, calib_type) 는 스키마 검증 (잘못되면 ValueError).
+    마지막 통계 줄이 있어야 하고 실제로 읽은 개수와 맞아야 한다 (잘린 업로드 방지).
+    """
+    header = None
+    declared = None
+    counts = {"users_count": 0, "devices_count": 0, "calibrations_count": 0}
+    by_type = dict.fromkeys(CALIB_TYPES, 0)
+    device_ids = set()
+
+    for where, entry in entries:
+        kind = entry.get("kind")
+        try:
+            if kind == "header":
+                if entry.get("type", BACKUP_FULL) != BACKUP_FULL:
+                    raise ValueError("an incremental backup can only be restored on top of its full backup")
+                header = entry
+            elif kind == "stats":
+                declared = entry
+            elif kind in ("user", "device"):
+                record = entry.get("data")
+                validate(kind, record, None)
+                if kind == "user":
+                    session.add(users_file, record)
+                    counts["users_count"] += 1
+                else:
+                    session.add(devices_file, record)
+                    device_ids.add(record["id"])
+                    counts["devices_count"] += 1
+            elif kind == "calibration":
+                calib_type = entry.get("type")
+                if calib_type not in CALIB_TYPES:
+                    raise ValueError(f"unknown calibration type {calib_type!r}")
+                device_id = entry.get("device_id")
+                if device_id not in device_ids:
+                    raise ValueError(f"calibration for unknown device {device_id!r}")
+                record = entry.get("data")
+                validate(kind, record, calib_type)
+                if record.get("device_id") != device_id:
+                    raise ValueError(f"record device_id {record.get('device_id')!r} does not match {device_id}")
+                session.add(calib_file(device_id, calib_type), record)
+                by_type[calib_type] += 1
+                counts["calibrations_count"] += 1
+            else:
+                raise ValueError(f"unknown kind {kind!r}")
+        except BackupError:
+            raise
+        except (ValueError, TypeError, KeyError, StorageError) as e:
+            raise BackupError(f"{where}: {e}") from e
+
+    counts["calibrations_by_type"] = by_type
+    # 통계 줄은 마지막에 쓰므로 없으면 잘린 파일
+    if declared is None:
+        raise BackupError("missing stats line (truncated backup?)")
+    for key in ("users_count", "devices_count", "calibrations_count"):
+        if key in declared and declared[key] != counts[key]:
+            raise BackupError(f"stats mismatch: {key} is {declared[key]} but {counts[key]} records were read")
+    return header, counts
+
+
+def legacy_entries(backup_data):
+    """/api/backup 의 dict 형식 -> (where, 백업 줄), restore_entries 로 넘겨 같은 경로로 복원한다
+
+    dict 에 stats 가 있으면 통계 줄로 넘겨 개수를 확인하고, 없으면 확인하지 않는다.
+    """
+    if not isinstance(backup_data, dict) or not backup_data.get("version"):
+        raise BackupError("not a calzero backup (missing version)")
+    yield "header", _header(BACKUP_FULL, backup_data["version"], backup_data.get("created_at"))
+    for i, user in enumerate(backup_data.get("users", [])):
+        yield f"users[{i}]", {"kind": "user", "data": user}
+    for i, device in enumerate(backup_data.get("devices", [])):
+        yield f"devices[{i}]", {"kind": "device", "data": device}
+    for device_key, device_calibs in backup_data.get("calibrations", {}).items():
+        match = re.fullmatch(r"device_(\d+)", device_key)
+        if match is None or not isinstance(device_calibs, dict):
+            raise BackupError(f"calibrations.{device_key}: expected device_<id> -> {{type: [records]}}")
+        for calib_type, records in device_calibs.items():
+            for i, record in enumerate(records):
+                yield f"calibrations.{device_key}.{calib_type}[{i}]", {
+                    "kind": "calibration", "device_id": int(match.group(1)), "type": calib_type, "data": record,
+                }
+    stats = backup_data.get("stats") or {}
+    yield "stats", {"kind": "stats", **{key: stats[key] for key in
+                                         ("users_count", "devices_count", "calibrations_count") if key in stats}}
+
+
+# ==================== 증분 백업 ====================
+
+def incremental_entries(storage, users_file, events, since, seq, version, created_at):
+    """since 이후 변경 이벤트 -> 증분 백업 줄 (events에 reset이 없어야 한다 - 호출자가 확인)"""
+    yield _header(BACKUP_INCREMENTAL, version, created_at, since=since, seq=seq)
+
+    users_count = 0
+    for user in storage.iter_records(users_file):
+        users_count += 1
+        yield {"kind": "user", "data": user}
+
+    by_action = dict.fromkeys(("upsert", "delete", "activate"), 0)
+    for event in events:
+        action = OP_ACTIONS[event["action"]]
+        by_action[action] += 1
+        op = {"kind": "op", "seq": event["seq"], "action": action, "collection": event["collection"],
+              "device_id": event.get("device_id"), "id": event.get("id")}
+        if action == "upsert":
+            op["data"] = event["record"]
+        yield op
+
+    yield {
+        "kind": "stats",
+        "users_count": users_count,
+        "ops_count": sum(by_action.values()),
+        "ops_by_action": by_action,
+    }
+
+
+def _op_target(op):
+    """op의 collection -> ("devices", None) | (device_id, calib_type)"""
+    collection = op.get("collection")
+    if collection == "devices":
+        return "devices", None
+    m = _CALIB_COLLECTION_RE.fullmatch(collection or "")
+    if not m or m.group(2) not in CALIB_TYPES:
+        raise ValueError(f"unknown collection {collection!r}")
+    device_id = int(m.group(1))
+    if op.get("device_id") != device_id:
+        raise ValueError(f"device_id {op.get('device_id')!r} does not match {collection}")
+    return device_id, m.group(2)
+
+
+def read_increment(entries, validate, after_seq):
+    """증분 백업 하나를 읽어 검증 -> {"since", "seq", "users", "ops": [(target, op), ...]}
+
+    after_seq는 앞 백업의 seq (since가 그보다 크면 사이의 변경이 빠진 것)
+    """
+    increment = {"users": [], "ops": []}
+    declared = None
+    for where, entry in entries:
+        kind = entry.get("kind")
+        try:
+            if kind == "header":
+                if entry.get("type") != BACKUP_INCREMENTAL:
+                    raise ValueError("not an incremental backup")
+                since, seq = entry.get("since"), entry.get("seq")
+                if not isinstance(since, int) or not isinstance(seq, int) or seq < since:
+                    raise ValueError("invalid since / seq")
+                if since > after_seq:
+                    raise ValueError(f"gap in chain: starts after seq {since} but the previous backup ends at {after_seq}")
+                increment.update(since=since, seq=seq)
+            elif kind == "user":
+                validate("user", entry.get("data"), None)
+                increment["users"].append(entry["data"])
+            elif kind == "op":
+                target = _op_target(entry)
+                action = entry.get("action")
+                if action == "upsert":
+                    record = entry.get("data")
+                    validate("device" if target[0] == "devices" else "calibration", record, target[1])
+                    if target[0] != "devices" and record.get("device_id") != target[0]:
+                        raise ValueError(f"record device_id {record.get('device_id')!r} does not match {target[0]}")
+                    if record["id"] != entry.get("id"):
+                        raise ValueError(f"data.id {record['id']} does not match id {entry.get('id')!r}")
+                elif action not in ("delete", "activate"):
+                    raise ValueError(f"unknown action {action!r}")
+                elif not isinstance(entry.get("id"), int):
+                    raise ValueError("id must be an integer")
+                increment["ops"].append((target, entry))
+            elif kind == "stats":
+                declared = entry
+            else:
+                raise ValueError(f"unknown kind {kind!r}")
+        except (ValueError, TypeError, KeyError) as e:
+            raise BackupError(f"{where}: {e}") from e
+
+    if declared is None:
+        raise BackupError("missing stats line (truncated backup?)")
+    if declared.get("ops_count") != len(increment["ops"]):
+        raise BackupError(f"stats mismatch: ops_count is {declared.get('ops_count')} "
+                          f"but {len(increment['ops'])} ops were read")
+    return increment
+
+
+def apply_ops(records, ops, scope_field='camera'):
+    """레코드 목록에 op를 차례로 적용 (storage.set_active와 같은 활성화 규칙) -> id순 목록"""
+    items = {record["id"]: record for record in records}
+    for op in ops:
+        if op["action"] == "upsert":
+            items[op["id"]] = op["data"]
+        elif op["action"] == "delete":
+            items.pop(op["id"], None)
+        elif op["id"] in items:
+            scope = items[op["id"]].get(scope_field)
+            for record_id, record in items.items():
+                if record.get(scope_field) == scope:
+                    items[record_id] = {**record, "is_active": record_id == op["id"]}
+    return [items[record_id] for record_id in sorted(items)]
+
+
+def merge_increments(entries, increments):
+    """전체 백업 줄 + 증분들 -> 합쳐진 전체 백업 줄 (restore_entries에 그대로 넘긴다)
+
+    장치 목록만 모아서 적용하고, 캘리브레이션은 컬렉션 단위로 읽으면서 적용하므로
+    메모리에는 장치 목록, 증분 op, 컬렉션 하나만 남는다.
+    """
+    device_ops = []
+    calib_ops = {}
+    dropped = {}   # 삭제된 장치 -> 마지막 삭제 seq (그 전 캘리브레이션은 모두 지워짐)
+    for increment in increments:
+        for (device_id, calib_type), op in increment["ops"]:
+            if device_id == "devices":
+                device_ops.append(op)
+                if op["action"] == "delete":
+                    dropped[op["id"]] = op["seq"]
+            else:
+                calib_ops.setdefault((device_id, calib_type), []).append(op)
+    users = increments[-1]["users"] if increments else None
+
+    counts = {"users_count": 0, "devices_count": 0, "calibrations_count": 0}
+    devices = []
+    device_ids = None
+    current_key, current = None, []
+    seen = set()
+
+    def collection(key, records, where):
+        device_id, calib_type = key
+        if device_id not in device_ids:
+            return
+        if device_id in dropped:
+            records = []
+        ops = [op for op in calib_ops.get(key, ()) if op["seq"] > dropped.get(device_id, -1)]
+        for record in apply_ops(records, ops):
+            counts["calibrations_count"] += 1
+            yield where, {"kind": "calibration", "device_id": device_id, "type": calib_type, "data": record}
+
+    def flush_devices(where):
+        nonlocal device_ids
+        merged = apply_ops(devices, device_ops, scope_field=None)
+        device_ids = {device["id"] for device in merged}
+        for device in merged:
+            counts["devices_count"] += 1
+            yield where, {"kind": "device", "data": device}
+
+    for where, entry in entries:
+        kind = entry.get("kind")
+        if kind == "header":
+            yield where, {**entry, "seq": increments[-1]["seq"] if increments else entry.get("seq")}
+            for user in users or ():
+                counts["users_count"] += 1
+                yield where, {"kind": "user", "data": user}
+        elif kind == "user":
+            if users is None:
+                counts["users_count"] += 1
+                yield where, entry
+        elif kind == "device":
+            devices.append(entry.get("data"))
+        elif kind == "calibration":
+            if device_ids is None:
+                yield from flush_devices(where)
+            key = (entry.get("device_id"), entry.get("type"))
+            if key != current_key:
+                if current_key is not None:
+                    yield from collection(current_key, current, where)
+                current_key, current = key, []
+                seen.add(key)
+            current.append(entry.get("data"))
+        elif kind == "stats":
+            if device_ids is None:
+                yield from flush_devices(where)
+            if current_key is not None:
+                yield from collection(current_key, current, where)
+            # 전체 백업에 없던 컬렉션 (증분에서 새로 생김)
+            for key in sorted(set(calib_ops) - seen):
+                yield from collection(key, [], where)
+            yield where, {"kind": "stats", **counts}
+        else:
+            yield where, entry
+
+
+def restore_chain(base_entries, increment_entries, session, validate, users_file, devices_file, calib_file):
+    """전체 백업 + 증분 백업들(순서대로)을 한 세션으로 복원 -> (header, stats)
+
+    increment_entries는 read_ndjson() 스트림 목록. 증분은 작으므로 먼저 모두 읽어 검증하고,
+    전체 백업은 스트리밍으로 읽으면서 합친다.
+    """
+    first = next(base_entries, None)
+    if first is None:
+        raise BackupError("empty backup")
+    header = first[1]
+    seq = header.get("seq")
+    if header.get("type", BACKUP_FULL) != BACKUP_FULL or not isinstance(seq, int):
+        raise BackupError(f"{first[0]}: the base must be a full backup with a change sequence (/api/backup/stream)")
+
+    increments = []
+    for entries in increment_entries:
+        increment = read_increment(entries, validate, seq)
+        increments.append(increment)
+        seq = max(seq, increment["seq"])
+
+    merged = merge_increments(itertools.chain([first], base_entries), increments)
+    header, stats = restore_entries(merged, session, validate, users_file, devices_file, calib_file)
+    stats["increments"] = len(increments)
+    stats["seq"] = header.get("seq")
+    return header, stats
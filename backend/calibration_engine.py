@@ -0,0 +1,527 @@
+"""
+CalZero 서버 측 캘리브레이션 엔진 (NumPy / OpenCV)
+
+브라우저(Pyodide)에서 하던 체커보드 코너 검출과 카메라 모델 계산을 서버에서 수행한다.
+- 코너 검출은 이미지별로 독립이므로 프로세스 풀에서 코어 수만큼 병렬 처리
+- 카메라 모델(cv2.calibrateCamera)은 검출 결과를 모아 한 번 계산
+- 보드 규격은 frontend/public/checkerboards 와 같다 (standard_9x6, 14x8)
+"""
+
+import hashlib
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from corner_cache import image_key
+from workers import pool_size
+
+# 보드 이름 -> (내부 코너 cols, rows, 기본 square size mm)
+BOARD_SPECS = {
+    "standard_9x6": (9, 6, 24.0),
+    "14x8": (14, 8, 17.4),
+}
+
+MIN_DETECTED_IMAGES = 3
+
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+# 코너 검출 프로세스 수 (기본: CPU 코어 수 / API 워커 수)
+CALIB_WORKERS = pool_size("CALZERO_CALIB_WORKERS")
+
+
+class CalibrationError(ValueError):
+    """입력이 부족하거나 잘못되어 계산할 수 없음"""
+
+
+def resolve_board(board, square_size=None):
+    """보드 이름 -> (cols, rows, square_size)"""
+    spec = BOARD_SPECS.get(board)
+    if spec is None:
+        raise CalibrationError(f"Unknown board: {board} (available: {', '.join(BOARD_SPECS)})")
+    cols, rows, default_size = spec
+    return cols, rows, float(square_size or default_size)
+
+
+def board_object_points(cols, rows, square_size):
+    """보드 좌표계의 3D 코너 좌표 (0,0,0), (s,0,0), ... (cols*rows, 3)"""
+    objp = np.zeros((rows * cols, 3), np.float32)
+    objp[:, :2] = np.mgrid[0:cols, 0:rows].T.reshape(-1, 2)
+    return objp * np.float32(square_size)
+
+
+# ==================== 코너 검출 (프로세스 풀) ====================
+
+def detect_corners(image_bytes, cols, rows):
+    """이미지 한 장에서 체커보드 코너 검출 (워커 프로세스에서 실행)
+
+    반환: (image_size (w, h), corners float32 (cols*rows, 2)) - 디코딩 실패면 None,
+    코너를 못 찾으면 corners가 None
+    """
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    image_size = (gray.shape[1], gray.shape[0])
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE | cv2.CALIB_CB_FAST_CHECK
+    found, corners = cv2.findChessboardCorners(gray, (cols, rows), flags)
+    if not found:
+        return image_size, None
+    corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), SUBPIX_CRITERIA)
+    return image_size, corners.reshape(-1, 2)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# 코너 검출 결과 캐시 (configure_corner_cache()로 설정, 없으면 항상 검출)
+_corner_cache = None
+
+
+def configure_corner_cache(cache):
+    """CornerCache 인스턴스 지정 (None이면 캐시 사용 안 함)"""
+    global _corner_cache
+    _corner_cache = cache
+
+
+def get_pool():
+    """코너 검출용 프로세스 풀 (처음 사용할 때 생성)
+
+    서버 프로세스는 스레드를 쓰므로 fork 대신 spawn으로 워커를 띄운다.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CALIB_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def detect_batch(images, cols, rows, progress=None):
+    """여러 이미지의 코너를 병렬 검출 (입력 순서대로 반환)
+
+    캐시에 있는 이미지는 검출을 건너뛰고, 나머지만 프로세스 풀에 넣는다.
+    progress(done, total, index, detected)가 있으면 이미지 하나가 끝날 때마다 호출한다.
+    """
+    results = [None] * len(images)
+    if not images:
+        return results
+    cache = _corner_cache
+    keys = [image_key(data) for data in images] if cache is not None else None
+
+    done = 0
+    pending = []
+
+    def report(index):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            detected = results[index] is not None and results[index][1] is not None
+            progress(done, len(images), index, detected)
+
+    for i, data in enumerate(images):
+        cached = cache.get(keys[i], cols, rows) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+            report(i)
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    pool = get_pool()
+    futures = {pool.submit(detect_corners, images[i], cols, rows): i for i in pending}
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if cache is not None:
+                cache.put(keys[index], cols, rows, results[index])
+            report(index)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return results
+
+
+# ==================== Intrinsic ====================
+
+def solve_intrinsic(detections, cols, rows, square_size):
+    """검출 결과로 카메라 행렬 / 왜곡 계수 계산
+
+    detections: detect_batch() 결과
+    반환값의 camera_matrix / dist_coeffs / image_size / rms_error는
+    IntrinsicCalibrationCreate 형식과 같다.
+    """
+    objp = board_object_points(cols, rows, square_size)
+    obj_points, img_points, used = [], [], []
+    image_size = None
+    detection_results = []
+
+    for i, detection in enumerate(detections):
+        if detection is None:
+            detection_results.append({"index": i, "detected": False, "error": "decode failed"})
+            continue
+        size, corners = detection
+        if corners is None:
+            detection_results.append({"index": i, "detected": False})
+            continue
+        if image_size is None:
+            image_size = size
+        elif size != image_size:
+            detection_results.append({"index": i, "detected": False, "error": "image size mismatch"})
+            continue
+        obj_points.append(objp)
+        img_points.append(corners.reshape(-1, 1, 2))
+        used.append(i)
+        detection_results.append({"index": i, "detected": True})
+
+    if len(used) < MIN_DETECTED_IMAGES:
+        raise CalibrationError(
+            f"최소 {MIN_DETECTED_IMAGES}장의 이미지에서 코너가 검출되어야 합니다. (검출: {len(used)}장)"
+        )
+
+    rms, camera_matrix, dist_coeffs, rvecs, tvecs = cv2.calibrateCamera(
+        obj_points, img_points, image_size, None, None
+    )
+
+    # 이미지별 재투영 오차
+    per_view = {}
+    for i, objp_i, corners, rvec, tvec in zip(used, obj_points, img_points, rvecs, tvecs):
+        projected, _ = cv2.projectPoints(objp_i, rvec, tvec, camera_matrix, dist_coeffs)
+        per_view[i] = float(np.sqrt(np.mean(np.sum((projected - corners) ** 2, axis=2))))
+    for result in detection_results:
+        if result["index"] in per_view:
+            result["reprojection_error"] = round(per_view[result["index"]], 4)
+
+    return {
+        "camera_matrix": camera_matrix.tolist(),
+        "dist_coeffs": dist_coeffs.flatten().tolist(),
+        "image_size": [int(image_size[0]), int(image_size[1])],
+        "rms_error": float(rms),
+        "image_count": len(used),
+        "detection_results": detection_results,
+    }
+
+
+def calibrate_intrinsic(images, board, square_size=None, progress=None):
+    """이미지 바이트 목록 + 보드 규격 -> intrinsic 결과"""
+    cols, rows, square_size = resolve_board(board, square_size)
+    detections = detect_batch(images, cols, rows, progress)
+    return solve_intrinsic(detections, cols, rows, square_size)
+
+
+# ==================== 회전 / 변환 (배치) ====================
+
+def rodrigues_batch(rvecs):
+    """회전 벡터 (N, 3) -> 회전 행렬 (N, 3, 3)"""
+    rvecs = np.asarray(rvecs, dtype=np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(rvecs, axis=1)
+    safe = np.where(theta > 1e-12, theta, 1.0)
+    k = rvecs / safe[:, None]
+    K = np.zeros((len(rvecs), 3, 3))
+    K[:, 0, 1], K[:, 0, 2] = -k[:, 2], k[:, 1]
+    K[:, 1, 0], K[:, 1, 2] = k[:, 2], -k[:, 0]
+    K[:, 2, 0], K[:, 2, 1] = -k[:, 1], k[:, 0]
+    s = np.sin(theta)[:, None, None]
+    c = np.cos(theta)[:, None, None]
+    R = np.eye(3) + s * K + (1 - c) * (K @ K)
+    R[theta <= 1e-12] = np.eye(3)
+    return R
+
+
+def rotation_inputs_to_matrices(rotations):
+    """포즈 회전 입력 (N, 3) 회전 벡터 또는 (N, 9)/(N, 3, 3) 행렬 -> (N, 3, 3)"""
+    rotations = np.asarray(rotations, dtype=np.float64)
+    if rotations.ndim == 2 and rotations.shape[1] == 3:
+        return rodrigues_batch(rotations)
+    if rotations.size == len(rotations) * 9:
+        return rotations.reshape(-1, 3, 3)
+    raise CalibrationError("rotation은 회전 벡터(3) 또는 회전 행렬(3x3)이어야 합니다")
+
+
+def make_transforms(R, t):
+    """(N, 3, 3), (N, 3) -> 동차 변환 (N, 4, 4)"""
+    T = np.zeros((len(R), 4, 4))
+    T[:, :3, :3] = R
+    T[:, :3, 3] = t
+    T[:, 3, 3] = 1.0
+    return T
+
+
+def invert_transforms(T):
+    """동차 변환 배치의 역변환"""
+    R_inv = np.transpose(T[:, :3, :3], (0, 2, 1))
+    t_inv = -np.einsum('nij,nj->ni', R_inv, T[:, :3, 3])
+    return make_transforms(R_inv, t_inv)
+
+
+def rotation_angles_deg(R):
+    """회전 행렬 배치의 회전각 (deg)"""
+    cos = (np.trace(R, axis1=-2, axis2=-1) - 1) / 2
+    return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+
+def euler_xyz_deg(R):
+    """회전 행렬 -> [roll, pitch, yaw] (deg, R = Rz·Ry·Rx)"""
+    roll = np.arctan2(R[2, 1], R[2, 2])
+    pitch = np.arcsin(np.clip(-R[2, 0], -1.0, 1.0))
+    yaw = np.arctan2(R[1, 0], R[0, 0])
+    return np.degrees([roll, pitch, yaw]).tolist()
+
+
+def mean_rotation(R):
+    """회전 행렬 배치의 평균 (chordal L2, SVD로 SO(3)에 투영)"""
+    U, _, Vt = np.linalg.svd(R.mean(axis=0))
+    M = U @ Vt
+    if np.linalg.det(M) < 0:
+        U[:, -1] *= -1
+        M = U @ Vt
+    return M
+
+
+# ==================== Hand-Eye ====================
+
+HANDEYE_METHODS = {
+    "tsai": cv2.CALIB_HAND_EYE_TSAI,
+    "park": cv2.CALIB_HAND_EYE_PARK,
+    "horaud": cv2.CALIB_HAND_EYE_HORAUD,
+    "daniilidis": cv2.CALIB_HAND_EYE_DANIILIDIS,
+}
+
+HANDEYE_TYPES = ("eye-in-hand", "eye-to-hand")
+
+
+def handeye_residuals(X, G, C):
+    """AX = XB 일관성 잔차
+
+    G_i · X · C_i (eye-in-hand: base->target, eye-to-hand: gripper->target)는
+    모든 포즈에서 같아야 하므로, 평균 포즈로부터의 편차를 잔차로 쓴다.
+    """
+    fixed = G @ X @ C
+    t = fixed[:, :3, 3]
+    t_err = np.linalg.norm(t - t.mean(axis=0), axis=1)
+    R_mean = mean_rotation(fixed[:, :3, :3])
+    r_err = rotation_angles_deg(np.transpose(fixed[:, :3, :3], (0, 2, 1)) @ R_mean)
+    return {
+        "translation_rms": float(np.sqrt(np.mean(t_err ** 2))),
+        "translation_max": float(t_err.max()),
+        "rotation_rms_deg": float(np.sqrt(np.mean(r_err ** 2))),
+        "rotation_max_deg": float(r_err.max()),
+    }
+
+
+def solve_handeye(robot_rotations, robot_translations, target_rotations, target_translations,
+                  calib_type="eye-in-hand", methods=None):
+    """여러 방법으로 hand-eye를 풀어 잔차와 함께 반환
+
+    robot_*: gripper -> base (TCP 포즈), target_*: target -> camera (보드 검출 포즈)
+    회전은 회전 벡터 또는 3x3 행렬, 이동은 mm.
+    결과 행렬은 eye-in-hand면 camera -> gripper, eye-to-hand면 camera -> base.
+    winner는 이동 잔차(rms)가 가장 작은 방법.
+    """
+    if calib_type not in HANDEYE_TYPES:
+        raise CalibrationError(f"Unknown hand-eye type: {calib_type}")
+    methods = methods or list(HANDEYE_METHODS)
+    unknown = [m for m in methods if m not in HANDEYE_METHODS]
+    if unknown:
+        raise CalibrationError(f"Unknown hand-eye method: {', '.join(unknown)}")
+
+    R_g = rotation_inputs_to_matrices(robot_rotations)
+    t_g = np.asarray(robot_translations, dtype=np.float64).reshape(-1, 3)
+    R_c = rotation_inputs_to_matrices(target_rotations)
+    t_c = np.asarray(target_translations, dtype=np.float64).reshape(-1, 3)
+    n = len(R_g)
+    if not (len(t_g) == len(R_c) == len(t_c) == n):
+        raise CalibrationError("로봇 포즈와 보드 포즈의 개수가 같아야 합니다")
+    if n < MIN_DETECTED_IMAGES:
+        raise CalibrationError(f"최소 {MIN_DETECTED_IMAGES}쌍의 포즈가 필요합니다. (입력: {n}쌍)")
+
+    G = make_transforms(R_g, t_g)
+    if calib_type == "eye-to-hand":
+        # 고정 카메라는 base -> gripper 를 넣으면 camera -> base 가 나온다
+        G = invert_transforms(G)
+    C = make_transforms(R_c, t_c)
+
+    R_in, t_in = list(G[:, :3, :3]), list(G[:, :3, 3:])
+    R_tc, t_tc = list(C[:, :3, :3]), list(C[:, :3, 3:])
+
+    results = {}
+    for name in methods:
+        try:
+            R, t = cv2.calibrateHandEye(R_in, t_in, R_tc, t_tc, method=HANDEYE_METHODS[name])
+        except cv2.error as e:
+            results[name] = {"error": str(e).strip().splitlines()[-1]}
+            continue
+        X = make_transforms(R[None], t.reshape(1, 3))[0]
+        if not np.all(np.isfinite(X)):
+            results[name] = {"error": "solution is not finite"}
+            continue
+        results[name] = {
+            "transformation_matrix": X.tolist(),
+            "residuals": handeye_residuals(X, G, C),
+        }
+
+    solved = [name for name, r in results.items() if "residuals" in r]
+    if not solved:
+        raise CalibrationError("모든 방법에서 hand-eye 계산에 실패했습니다")
+    winner = min(solved, key=lambda m: (results[m]["residuals"]["translation_rms"],
+                                        results[m]["residuals"]["rotation_rms_deg"]))
+
+    X = np.asarray(results[winner]["transformation_matrix"])
+    return {
+        "type": calib_type,
+        "method": winner,
+        "methods": results,
+        "transformation_matrix": X.tolist(),
+        "rotation_matrix": X[:3, :3].tolist(),
+        "translation": X[:3, 3].tolist(),
+        "rotation_euler": euler_xyz_deg(X[:3, :3]),
+        "poses_count": n,
+        "residual": results[winner]["residuals"]["translation_rms"],
+    }
+
+
+# ==================== Extrinsic (PnP) ====================
+
+class IntrinsicModel:
+    """intrinsic 레코드에서 만든 카메라 모델 (레코드별로 캐시)
+
+    PnP에는 코너 좌표만 필요하므로 이미지 전체 remap 맵 대신
+    코너를 한 번에 왜곡 보정(cv2.undistortPoints)하고 왜곡 없는 모델로 PnP를 푼다.
+    """
+
+    __slots__ = ("K", "dist", "image_size")
+
+    def __init__(self, record):
+        if record.get("camera_matrix"):
+            K = np.asarray(record["camera_matrix"], dtype=np.float64)
+        elif record.get("fx") is not None:
+            # 예전 형식 (fx, fy, cx, cy)
+            K = np.array([[record["fx"], 0, record["cx"]], [0, record["fy"], record["cy"]], [0, 0, 1]], np.float64)
+        else:
+            raise CalibrationError(f"Intrinsic {record.get('id')} has no camera matrix")
+        dist = record.get("dist_coeffs") or record.get("distCoeffs") or []
+        self.K = K
+        self.dist = np.asarray(dist, dtype=np.float64).reshape(-1)
+        self.image_size = tuple(record.get("image_size") or ())
+
+    def undistort(self, corners):
+        """(V, N, 2) 픽셀 좌표 -> 왜곡 보정된 픽셀 좌표 (같은 K 기준)"""
+        shape = corners.shape
+        points = corners.reshape(-1, 1, 2).astype(np.float64)
+        if not self.dist.any():
+            return points.reshape(shape)
+        return cv2.undistortPoints(points, self.K, self.dist, P=self.K).reshape(shape)
+
+
+INTRINSIC_MODEL_CACHE_SIZE = 64
+_intrinsic_models = OrderedDict()
+_intrinsic_models_lock = threading.Lock()
+
+# IntrinsicModel을 만드는 데 쓰는 필드
+_INTRINSIC_MODEL_FIELDS = ("camera_matrix", "fx", "fy", "cx", "cy", "dist_coeffs", "distCoeffs", "image_size")
+
+
+def _intrinsic_fingerprint(record):
+    """created_at + 모델 필드 해시 (복원으로 같은 id에 다른 값이 들어와도 다른 키가 된다)"""
+    payload = json.dumps([record.get("created_at")] + [record.get(f) for f in _INTRINSIC_MODEL_FIELDS], default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def intrinsic_model(key, record):
+    """key(예: (device_id, intrinsic_id)) + 레코드 내용별 IntrinsicModel (LRU 캐시)"""
+    key = (key, _intrinsic_fingerprint(record))
+    with _intrinsic_models_lock:
+        model = _intrinsic_models.get(key)
+        if model is not None:
+            _intrinsic_models.move_to_end(key)
+            return model
+    model = IntrinsicModel(record)
+    with _intrinsic_models_lock:
+        _intrinsic_models[key] = model
+        while len(_intrinsic_models) > INTRINSIC_MODEL_CACHE_SIZE:
+            _intrinsic_models.popitem(last=False)
+    return model
+
+
+def solve_pnp_views(model, objp, corners):
+    """한 카메라의 여러 뷰 PnP
+
+    corners: (V, N, 2) 검출 코너. 왜곡 보정은 모든 뷰를 한 번에 하고,
+    회전 행렬 / 재투영 오차도 배치로 계산한다.
+    """
+    undistorted = model.undistort(corners)
+    rvecs = np.empty((len(corners), 3))
+    tvecs = np.empty((len(corners), 3))
+    for v, points in enumerate(undistorted):
+        ok, rvec, tvec = cv2.solvePnP(objp, points, model.K, None, flags=cv2.SOLVEPNP_IPPE)
+        if not ok:
+            ok, rvec, tvec = cv2.solvePnP(objp, points, model.K, None, flags=cv2.SOLVEPNP_ITERATIVE)
+        rvecs[v], tvecs[v] = rvec.ravel(), tvec.ravel()
+
+    R = rodrigues_batch(rvecs)
+    cam = np.einsum('vij,nj->vni', R, objp.astype(np.float64)) + tvecs[:, None, :]
+    proj = np.einsum('ij,vnj->vni', model.K, cam / cam[..., 2:3])[..., :2]
+    errors = np.sqrt(np.mean(np.sum((proj - undistorted) ** 2, axis=2), axis=1))
+    return rvecs, tvecs, R, errors
+
+
+def solve_extrinsic_batch(groups, board, square_size=None, progress=None):
+    """여러 카메라의 extrinsic을 한 번에 계산
+
+    groups: [{"camera": str, "model": IntrinsicModel, "images": [bytes, ...]}, ...]
+    모든 카메라의 이미지를 한 번에 프로세스 풀에 넣어 코너를 검출하고,
+    카메라별 PnP는 스레드 풀에서 동시에 푼다.
+    반환: {camera: {"views": [...], "best": index 또는 None}}
+    """
+    cols, rows, square_size = resolve_board(board, square_size)
+    objp = board_object_points(cols, rows, square_size)
+
+    flat = [image for group in groups for image in group["images"]]
+    detections = detect_batch(flat, cols, rows, progress)
+
+    def solve_group(group, group_detections):
+        views = []
+        found = []
+        for i, detection in enumerate(group_detections):
+            if detection is None:
+                views.append({"index": i, "detected": False, "error": "decode failed"})
+            elif detection[1] is None:
+                views.append({"index": i, "detected": False})
+            else:
+                views.append({"index": i, "detected": True})
+                found.append(i)
+        if not found:
+            return {"views": views, "best": None}
+
+        corners = np.stack([group_detections[i][1] for i in found])
+        rvecs, tvecs, R, errors = solve_pnp_views(group["model"], objp, corners)
+        for j, i in enumerate(found):
+            views[i].update(
+                rotation_vector=rvecs[j].tolist(),
+                translation_vector=tvecs[j].tolist(),
+                rotation_matrix=R[j].tolist(),
+                reprojection_error=float(errors[j]),
+            )
+        return {"views": views, "best": found[int(np.argmin(errors))]}
+
+    offsets = np.cumsum([0] + [len(group["images"]) for group in groups])
+    with ThreadPoolExecutor(max_workers=max(1, len(groups))) as executor:
+        futures = [
+            executor.submit(solve_group, group, detections[offsets[k]:offsets[k + 1]])
+            for k, group in enumerate(groups)
+        ]
+        return {group["camera"]: future.result() for group, future in zip(groups, futures)}
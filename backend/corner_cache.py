@@ -0,0 +1,129 @@
+"""
+CalZero 코너 검출 결과 캐시
+
+같은 체커보드 이미지를 intrinsic / extrinsic / hand-eye 화면에서 다시 올리거나
+square size만 바꿔 다시 계산하는 경우가 많다. 코너 검출이 계산 시간의 대부분이므로
+(이미지 내용 해시, 보드 cols x rows) 를 키로 검출 결과를 디스크에 저장해 둔다.
+
+- 파일: <cache_dir>/<해시 앞 2자리>/<해시>_<cols>x<rows>.bin
+- 형식: 헤더(magic, cols, rows, width, height, found) + float32 코너 좌표 (cols*rows*2)
+- 적중 시 파일 mtime을 갱신하고, 전체 크기가 상한을 넘으면 mtime이 오래된 것부터 지운다 (LRU)
+- 여러 프로세스가 같이 써도 되도록 원자적으로 쓰고, 읽다가 사라진 파일은 미스로 취급한다
+"""
+
+import hashlib
+import os
+import struct
+import threading
+
+import numpy as np
+
+from storage import atomic_write_bytes
+
+CORNER_CACHE_MAX_MB = int(os.getenv("CALZERO_CORNER_CACHE_MB", "256"))
+
+_HEADER = struct.Struct("<4sHHIIB")
+_MAGIC = b"CZC1"
+
+
+def image_key(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class CornerCache:
+    """(이미지 해시, 보드 크기) -> (image_size, corners 또는 None)"""
+
+    def __init__(self, cache_dir, max_bytes=CORNER_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_size = None  # 처음 쓸 때 디렉토리를 한 번 훑어 계산
+
+    def _path(self, key, cols, rows):
+        return os.path.join(self.cache_dir, key[:2], f"{key}_{cols}x{rows}.bin")
+
+    def get(self, key, cols, rows):
+        """캐시된 검출 결과 (없으면 None)"""
+        path = self._path(key, cols, rows)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return self._decode(payload, cols, rows)
+
+    def put(self, key, cols, rows, detection):
+        """detect_corners() 결과 저장 (디코딩 실패(None)는 저장하지 않음)"""
+        if detection is None:
+            return
+        image_size, corners = detection
+        payload = _HEADER.pack(_MAGIC, cols, rows, image_size[0], image_size[1], corners is not None)
+        if corners is not None:
+            payload += np.ascontiguousarray(corners, dtype=np.float32).tobytes()
+        atomic_write_bytes(self._path(key, cols, rows), payload)
+        self._account(len(payload))
+
+    @staticmethod
+    def _decode(payload, cols, rows):
+        if len(payload) < _HEADER.size:
+            return None
+        magic, p_cols, p_rows, width, height, found = _HEADER.unpack_from(payload)
+        if magic != _MAGIC or (p_cols, p_rows) != (cols, rows):
+            return None
+        if not found:
+            return (width, height), None
+        corners = np.frombuffer(payload, dtype=np.float32, offset=_HEADER.size)
+        if corners.size != cols * rows * 2:
+            return None
+        return (width, height), corners.reshape(-1, 2)
+
+    # ---------- 크기 제한 ----------
+
+    def _scan(self):
+        """(mtime, size, path) 목록"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _account(self, added):
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = sum(size for _, size, _ in self._scan())
+            else:
+                self._approx_size += added
+            if self._approx_size > self.max_bytes:
+                self._approx_size = self._evict()
+
+    def _evict(self):
+        """오래 안 쓴 항목부터 지워 상한의 90% 아래로 (호출자가 _lock 보유)"""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._scan():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._approx_size = 0
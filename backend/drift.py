@@ -0,0 +1,293 @@
+"""
+CalZero 액추에이터 캘리브레이션 드리프트 감지
+
+장치별로 최근 캘리브레이션 WINDOW개의 관절별 homing_offset / range_min / range_max 시계열을 보고
+- 추세: 시간(일)에 대한 최소제곱 기울기와 t 통계량 -> 드리프트 속도 (step/일, step/캘리브레이션)
+- 변화점: 모든 분할 위치의 두 구간 평균 차이 t 통계량 중 최댓값 (한 번의 큰 이동, 예: 기어 미끄러짐)
+을 계산해 기준을 넘는 관절을 표시한다.
+
+여러 장치는 (장치, 관절, 항목, 시간) 배열 하나로 모아 누적합으로 한 번에 계산한다 (레코드별 루프 없음).
+새 캘리브레이션이 저장되면 그 장치만 다시 계산하고, 결과는 장치 컬렉션 버전과 함께
+data/.stats/drift.json 에 저장해 두었다가 버전이 같으면 그대로 돌려준다.
+"""
+
+import json
+import math
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from storage import LockRegistry, atomic_write_json
+
+DRIFT_SCHEMA = 1
+METRICS = ("homing_offset", "range_min", "range_max")
+JOINTS = ("shoulder_pan", "shoulder_lift", "elbow_flex", "wrist_flex", "wrist_roll", "gripper")
+
+# 장치별로 보는 최근 캘리브레이션 수
+WINDOW = int(os.getenv("CALZERO_DRIFT_WINDOW", "50"))
+
+# 판정 기준 (STS3215 4096 step/회전, 20 step ~ 1.8도)
+MIN_SHIFT = 20          # 이보다 작은 이동은 무시 (step)
+MIN_SEGMENT = 3         # 변화점 양쪽 구간의 최소 레코드 수
+MIN_TREND_POINTS = 5    # 추세를 보려면 필요한 레코드 수
+MIN_SPAN_DAYS = 1.0     # 이보다 짧은 기간이면 일 단위 속도 대신 캘리브레이션 순번 기준
+CHANGE_T = 5.0          # 변화점 t 통계량 기준
+TREND_T = 4.0           # 추세 t 통계량 기준
+NOISE_VAR = 4.0         # 분산 하한 (step^2, 재측정 잡음 ~2 step)
+
+TICKS_PER_REV = 4096
+
+
+# ==================== 계산 ====================
+
+def to_days(created_at):
+    """created_at (ISO 8601) -> epoch 일 (없거나 잘못된 값은 NaN)"""
+    try:
+        return datetime.fromisoformat(created_at).timestamp() / 86400.0
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def series_arrays(histories, joints=JOINTS):
+    """장치별 레코드 목록(오래된 순) -> (values (D, J, M, T), days (D, T), ids (D, T))
+
+    값이 없거나 숫자가 아니면 NaN, 레코드가 T개보다 적은 장치는 뒤를 NaN으로 채운다.
+    days는 장치의 첫 레코드 기준 경과 일수.
+    """
+    length = max((len(h) for h in histories), default=0)
+    values = np.full((len(histories), len(joints), len(METRICS), length), np.nan)
+    days = np.full((len(histories), length), np.nan)
+    ids = np.full((len(histories), length), -1, dtype=np.int64)
+    for d, records in enumerate(histories):
+        if not records:
+            continue
+        rows = [[[_metric(r, joint, m) for m in METRICS] for joint in joints] for r in records]
+        values[d, :, :, :len(records)] = np.asarray(rows, dtype=float).transpose(1, 2, 0)
+        stamps = np.array([to_days(r.get('created_at')) for r in records])
+        days[d, :len(records)] = stamps - np.nanmin(stamps) if np.isfinite(stamps).any() else stamps
+        ids[d, :len(records)] = [r.get('id', -1) for r in records]
+    return values, days, ids
+
+
+def _metric(record, joint, metric):
+    value = ((record.get('calibration_data') or {}).get(joint) or {}).get(metric)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return math.nan
+
+
+def _fit(x, t, mask):
+    """마스크된 최소제곱 직선 -> (기울기, t 통계량), 마지막 축이 시간"""
+    n = mask.sum(-1)
+    t = np.where(mask, t, 0.0)
+    t_mean = t.sum(-1) / n
+    x_mean = x.sum(-1) / n
+    dt = np.where(mask, t - t_mean[..., None], 0.0)
+    sxx = (dt * dt).sum(-1)
+    slope = (dt * np.where(mask, x - x_mean[..., None], 0.0)).sum(-1) / sxx
+    resid = np.where(mask, x - x_mean[..., None] - slope[..., None] * dt, 0.0)
+    var = np.maximum((resid * resid).sum(-1) / (n - 2), NOISE_VAR)
+    return slope, slope / np.sqrt(var / sxx)
+
+
+def detect(values, days):
+    """드리프트 판정 (values (..., T), days는 values에 브로드캐스트 가능한 (..., T))
+
+    반환: 배열 dict (모두 values.shape[:-1])
+        n, rate_per_day, rate_per_calibration, trend_t, trend,
+        change_index (분할 뒤 첫 위치, 없으면 -1), change_shift, change_t, change, flagged
+    """
+    mask = np.isfinite(values)
+    x = np.where(mask, values, 0.0)
+    n = mask.sum(-1)
+    position = np.cumsum(mask, axis=-1) - 1.0  # 유효 레코드 순번 (캘리브레이션 단위 기울기용)
+    days = np.broadcast_to(days, values.shape)
+    timed = mask & np.isfinite(days)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_day, t_day = _fit(x, np.where(timed, days, 0.0), timed)
+        rate_cal, t_cal = _fit(x, position, mask)
+
+        # 시간 정보가 없거나 기간이 너무 짧으면 캘리브레이션 순번 기준으로 판정
+        span = np.where(timed, days, -np.inf).max(-1) - np.where(timed, days, np.inf).min(-1)
+        short = ~(span >= MIN_SPAN_DAYS)
+        rate_day = np.where(short, np.nan, rate_day)
+        t_day = np.where(short, np.nan, t_day)
+        trend_t = np.where(np.isfinite(t_day), t_day, t_cal)
+        trend_t = np.nan_to_num(trend_t, nan=0.0, posinf=0.0, neginf=0.0)
+        total = np.abs(np.nan_to_num(rate_cal) * np.maximum(n - 1, 0))
+        trend = (n >= MIN_TREND_POINTS) & (np.abs(trend_t) >= TREND_T) & (total >= MIN_SHIFT)
+
+        # 변화점: k번째 유효 레코드 뒤에서 나눈 두 구간의 t 통계량
+        n1 = np.cumsum(mask, axis=-1)[..., :-1]
+        n2 = n[..., None] - n1
+        c = np.cumsum(x, axis=-1)[..., :-1]
+        q = np.cumsum(x * x, axis=-1)[..., :-1]
+        total_sum = x.sum(-1)[..., None]
+        total_sq = (x * x).sum(-1)[..., None]
+        mean1 = c / n1
+        mean2 = (total_sum - c) / n2
+        ss = (q - n1 * mean1 ** 2) + (total_sq - q - n2 * mean2 ** 2)
+        pooled = np.maximum(ss / (n[..., None] - 2), NOISE_VAR)
+        split_t = np.abs(mean2 - mean1) / np.sqrt(pooled * (1.0 / n1 + 1.0 / n2))
+        valid = mask[..., :-1] & (n1 >= MIN_SEGMENT) & (n2 >= MIN_SEGMENT)
+        split_t = np.where(valid, np.nan_to_num(split_t), 0.0)
+
+    if split_t.shape[-1]:
+        best = split_t.argmax(-1)
+        change_t = np.take_along_axis(split_t, best[..., None], -1)[..., 0]
+        change_shift = np.take_along_axis(mean2 - mean1, best[..., None], -1)[..., 0]
+    else:
+        best = np.zeros(values.shape[:-1], dtype=np.int64)
+        change_t = change_shift = np.zeros(values.shape[:-1])
+    change = (change_t >= CHANGE_T) & (np.abs(np.nan_to_num(change_shift)) >= MIN_SHIFT)
+
+    return {
+        "n": n,
+        "rate_per_day": rate_day,
+        "rate_per_calibration": rate_cal,
+        "trend_t": trend_t,
+        "trend": trend,
+        "change_index": np.where(change, best + 1, -1),
+        "change_shift": np.where(change, change_shift, 0.0),
+        "change_t": change_t,
+        "change": change,
+        "flagged": trend | change,
+    }
+
+
+def _number(value):
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def device_report(result, d, ids, joints=JOINTS):
+    """detect() 결과에서 장치 d의 관절별 응답 dict"""
+    report = {}
+    flagged = []
+    for j, joint in enumerate(joints):
+        metrics = {}
+        for m, metric in enumerate(METRICS):
+            index = (d, j, m)
+            n = int(result["n"][index])
+            if not n:
+                continue
+            change = None
+            if result["change"][index]:
+                # change_index는 배열 위치, 그 위치의 레코드 id를 돌려준다
+                position = int(result["change_index"][index])
+                change = {
+                    "record_id": int(ids[d, position]),
+                    "shift": _number(result["change_shift"][index]),
+                    "shift_deg": _number(result["change_shift"][index] * 360 / TICKS_PER_REV),
+                    "t": _number(result["change_t"][index]),
+                }
+            metrics[metric] = {
+                "n": n,
+                "rate_per_day": _number(result["rate_per_day"][index]),
+                "rate_per_calibration": _number(result["rate_per_calibration"][index]),
+                "trend_t": _number(result["trend_t"][index]),
+                "trend": bool(result["trend"][index]),
+                "change": change,
+                "flagged": bool(result["flagged"][index]),
+            }
+        if metrics:
+            report[joint] = metrics
+            if any(item["flagged"] for item in metrics.values()):
+                flagged.append(joint)
+    return report, flagged
+
+
+# ==================== 결과 저장소 ====================
+
+class DriftMonitor:
+    """장치별 드리프트 판정 결과 (장치 컬렉션 버전이 같으면 저장된 결과 사용)
+
+    history_source(device_id, limit) -> 최신순 레코드 목록
+    version_source(device_id) -> 장치 액추에이터 컬렉션 버전 문자열
+    """
+
+    def __init__(self, data_dir, history_source, version_source, window=WINDOW):
+        self.path = os.path.join(data_dir, ".stats", "drift.json")
+        self.window = window
+        self._locks = LockRegistry(os.path.join(data_dir, ".locks"), data_dir)
+        self._history_source = history_source
+        self._version_source = version_source
+        self._cache = None
+        self._cache_sig = None
+        self._guard = threading.Lock()
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return {"schema": DRIFT_SCHEMA, "devices": {}}
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._guard:
+            if self._cache_sig == sig:
+                return self._cache
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not data or data.get("schema") != DRIFT_SCHEMA:
+            data = {"schema": DRIFT_SCHEMA, "devices": {}}
+        with self._guard:
+            self._cache, self._cache_sig = data, sig
+        return data
+
+    def refresh(self, device_ids):
+        """장치들을 한 번에 다시 판정하고 저장 -> {device_id: 결과}"""
+        device_ids = list(device_ids)
+        if not device_ids:
+            return {}
+        versions = [self._version_source(device_id) for device_id in device_ids]
+        histories = [list(reversed(self._history_source(device_id, self.window))) for device_id in device_ids]
+        values, days, ids = series_arrays(histories)
+        result = detect(values, days[:, None, None, :])
+
+        entries = {}
+        for d, device_id in enumerate(device_ids):
+            joints, flagged = device_report(result, d, ids)
+            entries[device_id] = {
+                "device_id": device_id,
+                "version": versions[d],
+                "records": len(histories[d]),
+                "window": self.window,
+                "flagged_joints": flagged,
+                "joints": joints,
+            }
+
+        with self._locks(self.path):
+            data = json.loads(json.dumps(self._load()))
+            for device_id, entry in entries.items():
+                data["devices"][str(device_id)] = entry
+            atomic_write_json(self.path, data)
+        return entries
+
+    def devices(self, device_ids, prune=False):
+        """장치별 결과 (버전이 바뀐 장치만 한 번에 다시 판정)
+
+        prune=True면 device_ids에 없는 장치의 저장 결과는 지운다 (전체 조회 시).
+        """
+        device_ids = list(device_ids)
+        stored = self._load()["devices"]
+        results = {}
+        stale = []
+        for device_id in device_ids:
+            entry = stored.get(str(device_id))
+            if entry is not None and entry["version"] == self._version_source(device_id):
+                results[device_id] = entry
+            else:
+                stale.append(device_id)
+        results.update(self.refresh(stale))
+        if prune and set(stored) - {str(device_id) for device_id in device_ids}:
+            with self._locks(self.path):
+                data = json.loads(json.dumps(self._load()))
+                keep = {str(device_id) for device_id in device_ids}
+                data["devices"] = {k: v for k, v in data["devices"].items() if k in keep}
+                atomic_write_json(self.path, data)
+        return [results[device_id] for device_id in device_ids]
@@ -0,0 +1,169 @@
+"""
+CalZero 변경 이벤트 피드
+
+장치/캘리브레이션의 생성·수정·삭제·활성화를 순서 번호(seq)가 붙은 이벤트로 기록한다.
+/api/events (SSE)가 이 피드를 구독해 대시보드에 변경을 밀어준다.
+
+- 이벤트는 data/events.jsonl 에 한 줄씩 추가된다 (여러 워커 프로세스가 같은 파일 사용)
+- seq는 .sequences/events.seq 에서 발급하므로 재시작/정리 후에도 줄어들지 않는다
+- 구독자는 파일 끝을 따라 읽으므로 다른 워커가 기록한 이벤트도 받는다
+- 최근 CALZERO_EVENTS_KEEP개만 보관하고, 그보다 오래된 seq로 재개하면 resync가 필요하다
+"""
+
+import bisect
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from storage import LockRegistry, SequenceStore, atomic_write_bytes
+
+EVENTS_KEEP = int(os.getenv("CALZERO_EVENTS_KEEP", "10000"))
+
+EVENT_ACTIONS = ("create", "update", "delete", "activate", "reset")
+
+
+class ChangeFeed:
+    """파일 기반 변경 이벤트 로그
+
+    이벤트 형식:
+        {"seq": 12, "at": "...", "action": "create", "collection": "calibrations/device_7/handeye",
+         "device_id": 7, "id": 3, "record": {...}}
+    record는 create/update에만 들어간다.
+    """
+
+    def __init__(self, data_dir, keep=EVENTS_KEEP):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, "events.jsonl")
+        self.keep = keep
+        self._locks = LockRegistry(os.path.join(data_dir, ".locks"), data_dir)
+        self._sequences = SequenceStore(os.path.join(data_dir, ".sequences"))
+        # 파일 끝 추적 상태 (구독자 공용)
+        self._guard = threading.Lock()
+        self._ino = None
+        self._offset = 0
+        self._events = []
+        self._seqs = []
+
+    # ---------- 읽기 ----------
+
+    def _reset_tail(self):
+        self._ino = None
+        self._offset = 0
+        self._events = []
+        self._seqs = []
+
+    def _refresh(self):
+        """파일에서 새로 추가된 줄만 읽는다 (정리로 파일이 바뀌었으면 처음부터)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset_tail()
+            return
+        if st.st_ino != self._ino or st.st_size < self._offset:
+            self._reset_tail()
+            self._ino = st.st_ino
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return  # 아직 쓰는 중인 줄
+        for line in chunk[:end].split(b"\n"):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # 비정상 종료로 잘린 줄
+            if self._seqs and event["seq"] <= self._seqs[-1]:
+                continue
+            self._events.append(event)
+            self._seqs.append(event["seq"])
+        self._offset += end + 1
+
+    def last_seq(self):
+        """마지막 이벤트 번호 (이벤트가 없으면 0)"""
+        with self._guard:
+            self._refresh()
+            if self._seqs:
+                return self._seqs[-1]
+        return self._sequences.current("events") or 0
+
+    def oldest_seq(self):
+        """보관 중인 가장 오래된 이벤트 번호 (없으면 None)"""
+        with self._guard:
+            self._refresh()
+            return self._seqs[0] if self._seqs else None
+
+    def read_since(self, after_seq, device_id=None, limit=None):
+        """after_seq 이후 이벤트 (device_id가 있으면 해당 장치 이벤트와 전체 reset만)"""
+        with self._guard:
+            self._refresh()
+            start = bisect.bisect_right(self._seqs, after_seq)
+            events = self._events[start:]
+        if device_id is not None:
+            events = [e for e in events if e.get("device_id") in (device_id, None)]
+        return events[:limit] if limit else events
+
+    def can_resume(self, after_seq):
+        """after_seq 다음 이벤트부터 빠짐없이 보관 중인지"""
+        oldest = self.oldest_seq()
+        if oldest is None:
+            return after_seq >= self.last_seq()
+        return after_seq >= oldest - 1
+
+    # ---------- 쓰기 ----------
+
+    def publish(self, action, collection, device_id=None, record_id=None, record=None):
+        """이벤트 기록 후 반환"""
+        if action not in EVENT_ACTIONS:
+            raise ValueError(f"Unknown event action: {action}")
+        with self._locks(self.path):
+            seq = self._sequences.allocate("events", self._scan_last_seq)
+            event = {
+                "seq": seq,
+                "at": datetime.now(timezone.utc).isoformat(),
+                "action": action,
+                "collection": collection,
+                "device_id": device_id,
+                "id": record_id,
+            }
+            if record is not None:
+                event["record"] = record
+            line = json.dumps(event, ensure_ascii=False).encode('utf-8') + b"\n"
+
+            with open(self.path, 'ab+') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(size - 1)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line  # 잘린 줄은 읽을 때 건너뛴다
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+
+            if size > 4096 and seq % 256 == 0:
+                self._trim()
+        return event
+
+    def _scan_last_seq(self):
+        """시퀀스 파일이 없을 때 로그에서 마지막 seq 복구"""
+        with self._guard:
+            self._refresh()
+            return self._seqs[-1] if self._seqs else 0
+
+    def _trim(self):
+        """최근 keep개만 남기고 원자적으로 다시 쓴다 (호출자가 잠금 보유)"""
+        with self._guard:
+            self._refresh()
+            if len(self._events) <= self.keep:
+                return
+            kept = self._events[-self.keep:]
+            payload = b"".join(
+                json.dumps(e, ensure_ascii=False).encode('utf-8') + b"\n" for e in kept
+            )
+            atomic_write_bytes(self.path, payload)
+            self._reset_tail()
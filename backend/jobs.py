@@ -0,0 +1,350 @@
+"""
+CalZero 비동기 작업 큐 (외부 브로커 없음)
+
+무거운 계산(intrinsic / extrinsic / hand-eye 등)을 요청 핸들러 밖에서 실행한다.
+- 작업 레코드는 SQLite(data/jobs.sqlite3)에 저장하므로 여러 워커 프로세스가 같은 큐를 공유한다
+- 업로드 파일은 data/jobs/<id>/ 에 두고, 작업이 끝나면 지운다
+- 각 API 프로세스가 스레드 풀로 대기 작업을 가져가 실행한다 (가져가기는 원자적)
+- 진행률은 레코드에 기록되어 /api/jobs/{id}/events 로 스트리밍된다
+- 취소는 플래그로 요청하고, 실행 중인 작업은 다음 진행률 보고 시점에 멈춘다
+- 실행 중인 작업은 담당 프로세스가 주기적으로 updated_at을 갱신한다(리스).
+  리스가 만료된 작업은 어느 호스트의 것이든 다시 대기열로 돌린다
+"""
+
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+JOB_WORKERS = int(os.getenv("CALZERO_JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = 0.5
+JOB_LEASE_SECONDS = float(os.getenv("CALZERO_JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_INTERVAL = JOB_LEASE_SECONDS / 4
+
+JOB_STATUSES = ("staging", "queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    device_id INTEGER,
+    params TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_device ON jobs (device_id, id);
+"""
+
+
+class JobCancelled(Exception):
+    """취소 요청을 받은 작업이 중단될 때 발생"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobContext:
+    """작업 핸들러에 전달되는 실행 정보"""
+
+    def __init__(self, queue, job, input_dir):
+        self._queue = queue
+        self.id = job["id"]
+        self.kind = job["kind"]
+        self.device_id = job["device_id"]
+        self.params = job["params"]
+        self.input_dir = input_dir
+
+    def inputs(self):
+        """제출 시 저장한 입력 파일 내용 (저장 순서대로)"""
+        names = sorted(os.listdir(self.input_dir)) if os.path.isdir(self.input_dir) else []
+        payloads = []
+        for name in names:
+            with open(os.path.join(self.input_dir, name), 'rb') as f:
+                payloads.append(f.read())
+        return payloads
+
+    def check_cancelled(self):
+        if self._queue.cancel_requested(self.id):
+            raise JobCancelled()
+
+    def progress(self, done, total, message=None, **extra):
+        """진행률 기록 (취소 요청이 있으면 JobCancelled)"""
+        self._queue.set_progress(self.id, {"done": done, "total": total, "message": message, **extra})
+        self.check_cancelled()
+
+
+class JobQueue:
+    def __init__(self, data_dir, workers=JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS):
+        self.db_path = os.path.join(data_dir, "jobs.sqlite3")
+        self.files_dir = os.path.join(data_dir, "jobs")
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers = {}
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    # ---------- DB ----------
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def prepare(self):
+        self._conn().executescript(SCHEMA)
+        self._recover_orphans()
+
+    @staticmethod
+    def _row_to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("params", "progress", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def _input_dir(self, job_id):
+        return os.path.join(self.files_dir, str(job_id))
+
+    # ---------- 제출 / 조회 ----------
+
+    def register(self, kind, handler):
+        """handler(ctx: JobContext) -> 결과 dict"""
+        self._handlers[kind] = handler
+
+    def submit(self, kind, params, device_id=None, inputs=()):
+        """작업 등록 후 레코드 반환 (inputs: 파일 내용 bytes 목록)"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self._write() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (kind, status, device_id, params, created_at, updated_at) "
+                "VALUES (?, 'staging', ?, ?, ?, ?)",
+                (kind, device_id, json.dumps(params, ensure_ascii=False), _now(), time.time()),
+            )
+            job_id = cur.lastrowid
+
+        # 입력 파일을 모두 쓴 뒤에 대기열에 올린다
+        if inputs:
+            input_dir = self._input_dir(job_id)
+            os.makedirs(input_dir, exist_ok=True)
+            for i, payload in enumerate(inputs):
+                with open(os.path.join(input_dir, f"{i:05d}.bin"), 'wb') as f:
+                    f.write(payload)
+        with self._write() as conn:
+            conn.execute("UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ?", (time.time(), job_id))
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def list(self, device_id=None, status=None, limit=50):
+        """최근 작업 목록 (최신순)"""
+        clauses, params = ["status != 'staging'"], []
+        if device_id is not None:
+            clauses.append("device_id = ?")
+            params.append(device_id)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        rows = self._conn().execute(
+            f"SELECT * FROM jobs WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?", params + [limit]
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """취소 요청 (대기 중이면 바로 취소, 실행 중이면 다음 진행률 보고 때 중단)"""
+        with self._write() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "queued":
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?, updated_at = ? "
+                    "WHERE id = ?", (_now(), time.time(), job_id),
+                )
+            elif row["status"] == "running":
+                conn.execute("UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?",
+                             (time.time(), job_id))
+        if row["status"] == "queued":
+            self._remove_inputs(job_id)
+        return self.get(job_id)
+
+    def cancel_requested(self, job_id):
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def set_progress(self, job_id, progress):
+        with self._write() as conn:
+            conn.execute("UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                         (json.dumps(progress, ensure_ascii=False), time.time(), job_id))
+
+    # ---------- 실행 ----------
+
+    def _claim(self):
+        """대기 중인 가장 오래된 작업 하나를 이 프로세스가 가져간다"""
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                (self.worker_id, _now(), time.time(), row["id"]),
+            )
+        return self._row_to_job(row)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        """작업 종료 기록 (리스를 잃어 다른 프로세스가 가져간 작업이면 건드리지 않는다)"""
+        with self._write() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, _now(), time.time(), job_id, self.worker_id),
+            )
+        if cur.rowcount:
+            self._remove_inputs(job_id)
+
+    def _remove_inputs(self, job_id):
+        shutil.rmtree(self._input_dir(job_id), ignore_errors=True)
+
+    def _run(self, job):
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            self._finish(job["id"], "failed", error=f"No handler for job kind: {job['kind']}")
+            return
+        ctx = JobContext(self, job, self._input_dir(job["id"]))
+        try:
+            ctx.check_cancelled()
+            result = handler(ctx)
+        except JobCancelled:
+            self._finish(job["id"], "cancelled")
+        except Exception as e:
+            print(f"❌ Job {job['id']} ({job['kind']}) failed: {e}")
+            self._finish(job["id"], "failed", error=str(e))
+        else:
+            self._finish(job["id"], "succeeded", result=result)
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.OperationalError:
+                job = None
+            if job is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _heartbeat_loop(self):
+        """실행 중인 자기 작업의 리스를 갱신하고, 만료된 리스는 회수한다"""
+        while not self._stop.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                with self._write() as conn:
+                    conn.execute("UPDATE jobs SET updated_at = ? WHERE status = 'running' AND worker = ?",
+                                 (time.time(), self.worker_id))
+                self._requeue_expired()
+            except sqlite3.OperationalError:
+                continue
+
+    def _requeue_expired(self):
+        """리스(updated_at)가 만료된 실행 중 작업을 다시 대기열로"""
+        now = time.time()
+        with self._write() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ?", (now, now - self.lease_seconds),
+            )
+        if cur.rowcount:
+            self._wakeup.set()
+
+    def _recover_orphans(self):
+        """실행 중 상태로 남았지만 담당 프로세스가 없는 작업을 다시 대기열로"""
+        host = socket.gethostname()
+        with self._write() as conn:
+            rows = conn.execute("SELECT id, worker FROM jobs WHERE status = 'running'").fetchall()
+            for row in rows:
+                worker_host, _, pid = (row["worker"] or "").rpartition(":")
+                # 재시작 후 같은 호스트명/PID를 다시 받은 경우도 아직 아무것도 실행하지 않았으므로 고아다
+                orphaned = row["worker"] == self.worker_id or (
+                    worker_host == host and pid.isdigit() and not _pid_alive(int(pid)))
+                if orphaned:
+                    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? WHERE id = ?",
+                                 (time.time(), row["id"]))
+            # 입력 파일을 쓰다가 죽은 작업
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'submission interrupted', finished_at = ? "
+                "WHERE status = 'staging' AND updated_at < ?", (_now(), time.time() - 3600),
+            )
+        # 다른 호스트(재배포 전 컨테이너 등)가 남긴 작업은 리스로 판단한다
+        self._requeue_expired()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"calzero-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat_loop, name="calzero-job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._threads = []
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,338 @@
+"""
+CalZero 정기구학 (SO101 URDF)
+
+HandEyeCalculation.jsx에서 올리던 URDF를 서버에서 한 번 파싱해 관절 체인으로 만들어 두고,
+관절 샘플 여러 개의 TCP 포즈를 NumPy 배치 연산으로 계산한다 (샘플별 루프 없음).
+
+- URDF 원문은 <cache_dir>/<sha256>.urdf 에 저장하고 파싱한 체인은 (해시, tip) 별로 메모리 LRU
+- 서보 step -> 관절 각도는 LeRobot SO101 (Feetech STS3215) 규칙을 따른다
+    각도(deg) = (step - (range_min + range_max) / 2) * 360 / 4095, drive_mode=1 이면 부호 반대
+  즉 URDF 영점 = 캘리브레이션 범위의 가운데. raw=True면 서보 내부 homing_offset이 적용되기 전
+  엔코더 값으로 보고 homing_offset을 먼저 뺀다 (Present_Position = 엔코더 - Homing_Offset)
+- 결과 위치 단위는 mm, 회전은 회전 벡터 (rad) -> /api/calibrations/handeye/solve 의 robot_poses 형식
+"""
+
+import hashlib
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+import numpy as np
+
+from calibration_engine import rodrigues_batch
+from storage import atomic_write_bytes
+
+JOINTS = ("shoulder_pan", "shoulder_lift", "elbow_flex", "wrist_flex", "wrist_roll", "gripper")
+
+# STS3215 한 바퀴 분해능 (LeRobot degrees 모드와 같은 4095)
+TICKS_MAX_RES = 4095
+
+CHAIN_CACHE_SIZE = 16
+MAX_URDF_BYTES = 4 * 1024 * 1024
+
+MOVING_TYPES = ("revolute", "continuous", "prismatic")
+UNITS = ("ticks", "deg", "rad")
+
+
+class KinematicsError(ValueError):
+    """URDF / 관절 입력 오류 (API에서 422로 변환)"""
+
+
+# ==================== URDF ====================
+
+def _floats(text, default, name):
+    if text is None:
+        return np.array(default, dtype=np.float64)
+    try:
+        values = np.array([float(v) for v in text.split()], dtype=np.float64)
+    except ValueError as e:
+        raise KinematicsError(f"Invalid {name}: {text!r}") from e
+    if values.shape != (3,):
+        raise KinematicsError(f"Invalid {name}: {text!r}")
+    return values
+
+
+def rpy_matrix(roll, pitch, yaw):
+    """URDF rpy -> 회전 행렬 (R = Rz(yaw)·Ry(pitch)·Rx(roll))"""
+    cr, sr = math.cos(roll), math.sin(roll)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cy, sy = math.cos(yaw), math.sin(yaw)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ])
+
+
+class KinematicChain:
+    """base 링크 -> tip 링크 관절 체인
+
+    origins (K, 4, 4): 관절별 부모 -> 관절 고정 변환 (fixed 관절은 앞 관절에 합쳐 둔다)
+    axes (K, 3), kinds: 움직이는 관절의 축 / 종류, names: 관절 이름, tip_offset: 마지막 관절 -> tip
+    """
+
+    __slots__ = ("base", "tip", "names", "kinds", "axes", "origins", "tip_offset", "limits")
+
+    def __init__(self, base, tip, names, kinds, axes, origins, tip_offset, limits):
+        self.base = base
+        self.tip = tip
+        self.names = names
+        self.kinds = kinds
+        self.axes = axes
+        self.origins = origins
+        self.tip_offset = tip_offset
+        self.limits = limits
+
+    def describe(self):
+        return {
+            "base": self.base,
+            "tip": self.tip,
+            "joints": [
+                {"name": name, "type": kind, "axis": axis.tolist(),
+                 "limit": None if limit is None else list(limit)}
+                for name, kind, axis, limit in zip(self.names, self.kinds, self.axes, self.limits)
+            ],
+        }
+
+
+def parse_urdf(text, tip=None):
+    """URDF 문자열 -> KinematicChain (tip이 없으면 base에서 가장 깊은 링크)"""
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError as e:
+        raise KinematicsError(f"Invalid URDF: {e}") from e
+    if root.tag != "robot":
+        raise KinematicsError("Invalid URDF: root element must be <robot>")
+
+    joints = {}
+    for element in root.findall("joint"):
+        parent = element.find("parent")
+        child = element.find("child")
+        if parent is None or child is None:
+            raise KinematicsError(f"Joint {element.get('name')!r} has no parent/child")
+        origin = element.find("origin")
+        xyz = _floats(origin.get("xyz") if origin is not None else None, (0, 0, 0), "origin xyz")
+        rpy = _floats(origin.get("rpy") if origin is not None else None, (0, 0, 0), "origin rpy")
+        axis = element.find("axis")
+        axis = _floats(axis.get("xyz") if axis is not None else None, (1, 0, 0), "axis")
+        norm = np.linalg.norm(axis)
+        limit = element.find("limit")
+        transform = np.eye(4)
+        transform[:3, :3] = rpy_matrix(*rpy)
+        transform[:3, 3] = xyz
+        joints[child.get("link")] = {
+            "name": element.get("name"),
+            "type": element.get("type", "fixed"),
+            "parent": parent.get("link"),
+            "origin": transform,
+            "axis": axis / norm if norm > 0 else np.array([1.0, 0, 0]),
+            "limit": (float(limit.get("lower", 0)), float(limit.get("upper", 0)))
+            if limit is not None and limit.get("lower") is not None else None,
+        }
+    if not joints:
+        raise KinematicsError("URDF has no joints")
+
+    links = {link.get("name") for link in root.findall("link")}
+    bases = (links | {j["parent"] for j in joints.values()}) - set(joints)
+    if len(bases) != 1:
+        raise KinematicsError(f"URDF must have exactly one root link, found {sorted(bases)}")
+    base = bases.pop()
+
+    def depth(link):
+        d = 0
+        while link in joints:
+            link = joints[link]["parent"]
+            d += 1
+            if d > len(joints):
+                raise KinematicsError("URDF joint graph has a cycle")
+        return d
+
+    if tip is None:
+        tip = max(sorted(joints), key=depth)
+    elif tip not in joints:
+        raise KinematicsError(f"Unknown tip link {tip!r}")
+
+    path = []
+    link = tip
+    while link in joints:
+        path.append(joints[link])
+        link = joints[link]["parent"]
+        if len(path) > len(joints):
+            raise KinematicsError("URDF joint graph has a cycle")
+    path.reverse()
+
+    # 고정 관절은 다음 움직이는 관절의 원점 변환에 합친다
+    names, kinds, axes, origins, limits = [], [], [], [], []
+    pending = np.eye(4)
+    for joint in path:
+        pending = pending @ joint["origin"]
+        if joint["type"] not in MOVING_TYPES:
+            if joint["type"] != "fixed":
+                raise KinematicsError(f"Unsupported joint type {joint['type']!r} ({joint['name']})")
+            continue
+        names.append(joint["name"])
+        kinds.append(joint["type"])
+        axes.append(joint["axis"])
+        origins.append(pending)
+        limits.append(joint["limit"])
+        pending = np.eye(4)
+    return KinematicChain(base, tip, names, kinds, np.array(axes).reshape(-1, 3),
+                          np.array(origins).reshape(-1, 4, 4), pending, limits)
+
+
+# ==================== URDF 저장소 ====================
+
+class UrdfStore:
+    """올린 URDF 원문 (디스크) + 파싱한 체인 (메모리 LRU)"""
+
+    def __init__(self, cache_dir, cache_size=CHAIN_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self._chains = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, urdf_id):
+        if len(urdf_id) != 64 or any(c not in "0123456789abcdef" for c in urdf_id):
+            raise KinematicsError("Invalid urdf_id")
+        return os.path.join(self.cache_dir, f"{urdf_id}.urdf")
+
+    def add(self, data, tip=None):
+        """URDF 저장 + 파싱 -> (urdf_id, chain)"""
+        if len(data) > MAX_URDF_BYTES:
+            raise KinematicsError("URDF is too large")
+        urdf_id = hashlib.sha256(data).hexdigest()
+        chain = self._parse(urdf_id, data, tip)
+        path = self._path(urdf_id)
+        if not os.path.exists(path):
+            atomic_write_bytes(path, data)
+        return urdf_id, chain
+
+    def chain(self, urdf_id, tip=None):
+        """저장된 URDF의 체인 (없으면 None)"""
+        key = (urdf_id, tip)
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                self._chains.move_to_end(key)
+                return chain
+        try:
+            with open(self._path(urdf_id), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        return self._parse(urdf_id, data, tip)
+
+    def _parse(self, urdf_id, data, tip):
+        key = (urdf_id, tip)
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                self._chains.move_to_end(key)
+                return chain
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise KinematicsError("URDF must be UTF-8 text") from e
+        chain = parse_urdf(text, tip)
+        with self._lock:
+            self._chains[key] = chain
+            while len(self._chains) > self.cache_size:
+                self._chains.popitem(last=False)
+        return chain
+
+
+# ==================== 관절 값 변환 ====================
+
+def ticks_to_radians(ticks, calibration_data, joint_names, raw=False):
+    """서보 step (N, J) -> 관절 각도 rad (N, J), joint_names 순서로 캘리브레이션 적용"""
+    ticks = np.asarray(ticks, dtype=np.float64)
+    offset = np.zeros(len(joint_names))
+    middle = np.zeros(len(joint_names))
+    sign = np.ones(len(joint_names))
+    for j, name in enumerate(joint_names):
+        calib = (calibration_data or {}).get(name)
+        if not isinstance(calib, dict) or calib.get("range_min") is None or calib.get("range_max") is None:
+            raise KinematicsError(f"Actuator calibration has no range for joint {name!r}")
+        offset[j] = calib.get("homing_offset") or 0
+        middle[j] = (calib["range_min"] + calib["range_max"]) / 2
+        sign[j] = -1.0 if calib.get("drive_mode") else 1.0
+    if raw:
+        ticks = ticks - offset
+    return np.radians((ticks - middle) * 360.0 / TICKS_MAX_RES * sign)
+
+
+def joint_positions(samples, chain, units="rad", sample_names=JOINTS, calibration_data=None, raw=False):
+    """샘플 (N, len(sample_names)) -> 체인 관절 순서의 값 (N, K) (rad / m)
+
+    체인 관절 이름을 sample_names에서 찾는다 (gripper처럼 체인에 없는 관절은 무시).
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim != 2 or samples.shape[1] != len(sample_names):
+        raise KinematicsError(f"Each sample must have {len(sample_names)} values ({', '.join(sample_names)})")
+    if not np.isfinite(samples).all():
+        raise KinematicsError("Samples must be finite numbers")
+    index = {name: i for i, name in enumerate(sample_names)}
+    missing = [name for name in chain.names if name not in index]
+    if missing:
+        raise KinematicsError(f"Samples have no values for chain joints {missing}")
+    columns = [index[name] for name in chain.names]
+    values = samples[:, columns]
+    if units == "ticks":
+        values = ticks_to_radians(values, calibration_data, chain.names, raw=raw)
+    elif units == "deg":
+        values = np.radians(values)
+    elif units != "rad":
+        raise KinematicsError(f"units must be one of {', '.join(UNITS)}")
+    # prismatic 관절은 rad가 아니라 m 그대로 (ticks/deg 변환 대상 아님)
+    for k, kind in enumerate(chain.kinds):
+        if kind == "prismatic":
+            values[:, k] = samples[:, columns[k]]
+    return values
+
+
+# ==================== 정기구학 ====================
+
+def forward_kinematics(chain, q):
+    """관절 값 (N, K) -> base 기준 tip 변환 (N, 4, 4), 단위 m"""
+    q = np.asarray(q, dtype=np.float64).reshape(-1, len(chain.names))
+    T = np.broadcast_to(np.eye(4), (len(q), 4, 4)).copy()
+    motion = np.broadcast_to(np.eye(4), (len(q), 4, 4)).copy()
+    for k, kind in enumerate(chain.kinds):
+        if kind == "prismatic":
+            motion[:, :3, :3] = np.eye(3)
+            motion[:, :3, 3] = q[:, k, None] * chain.axes[k]
+        else:
+            motion[:, :3, :3] = rodrigues_batch(q[:, k, None] * chain.axes[k])
+            motion[:, :3, 3] = 0.0
+        T = T @ chain.origins[k] @ motion
+    return T @ chain.tip_offset
+
+
+def rotation_vectors(R):
+    """회전 행렬 (N, 3, 3) -> 회전 벡터 (N, 3) (rad)"""
+    R = np.asarray(R, dtype=np.float64)
+    theta = np.arccos(np.clip((np.trace(R, axis1=-2, axis2=-1) - 1) / 2, -1.0, 1.0))
+    w = np.stack([R[:, 2, 1] - R[:, 1, 2], R[:, 0, 2] - R[:, 2, 0], R[:, 1, 0] - R[:, 0, 1]], axis=1)
+    sin = np.sin(theta)
+    rvec = np.zeros((len(R), 3))
+    regular = (sin > 1e-9) & (theta < math.pi - 1e-3)
+    rvec[regular] = w[regular] * (theta[regular] / (2 * sin[regular]))[:, None]
+    # 180도 근처: (R + Rᵀ)/2 = 2aaᵀ - I 에서 축 a를 구한다 (부호는 w 방향으로)
+    near_pi = theta >= math.pi - 1e-3
+    if near_pi.any():
+        M = (R[near_pi] + np.transpose(R[near_pi], (0, 2, 1))) / 4 + np.eye(3) / 2
+        rows = np.arange(len(M))
+        big = np.diagonal(M, axis1=1, axis2=2).argmax(axis=1)
+        axis = M[rows, big] / np.sqrt(np.clip(M[rows, big, big], 1e-12, None))[:, None]
+        axis /= np.linalg.norm(axis, axis=1, keepdims=True)
+        axis *= np.where((axis * w[near_pi]).sum(axis=1) < 0, -1.0, 1.0)[:, None]
+        rvec[near_pi] = axis * theta[near_pi][:, None]
+    return rvec
+
+
+def tcp_poses(chain, q):
+    """관절 값 (N, K) -> (translation mm (N, 3), rotation vector rad (N, 3), 변환 (N, 4, 4))"""
+    T = forward_kinematics(chain, q)
+    return T[:, :3, 3] * 1000.0, rotation_vectors(T[:, :3, :3]), T
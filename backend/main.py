@@ -1,16 +1,37 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+import asyncio
+import base64
 import bcrypt
+import hashlib
 import jwt
 import json
+import numpy as np
 import os
-import shutil
+
+import analysis
+import backup
+import calibration_engine
+import kinematics
+from analysis import AnalysisError
+from actuator_stats import ActuatorStats, scope_key, summarize_scope
+from analysis_store import DatasetAnalysisStore
+from calibration_engine import CalibrationError
+from corner_cache import CornerCache
+from drift import DriftMonitor
+from events import ChangeFeed
+from jobs import FINISHED_STATUSES, JobQueue
+from kinematics import KinematicsError, UrdfStore
+from replay_analysis import ReplayAnalysisCache
+from storage import CorruptDataError, DuplicateRecordError, collection_name, create_storage, record_sort_key
+from workers import web_concurrency
 
 # ==================== Config ====================
 
@@ -19,11 +40,65 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
 
 # 데이터 디렉토리 구조
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.join(BASE_DIR, "data")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 DEVICES_FILE = os.path.join(DATA_DIR, "devices.json")
 CALIBRATIONS_DIR = os.path.join(DATA_DIR, "calibrations")
 
+# 예전 단일 파일 DB (SQLite 마이그레이션 대상)
+LEGACY_DB_FILE = os.path.join(BASE_DIR, "calzero_db.json")
+
+# 저장소 백엔드 (CALZERO_STORAGE=json | sqlite)
+storage = create_storage(DATA_DIR, legacy_db_path=LEGACY_DB_FILE)
+
+# 변경 이벤트 피드 (/api/events)
+change_feed = ChangeFeed(DATA_DIR)
+EVENTS_POLL_INTERVAL = float(os.getenv("CALZERO_EVENTS_POLL_INTERVAL", "0.5"))
+EVENTS_KEEPALIVE = 15.0
+
+# 계산 작업 큐 (/api/jobs)
+job_queue = JobQueue(DATA_DIR)
+
+# 코너 검출 결과 캐시 (이미지 해시 + 보드 크기)
+calibration_engine.configure_corner_cache(CornerCache(os.path.join(DATA_DIR, ".corners")))
+
+# 서버에 마운트된 LeRobot 데이터셋 루트 (/api/analysis 의 path는 이 아래만 허용)
+DATASET_ROOT = os.getenv("CALZERO_DATASET_ROOT", os.path.join(DATA_DIR, "datasets"))
+
+# 데이터셋별 고해상도 누적 결과 (캘리브레이션 / bins를 바꿔도 다시 읽지 않음)
+analysis_store = DatasetAnalysisStore(os.path.join(DATA_DIR, ".analysis"))
+
+# 장치별 리플레이 테스트 분석 결과 (/api/replay-tests/analytics)
+replay_analysis_cache = ReplayAnalysisCache()
+
+# 올린 URDF (내용 해시별) + 파싱한 관절 체인 (/api/kinematics)
+urdf_store = UrdfStore(os.path.join(DATA_DIR, ".kinematics"))
+
+
+def actuator_stats_source():
+    """액추에이터 통계 전체 재계산용 (device_id, 장치 종류, calibration_data)"""
+    types = {d['id']: d.get('type') for d in load_json(DEVICES_FILE, [])}
+    for record in storage.query_fleet("actuator"):
+        device_id = record.get('device_id')
+        yield device_id, types.get(device_id) or "unknown", record.get('calibration_data')
+
+
+def actuator_stats_version():
+    """집계 기준 버전 (전체 장치 actuator 파일 태그 + 장치 목록, 장치 종류가 범위를 정하므로)"""
+    return f"{storage.fleet_version('actuator')[0]}/{storage.version(DEVICES_FILE)[0]}"
+
+
+# 액추에이터 캘리브레이션 누적 통계 (/api/calibrations/actuator/stats)
+actuator_stats = ActuatorStats(DATA_DIR, actuator_stats_source, actuator_stats_version)
+
+# 액추에이터 캘리브레이션 드리프트 판정 (/api/calibrations/actuator/drift)
+drift_monitor = DriftMonitor(
+    DATA_DIR,
+    lambda device_id, limit: storage.query(get_calib_file(device_id, "actuator"), limit=limit),
+    lambda device_id: storage.version(get_calib_file(device_id, "actuator"))[0],
+)
+
 security = HTTPBearer(auto_error=False)
 
 # 한국 시간대 (KST = UTC+9)
@@ -43,23 +118,16 @@ def ensure_data_dirs():
 
 
 def load_json(filepath, default=None):
-    """JSON 파일 로드"""
+    """컬렉션 로드 (저장소 백엔드 사용, 리스트는 얕은 복사본 반환)"""
     if default is None:
         default = []
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return default
-    return default
+    data = storage.load(filepath, default)
+    return list(data) if isinstance(data, list) else data
 
 
 def save_json(filepath, data):
-    """JSON 파일 저장"""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """컬렉션 저장 (저장소 백엔드 사용)"""
+    storage.save(filepath, data)
 
 
 def get_device_calib_dir(device_id: int):
@@ -72,11 +140,149 @@ def get_calib_file(device_id: int, calib_type: str):
     return os.path.join(get_device_calib_dir(device_id), f"{calib_type}.json")
 
 
-def get_next_id(items: list):
-    """다음 ID 생성"""
-    if not items:
-        return 1
-    return max(item.get('id', 0) for item in items) + 1
+def get_device_type(device_id: int) -> str:
+    """장치 종류 (so101_follower, alice_m1, ...), 장치가 없으면 unknown"""
+    device = storage.get(DEVICES_FILE, device_id)
+    return (device or {}).get('type') or "unknown"
+
+
+def list_calibrations(calib_type: str, device_id: Optional[int] = None, camera: Optional[str] = None,
+                      before=None, limit: Optional[int] = None, since: Optional[str] = None):
+    """캘리브레이션 목록 (최신순, device_id가 없으면 전체 장치 인덱스 사용)"""
+    if device_id:
+        return storage.query(get_calib_file(device_id, calib_type), camera=camera,
+                             before=before, limit=limit, since=since)
+    return storage.query_fleet(calib_type, camera=camera, before=before, limit=limit, since=since)
+
+
+def publish_change(action: str, filepath: Optional[str], device_id: Optional[int] = None,
+                   record_id: Optional[int] = None, record: Optional[dict] = None):
+    """변경 이벤트 기록 (filepath가 없으면 전체 대상, 예: reset)"""
+    collection = collection_name(filepath, DATA_DIR) if filepath else None
+    change_feed.publish(action, collection, device_id, record_id, record)
+
+
+def store_calibration(device_id: int, calib_type: str, data: dict, activate_scope: Optional[str] = None) -> dict:
+    """캘리브레이션 결과 저장 + 변경 이벤트
+
+    activate_scope가 있고 is_active면 같은 값의 기존 active를 같은 쓰기에서 해제하고 activate 이벤트도 보낸다
+    """
+    data['created_at'] = get_kst_now().isoformat()
+    filepath = get_calib_file(device_id, calib_type)
+    created = storage.insert(filepath, data, activate_scope=activate_scope)
+    publish_change("create", filepath, device_id, created['id'], created)
+    if activate_scope and created.get('is_active'):
+        publish_change("activate", filepath, device_id, created['id'])
+    return created
+
+
+# ==================== 조건부 GET (ETag / Last-Modified) ====================
+
+# 응답 형식이 바뀌면 올려서 기존 ETag를 무효화
+ETAG_SCHEMA = "1"
+
+
+def make_etag(version_tag: str, request: Request, vary: str = "") -> str:
+    """저장소 버전 + 요청 URL로 강한 ETag 생성 (같은 버전, 같은 쿼리면 같은 본문)"""
+    key = f"{ETAG_SCHEMA}|{version_tag}|{request.url.path}?{request.url.query}|{vary}"
+    return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[float]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP 날짜는 초 단위
+    return int(last_modified) <= since
+
+
+def conditional_get(request: Request, response: Response, version, build, vary: str = ""):
+    """조건부 GET 공통 처리
+
+    version은 storage.version()/fleet_version()의 (tag, last_modified).
+    클라이언트가 가진 ETag와 같으면 본문을 만들지 않고 304를 반환한다.
+    버전을 본문보다 먼저 읽으므로, 그 사이에 쓰기가 있어도 다음 요청에서 새 본문을 받는다.
+    """
+    tag, last_modified = version
+    headers = {"ETag": make_etag(tag, request, vary), "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if vary:
+        headers["Vary"] = "Authorization"
+
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, headers["ETag"]) or (
+            if_none_match is None
+            and not_modified_since(request.headers.get("if-modified-since"), last_modified)):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return build()
+
+
+# ==================== 목록 페이지네이션 ====================
+
+def encode_cursor(item: dict) -> str:
+    """마지막 레코드의 정렬 키를 불투명한 커서 문자열로 변환"""
+    raw = json.dumps(list(record_sort_key(item)), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """커서 문자열 -> (created_at, device_id, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, device_id, record_id = json.loads(raw)
+        return str(created_at), int(device_id), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def project_fields(items: list, fields: Optional[str]):
+    """fields=id,created_at,... 에 지정된 필드만 남긴다"""
+    if not fields:
+        return items
+    keys = [f.strip() for f in fields.split(',') if f.strip()]
+    return [{k: item[k] for k in keys if k in item} for item in items]
+
+
+def page_calibrations(request: Request, response: Response, calib_type: str, device_id: Optional[int],
+                      camera: Optional[str], limit: Optional[int], cursor: Optional[str], fields: Optional[str],
+                      since: Optional[str] = None, until: Optional[str] = None):
+    """목록 조회 공통 처리 (created_at 기준 커서 페이지네이션 + 기간 필터 + 필드 선택)
+
+    limit이 없으면 기존처럼 전체 목록을 반환한다.
+    다음 페이지가 있으면 X-Next-Cursor 헤더로 커서를 돌려준다.
+    since <= created_at < until (ISO 8601 문자열 비교)
+    컬렉션 버전이 그대로면 304 (conditional_get)
+    """
+    before = decode_cursor(cursor) if cursor else None
+    if until and (before is None or (until,) < before):
+        before = (until,)
+    if device_id:
+        version = storage.version(get_calib_file(device_id, calib_type))
+    else:
+        version = storage.fleet_version(calib_type)
+
+    def build():
+        items = list_calibrations(calib_type, device_id, camera, before=before,
+                                  limit=limit + 1 if limit else None, since=since)
+        if limit and len(items) > limit:
+            items = items[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(items[-1])
+        return project_fields(items, fields)
+
+    return conditional_get(request, response, version, build)
 
 
 # ==================== Pydantic Schemas ====================
@@ -178,6 +384,44 @@ class HandEyeCalibrationCreate(BaseModel):
     notes: str = ""
 
 
+class PoseInput(BaseModel):
+    rotation: List[float]      # 회전 벡터 [rx, ry, rz] (rad) 또는 3x3 회전 행렬 (9개 값, 행 우선)
+    translation: List[float]   # [x, y, z] (mm)
+
+
+class HandEyeSolveRequest(BaseModel):
+    device_id: int
+    camera: str
+    type: str = "eye-in-hand"
+    intrinsic_id: Optional[int] = None
+    robot_poses: List[PoseInput]    # gripper -> base (TCP)
+    target_poses: List[PoseInput]   # target -> camera (보드 검출)
+    methods: Optional[List[str]] = None   # tsai, park, horaud, daniilidis (기본: 전부)
+    save: bool = True
+    is_active: bool = True
+    notes: str = ""
+
+
+class DatasetAnalysisRequest(BaseModel):
+    device_id: int
+    path: str                              # CALZERO_DATASET_ROOT 기준 데이터셋 디렉토리 (또는 parquet 파일)
+    calibration_id: Optional[int] = None   # 기준 actuator 캘리브레이션 (기본: 최신)
+    bins: int = Field(analysis.DEFAULT_BINS, ge=1, le=analysis.MAX_BINS)
+    include_episodes: bool = True          # 캘리브레이션 후보 비교처럼 joints만 필요하면 false
+
+
+class ForwardKinematicsRequest(BaseModel):
+    urdf_id: str                           # POST /api/kinematics/urdf 의 응답
+    tip: Optional[str] = None              # TCP 링크 (기본: base에서 가장 깊은 링크)
+    samples: List[List[float]]             # 샘플별 관절 값 (joint_names 순서)
+    joint_names: List[str] = list(kinematics.JOINTS)
+    units: str = "ticks"                   # ticks (서보 step, 캘리브레이션 적용) | deg | rad
+    raw: bool = False                      # ticks가 서보 homing_offset 적용 전 엔코더 값이면 true
+    device_id: Optional[int] = None        # units=ticks일 때 필요
+    calibration_id: Optional[int] = None   # 기준 actuator 캘리브레이션 (기본: 최신)
+    include_matrix: bool = False           # 4x4 변환 행렬도 반환
+
+
 class ReplayTestPosition(BaseModel):
     position: int
     error_x: float
@@ -192,6 +436,25 @@ class ReplayTestCreate(BaseModel):
     notes: str = ""
 
 
+class BackupUserRecord(BaseModel):
+    id: int
+    email: str
+    password: str
+    name: str = ""
+    role: str = "user"
+
+
+# 스트리밍 복원 시 레코드 검증 스키마 (저장된 레코드는 생성 스키마 + id, created_at 등)
+BACKUP_RECORD_SCHEMAS = {
+    "device": DeviceCreate,
+    "actuator": ActuatorCalibrationCreate,
+    "intrinsic": IntrinsicCalibrationCreate,
+    "extrinsic": ExtrinsicCalibrationCreate,
+    "handeye": HandEyeCalibrationCreate,
+    "replay": ReplayTestCreate,
+}
+
+
 # ==================== FastAPI App ====================
 
 app = FastAPI(title="CalZero API", version="0.3.0")
@@ -202,9 +465,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "X-Backup-Seq"],
 )
 
 
+@app.exception_handler(CorruptDataError)
+def corrupt_data_handler(request: Request, exc: CorruptDataError):
+    """손상된 데이터 파일은 빈 목록으로 숨기지 않고 500으로 알린다"""
+    print(f"❌ Corrupted data file: {exc}")
+    return JSONResponse(
+        status_code=500,
+        content={"detail": f"Data file is corrupted: {os.path.relpath(exc.filepath, DATA_DIR)}"},
+    )
+
+
 # ==================== Auth Helpers ====================
 
 def hash_password(password: str) -> str:
@@ -227,8 +501,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
-        users = load_json(USERS_FILE, [])
-        user = next((u for u in users if u['id'] == user_id), None)
+        user = storage.get(USERS_FILE, user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -242,21 +515,23 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
 
 @app.post("/api/auth/register", response_model=TokenResponse)
 def register(user: UserRegister):
-    users = load_json(USERS_FILE, [])
-
-    if any(u['email'] == user.email for u in users):
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    user_data = {
-        'id': get_next_id(users),
-        'email': user.email,
-        'password': hash_password(user.password),
-        'name': user.name,
-        'role': 'user',
-        'created_at': get_kst_now().isoformat()
-    }
-    users.append(user_data)
-    save_json(USERS_FILE, users)
+    password_hash = hash_password(user.password)
+
+    with storage.lock(USERS_FILE):
+        if storage.find_one(USERS_FILE, 'email', user.email):
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        try:
+            user_data = storage.insert(USERS_FILE, {
+                'email': user.email,
+                'password': password_hash,
+                'name': user.name,
+                'role': 'user',
+                'created_at': get_kst_now().isoformat()
+            })
+        except DuplicateRecordError:
+            # 잠금 밖에서 (다른 경로로) 같은 email이 먼저 들어간 경우 (SQLite UNIQUE 인덱스)
+            raise HTTPException(status_code=400, detail="Email already registered")
 
     token = create_token(user_data['id'], user_data['email'])
     return {
@@ -274,8 +549,7 @@ def register(user: UserRegister):
 
 @app.post("/api/auth/login", response_model=TokenResponse)
 def login(user: UserLogin):
-    users = load_json(USERS_FILE, [])
-    db_user = next((u for u in users if u['email'] == user.email), None)
+    db_user = storage.find_one(USERS_FILE, 'email', user.email)
 
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -297,73 +571,57 @@ def login(user: UserLogin):
 
 
 @app.get("/api/auth/me", response_model=UserResponse)
-def get_me(current_user: dict = Depends(get_current_user)):
-    return {
+def get_me(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    return conditional_get(request, response, storage.version(USERS_FILE), lambda: {
         "id": current_user['id'],
         "email": current_user['email'],
         "name": current_user['name'],
         "role": current_user['role'],
         "created_at": current_user['created_at']
-    }
+    }, vary=f"user:{current_user['id']}")
 
 
 # ==================== Device Endpoints ====================
 
 @app.get("/api/devices")
-def get_devices():
-    return load_json(DEVICES_FILE, [])
+def get_devices(request: Request, response: Response):
+    return conditional_get(request, response, storage.version(DEVICES_FILE),
+                           lambda: load_json(DEVICES_FILE, []))
 
 
 @app.post("/api/devices")
 def create_device(device: DeviceCreate):
-    devices = load_json(DEVICES_FILE, [])
-
     data = device.dict()
-    data['id'] = get_next_id(devices)
     data['created_at'] = get_kst_now().isoformat()
-
-    # 장치별 캘리브레이션 디렉토리 생성
-    device_dir = get_device_calib_dir(data['id'])
-    os.makedirs(device_dir, exist_ok=True)
-
-    devices.append(data)
-    save_json(DEVICES_FILE, devices)
-    return data
+    created = storage.insert(DEVICES_FILE, data)
+    publish_change("create", DEVICES_FILE, created['id'], created['id'], created)
+    return created
 
 
 @app.put("/api/devices/{device_id}")
 def update_device(device_id: int, device: DeviceUpdate):
-    devices = load_json(DEVICES_FILE, [])
-
-    idx = next((i for i, d in enumerate(devices) if d['id'] == device_id), None)
-    if idx is None:
-        raise HTTPException(status_code=404, detail="Device not found")
-
     update_data = device.dict()
-    update_data['id'] = device_id
-    update_data['created_at'] = devices[idx].get('created_at', get_kst_now().isoformat())
     update_data['updated_at'] = get_kst_now().isoformat()
 
-    devices[idx] = update_data
-    save_json(DEVICES_FILE, devices)
-    return update_data
+    with actuator_stats.updating() as stats:
+        updated = storage.update(DEVICES_FILE, device_id, update_data)
+        if updated is None:
+            raise HTTPException(status_code=404, detail="Device not found")
+        actuator_stats.set_device_type(stats, device_id, updated.get('type'))
+    publish_change("update", DEVICES_FILE, device_id, device_id, updated)
+    return updated
 
 
 @app.delete("/api/devices/{device_id}")
 def delete_device(device_id: int):
-    devices = load_json(DEVICES_FILE, [])
-
-    if not any(d['id'] == device_id for d in devices):
+    if not storage.delete(DEVICES_FILE, device_id):
         raise HTTPException(status_code=404, detail="Device not found")
 
-    # 장치 삭제
-    devices = [d for d in devices if d['id'] != device_id]
-    save_json(DEVICES_FILE, devices)
-
-    # 관련 캘리브레이션 디렉토리 삭제
-    device_dir = get_device_calib_dir(device_id)
-    if os.path.exists(device_dir):
-        shutil.rmtree(device_dir)
+    # 관련 캘리브레이션 삭제
+    with actuator_stats.updating() as stats:
+        storage.drop_device(device_id)
+        actuator_stats.drop_device(stats, device_id)
+    publish_change("delete", DEVICES_FILE, device_id, device_id)
 
     return {"message": "Device and related calibrations deleted"}
 
@@ -371,282 +629,758 @@ def delete_device(device_id: int):
 # ==================== Actuator Calibration Endpoints ====================
 
 @app.get("/api/calibrations/actuator")
-def get_actuator_calibrations(device_id: Optional[int] = None):
-    if device_id:
-        calibs = load_json(get_calib_file(device_id, "actuator"), [])
-        return sorted(calibs, key=lambda x: x.get('created_at', ''), reverse=True)
+def get_actuator_calibrations(
+        request: Request, response: Response, device_id: Optional[int] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+        fields: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    return page_calibrations(request, response, "actuator", device_id, None, limit, cursor, fields, since, until)
+
+
+@app.get("/api/calibrations/actuator/stats")
+def get_actuator_stats(scope: str = Query("fleet", pattern="^(fleet|type|device)$"),
+                       device_id: Optional[int] = None, device_type: Optional[str] = None):
+    """관절별 homing_offset / range_min / range_max 통계 (누적 집계, 이력 길이와 무관하게 바로 반환)
+
+    scope=fleet (전체) | type (device_type, 예: so101_follower, alice_m1) | device (device_id)
+    """
+    if scope == "device" and device_id is None:
+        raise HTTPException(status_code=422, detail="device_id is required for scope=device")
+    if scope == "type" and not device_type:
+        raise HTTPException(status_code=422, detail="device_type is required for scope=type")
+    aggregate = actuator_stats.scope(scope_key(scope, device_id if scope == "device" else device_type))
+    return {
+        "scope": scope,
+        "device_id": device_id if scope == "device" else None,
+        "device_type": device_type if scope == "type" else None,
+        "records": aggregate["records"],
+        "joints": summarize_scope(aggregate),
+    }
+
+
+@app.get("/api/calibrations/actuator/drift")
+def get_actuator_drift(device_id: Optional[int] = None):
+    """관절별 드리프트 판정 (최근 캘리브레이션의 추세 / 변화점)
 
-    # 모든 장치의 캘리브레이션
+    device_id가 있으면 그 장치, 없으면 전체 장치를 한 번에 판정해 표시된 관절 목록을 함께 돌려준다.
+    """
+    if device_id is not None:
+        return drift_monitor.devices([device_id])[0]
     devices = load_json(DEVICES_FILE, [])
-    all_calibs = []
-    for device in devices:
-        calibs = load_json(get_calib_file(device['id'], "actuator"), [])
-        all_calibs.extend(calibs)
-    return sorted(all_calibs, key=lambda x: x.get('created_at', ''), reverse=True)
+    results = drift_monitor.devices([d['id'] for d in devices], prune=True)
+    flagged = []
+    for result in results:
+        for joint in result["flagged_joints"]:
+            for metric, item in result["joints"][joint].items():
+                if item["flagged"]:
+                    flagged.append({
+                        "device_id": result["device_id"],
+                        "joint": joint,
+                        "metric": metric,
+                        "rate_per_day": item["rate_per_day"],
+                        "rate_per_calibration": item["rate_per_calibration"],
+                        "change": item["change"],
+                    })
+    return {"devices": results, "flagged": flagged}
 
 
 @app.post("/api/calibrations/actuator")
 def create_actuator_calibration(calib: ActuatorCalibrationCreate):
     device_id = calib.device_id
-    filepath = get_calib_file(device_id, "actuator")
-    calibs = load_json(filepath, [])
-
     data = calib.dict()
-    data['id'] = get_next_id(calibs)
     data['created_at'] = get_kst_now().isoformat()
-
-    calibs.append(data)
-    save_json(filepath, calibs)
-    return data
+    filepath = get_calib_file(device_id, "actuator")
+    with actuator_stats.updating() as stats:
+        created = storage.insert(filepath, data)
+        actuator_stats.add(stats, device_id, get_device_type(device_id), created.get('calibration_data'))
+    drift_monitor.refresh([device_id])
+    publish_change("create", filepath, device_id, created['id'], created)
+    return created
 
 
 @app.delete("/api/calibrations/actuator/{calib_id}")
 def delete_actuator_calibration(calib_id: int, device_id: int):
     filepath = get_calib_file(device_id, "actuator")
-    calibs = load_json(filepath, [])
-
-    if not any(c['id'] == calib_id for c in calibs):
-        raise HTTPException(status_code=404, detail="Calibration not found")
-
-    calibs = [c for c in calibs if c['id'] != calib_id]
-    save_json(filepath, calibs)
+    with actuator_stats.updating() as stats:
+        record = storage.get(filepath, calib_id)
+        if record is None or not storage.delete(filepath, calib_id):
+            raise HTTPException(status_code=404, detail="Calibration not found")
+        actuator_stats.remove(stats, device_id, record.get('calibration_data'))
+    publish_change("delete", filepath, device_id, calib_id)
     return {"message": "Calibration deleted"}
 
 
 # ==================== Intrinsic Calibration Endpoints ====================
 
 @app.get("/api/calibrations/intrinsic")
-def get_intrinsic_calibrations(device_id: Optional[int] = None, camera: Optional[str] = None):
-    if device_id:
-        calibs = load_json(get_calib_file(device_id, "intrinsic"), [])
-    else:
-        devices = load_json(DEVICES_FILE, [])
-        calibs = []
-        for device in devices:
-            calibs.extend(load_json(get_calib_file(device['id'], "intrinsic"), []))
-
-    if camera:
-        calibs = [c for c in calibs if c.get('camera') == camera]
-
-    return sorted(calibs, key=lambda x: x.get('created_at', ''), reverse=True)
+def get_intrinsic_calibrations(
+        request: Request, response: Response, device_id: Optional[int] = None, camera: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+        fields: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    return page_calibrations(request, response, "intrinsic", device_id, camera, limit, cursor, fields, since, until)
 
 
 @app.post("/api/calibrations/intrinsic")
 def create_intrinsic_calibration(calib: IntrinsicCalibrationCreate):
     device_id = calib.device_id
-    filepath = get_calib_file(device_id, "intrinsic")
-    calibs = load_json(filepath, [])
-
     data = calib.dict()
-    data['id'] = get_next_id(calibs)
     data['created_at'] = get_kst_now().isoformat()
+    filepath = get_calib_file(device_id, "intrinsic")
+    created = storage.insert(filepath, data)
+    publish_change("create", filepath, device_id, created['id'], created)
+    return created
+
+
+def run_intrinsic(device_id: int, camera: str, board: str, square_size: Optional[float], save: bool,
+                  notes: str, payloads: list, progress=None, before_save=None):
+    """intrinsic 계산 + 저장 (요청 핸들러와 작업 큐가 함께 사용)"""
+    result = calibration_engine.calibrate_intrinsic(payloads, board, square_size, progress)
+    result.update(device_id=device_id, camera=camera, board=board)
+    if before_save:
+        before_save()
+    if save:
+        result['saved'] = store_calibration(device_id, "intrinsic", {
+            'device_id': device_id,
+            'camera': camera,
+            'camera_matrix': result['camera_matrix'],
+            'dist_coeffs': result['dist_coeffs'],
+            'image_size': result['image_size'],
+            'rms_error': result['rms_error'],
+            'notes': notes or f"{board} 보드, {result['image_count']}장 사용",
+        })
+    return result
+
 
-    calibs.append(data)
-    save_json(filepath, calibs)
-    return data
+@app.post("/api/calibrations/intrinsic/solve")
+def solve_intrinsic_calibration(
+        device_id: int = Form(...), camera: str = Form(...), board: str = Form("standard_9x6"),
+        square_size: Optional[float] = Form(None), save: bool = Form(True), notes: str = Form(""),
+        images: List[UploadFile] = File(...)):
+    """체커보드 이미지 묶음으로 intrinsic 계산 (코너 검출은 프로세스 풀에서 병렬)
+
+    save=true면 결과를 intrinsic 컬렉션에 저장하고 저장된 레코드를 saved로 돌려준다.
+    이미지가 많으면 /api/jobs/intrinsic 으로 작업을 제출하는 편이 낫다.
+    """
+    payloads = [image.file.read() for image in images]
+    try:
+        return run_intrinsic(device_id, camera, board, square_size, save, notes, payloads)
+    except CalibrationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @app.delete("/api/calibrations/intrinsic/{calib_id}")
 def delete_intrinsic_calibration(calib_id: int, device_id: int):
     filepath = get_calib_file(device_id, "intrinsic")
-    calibs = load_json(filepath, [])
-
-    if not any(c['id'] == calib_id for c in calibs):
+    if not storage.delete(filepath, calib_id):
         raise HTTPException(status_code=404, detail="Calibration not found")
-
-    calibs = [c for c in calibs if c['id'] != calib_id]
-    save_json(filepath, calibs)
+    publish_change("delete", filepath, device_id, calib_id)
     return {"message": "Calibration deleted"}
 
 
 # ==================== Extrinsic Calibration Endpoints ====================
 
 @app.get("/api/calibrations/extrinsic")
-def get_extrinsic_calibrations(device_id: Optional[int] = None, camera: Optional[str] = None):
-    if device_id:
-        calibs = load_json(get_calib_file(device_id, "extrinsic"), [])
-    else:
-        devices = load_json(DEVICES_FILE, [])
-        calibs = []
-        for device in devices:
-            calibs.extend(load_json(get_calib_file(device['id'], "extrinsic"), []))
-
-    if camera:
-        calibs = [c for c in calibs if c.get('camera') == camera]
-
-    return sorted(calibs, key=lambda x: x.get('created_at', ''), reverse=True)
+def get_extrinsic_calibrations(
+        request: Request, response: Response, device_id: Optional[int] = None, camera: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+        fields: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    return page_calibrations(request, response, "extrinsic", device_id, camera, limit, cursor, fields, since, until)
 
 
 @app.post("/api/calibrations/extrinsic")
 def create_extrinsic_calibration(calib: ExtrinsicCalibrationCreate):
     device_id = calib.device_id
-    filepath = get_calib_file(device_id, "extrinsic")
-    calibs = load_json(filepath, [])
-
     data = calib.dict()
-    data['id'] = get_next_id(calibs)
     data['created_at'] = get_kst_now().isoformat()
+    filepath = get_calib_file(device_id, "extrinsic")
+    created = storage.insert(filepath, data)
+    publish_change("create", filepath, device_id, created['id'], created)
+    return created
+
 
-    calibs.append(data)
-    save_json(filepath, calibs)
-    return data
+def resolve_intrinsic(device_id: int, camera: str, intrinsic_id: Optional[int] = None):
+    """intrinsic 레코드 조회 (id가 없으면 해당 카메라의 최신 레코드)"""
+    filepath = get_calib_file(device_id, "intrinsic")
+    if intrinsic_id is not None:
+        record = storage.get(filepath, intrinsic_id)
+    else:
+        latest = storage.query(filepath, camera=camera, limit=1)
+        record = latest[0] if latest else None
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Intrinsic calibration not found for {camera}")
+    return record
+
+
+@app.post("/api/calibrations/extrinsic/solve")
+def solve_extrinsic_calibration(
+        device_id: int = Form(...), image_cameras: List[str] = Form(...),
+        intrinsic_ids: Optional[str] = Form(None), board: str = Form("standard_9x6"),
+        square_size: Optional[float] = Form(None), save: bool = Form(True), notes: str = Form(""),
+        images: List[UploadFile] = File(...)):
+    """여러 카메라의 extrinsic(PnP)을 한 번에 계산
+
+    image_cameras: 이미지마다 카메라 이름 (images와 같은 순서)
+    intrinsic_ids: {"front_cam": 3, ...} JSON (없는 카메라는 최신 intrinsic 사용)
+    save=true면 카메라별로 재투영 오차가 가장 작은 뷰를 extrinsic 레코드로 저장한다.
+    """
+    resolved_ids = resolve_extrinsic_intrinsics(device_id, image_cameras, intrinsic_ids, len(images))
+    payloads = [image.file.read() for image in images]
+    try:
+        return run_extrinsic(device_id, image_cameras, resolved_ids, board, square_size, save, notes, payloads)
+    except CalibrationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def resolve_extrinsic_intrinsics(device_id: int, image_cameras: List[str], intrinsic_ids: Optional[str],
+                                 image_count: int) -> dict:
+    """카메라별 intrinsic id 결정 (intrinsic_ids JSON에 없으면 최신 레코드)"""
+    if len(image_cameras) != image_count:
+        raise HTTPException(status_code=422, detail="image_cameras must have one entry per image")
+    try:
+        requested_ids = json.loads(intrinsic_ids) if intrinsic_ids else {}
+    except ValueError:
+        raise HTTPException(status_code=422, detail="intrinsic_ids must be a JSON object")
+    return {
+        camera: resolve_intrinsic(device_id, camera, requested_ids.get(camera))['id']
+        for camera in dict.fromkeys(image_cameras)
+    }
+
+
+def run_extrinsic(device_id: int, image_cameras: List[str], intrinsic_ids: dict, board: str,
+                  square_size: Optional[float], save: bool, notes: str, payloads: list,
+                  progress=None, before_save=None):
+    """extrinsic 계산 + 저장 (요청 핸들러와 작업 큐가 함께 사용)"""
+    groups = {}
+    for camera, payload in zip(image_cameras, payloads):
+        if camera not in groups:
+            record = resolve_intrinsic(device_id, camera, intrinsic_ids[camera])
+            groups[camera] = {
+                "camera": camera,
+                "intrinsic_id": record['id'],
+                "model": calibration_engine.intrinsic_model((device_id, record['id']), record),
+                "images": [],
+            }
+        groups[camera]["images"].append(payload)
+
+    solved = calibration_engine.solve_extrinsic_batch(list(groups.values()), board, square_size, progress)
+    if before_save:
+        before_save()
+
+    cameras = {}
+    for camera, result in solved.items():
+        result['intrinsic_id'] = groups[camera]['intrinsic_id']
+        best = result['best']
+        if save and best is not None:
+            view = result['views'][best]
+            result['saved'] = store_calibration(device_id, "extrinsic", {
+                'device_id': device_id,
+                'camera': camera,
+                'intrinsic_id': result['intrinsic_id'],
+                'rotation_vector': view['rotation_vector'],
+                'translation_vector': view['translation_vector'],
+                'rotation_matrix': view['rotation_matrix'],
+                'reprojection_error': view['reprojection_error'],
+                'notes': notes or f"{board} 보드, {len(result['views'])}장 중 {best + 1}번째 이미지",
+            })
+        cameras[camera] = result
+    return {"device_id": device_id, "board": board, "cameras": cameras}
 
 
 @app.delete("/api/calibrations/extrinsic/{calib_id}")
 def delete_extrinsic_calibration(calib_id: int, device_id: int):
     filepath = get_calib_file(device_id, "extrinsic")
-    calibs = load_json(filepath, [])
-
-    if not any(c['id'] == calib_id for c in calibs):
+    if not storage.delete(filepath, calib_id):
         raise HTTPException(status_code=404, detail="Calibration not found")
-
-    calibs = [c for c in calibs if c['id'] != calib_id]
-    save_json(filepath, calibs)
+    publish_change("delete", filepath, device_id, calib_id)
     return {"message": "Calibration deleted"}
 
 
 # ==================== Hand-Eye Calibration Endpoints ====================
 
 @app.get("/api/calibrations/handeye")
-def get_handeye_calibrations(device_id: Optional[int] = None, camera: Optional[str] = None):
-    if device_id:
-        calibs = load_json(get_calib_file(device_id, "handeye"), [])
-    else:
-        devices = load_json(DEVICES_FILE, [])
-        calibs = []
-        for device in devices:
-            calibs.extend(load_json(get_calib_file(device['id'], "handeye"), []))
-
-    if camera:
-        calibs = [c for c in calibs if c.get('camera') == camera]
-
-    return sorted(calibs, key=lambda x: x.get('created_at', ''), reverse=True)
+def get_handeye_calibrations(
+        request: Request, response: Response, device_id: Optional[int] = None, camera: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+        fields: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    return page_calibrations(request, response, "handeye", device_id, camera, limit, cursor, fields, since, until)
 
 
 @app.post("/api/calibrations/handeye")
 def create_handeye_calibration(calib: HandEyeCalibrationCreate):
-    device_id = calib.device_id
-    filepath = get_calib_file(device_id, "handeye")
-    calibs = load_json(filepath, [])
+    # 같은 device+camera의 기존 active는 저장과 같은 쓰기에서 해제
+    return store_calibration(calib.device_id, "handeye", calib.dict(), activate_scope='camera')
 
-    data = calib.dict()
-    data['id'] = get_next_id(calibs)
-    data['created_at'] = get_kst_now().isoformat()
 
-    # 같은 device+camera의 기존 active 해제
-    if data.get('is_active'):
-        for c in calibs:
-            if c.get('camera') == data['camera']:
-                c['is_active'] = False
+@app.post("/api/calibrations/handeye/solve")
+def solve_handeye_calibration(req: HandEyeSolveRequest):
+    """포즈 쌍으로 hand-eye 계산 (Tsai / Park / Horaud / Daniilidis 동시 실행)
+
+    방법별 잔차를 함께 반환하고, save=true면 잔차가 가장 작은 결과를 저장한다.
+    """
+    validate_handeye_request(req)
+    try:
+        return run_handeye(req)
+    except CalibrationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def validate_handeye_request(req: HandEyeSolveRequest):
+    for poses in (req.robot_poses, req.target_poses):
+        if len({len(p.rotation) for p in poses}) > 1 or any(len(p.translation) != 3 for p in poses):
+            raise HTTPException(status_code=422, detail="같은 종류의 포즈는 rotation / translation 형식이 같아야 합니다")
+
 
-    calibs.append(data)
-    save_json(filepath, calibs)
-    return data
+def run_handeye(req: HandEyeSolveRequest, before_save=None):
+    """hand-eye 계산 + 저장 (요청 핸들러와 작업 큐가 함께 사용)"""
+    result = calibration_engine.solve_handeye(
+        [p.rotation for p in req.robot_poses], [p.translation for p in req.robot_poses],
+        [p.rotation for p in req.target_poses], [p.translation for p in req.target_poses],
+        calib_type=req.type, methods=req.methods,
+    )
+    if before_save:
+        before_save()
+
+    if req.save:
+        saved = store_calibration(req.device_id, "handeye", {
+            'device_id': req.device_id,
+            'camera': req.camera,
+            'type': req.type,
+            'intrinsic_id': req.intrinsic_id,
+            'transformation_matrix': result['transformation_matrix'],
+            'translation': result['translation'],
+            'rotation_matrix': result['rotation_matrix'],
+            'rotation_euler': result['rotation_euler'],
+            'poses_count': result['poses_count'],
+            'reprojection_error': result['residual'],
+            'method': result['method'],
+            'is_active': req.is_active,
+            'notes': req.notes or f"{req.type}, {result['poses_count']}개 포즈, {result['method']}",
+        }, activate_scope='camera')
+        result['saved'] = saved
+    return result
 
 
 @app.put("/api/calibrations/handeye/{calib_id}/activate")
 def activate_handeye_calibration(calib_id: int, device_id: int):
+    # 같은 camera의 기존 active 해제 후 활성화
     filepath = get_calib_file(device_id, "handeye")
-    calibs = load_json(filepath, [])
-
-    calib = next((c for c in calibs if c['id'] == calib_id), None)
-    if not calib:
+    if not storage.set_active(filepath, calib_id):
         raise HTTPException(status_code=404, detail="Calibration not found")
-
-    # 같은 camera의 기존 active 해제
-    for c in calibs:
-        if c.get('camera') == calib['camera']:
-            c['is_active'] = False
-
-    calib['is_active'] = True
-    save_json(filepath, calibs)
+    publish_change("activate", filepath, device_id, calib_id)
     return {"message": "Calibration activated"}
 
 
 @app.delete("/api/calibrations/handeye/{calib_id}")
 def delete_handeye_calibration(calib_id: int, device_id: int):
     filepath = get_calib_file(device_id, "handeye")
-    calibs = load_json(filepath, [])
-
-    if not any(c['id'] == calib_id for c in calibs):
+    if not storage.delete(filepath, calib_id):
         raise HTTPException(status_code=404, detail="Calibration not found")
-
-    calibs = [c for c in calibs if c['id'] != calib_id]
-    save_json(filepath, calibs)
+    publish_change("delete", filepath, device_id, calib_id)
     return {"message": "Calibration deleted"}
 
 
 # ==================== Replay Test Endpoints ====================
 
 @app.get("/api/replay-tests")
-def get_replay_tests(device_id: Optional[int] = None):
+def get_replay_tests(
+        request: Request, response: Response, device_id: Optional[int] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+        fields: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
     """리플레이 테스트 목록 조회"""
-    if device_id:
-        calibs = load_json(get_calib_file(device_id, "replay"), [])
-        return sorted(calibs, key=lambda x: x.get('created_at', ''), reverse=True)
+    return page_calibrations(request, response, "replay", device_id, None, limit, cursor, fields, since, until)
 
-    # 모든 장치의 테스트
-    devices = load_json(DEVICES_FILE, [])
-    all_tests = []
-    for device in devices:
-        tests = load_json(get_calib_file(device['id'], "replay"), [])
-        all_tests.extend(tests)
-    return sorted(all_tests, key=lambda x: x.get('created_at', ''), reverse=True)
+
+@app.get("/api/replay-tests/analytics")
+def get_replay_analytics(request: Request, response: Response, device_id: int):
+    """장치의 리플레이 테스트 분석 (오차 p50/p95/p99, 축별 편향, 위치별 반복 정밀도, 캘리브레이션별 분포 / 상관)
+
+    결과는 장치별로 캐시되고 테스트가 추가/삭제되면 다시 계산한다 (ETag 지원).
+    """
+    filepath = get_calib_file(device_id, "replay")
+    version = storage.version(filepath)
+    return conditional_get(request, response, version, lambda: {
+        "device_id": device_id,
+        **replay_analysis_cache.get(device_id, version[0], lambda: storage.query(filepath)),
+    })
 
 
 @app.post("/api/replay-tests")
 def create_replay_test(test: ReplayTestCreate):
     """새 리플레이 테스트 저장"""
-    import math
-
     device_id = test.device_id
-    filepath = get_calib_file(device_id, "replay")
-    tests = load_json(filepath, [])
 
     # 각 위치별 거리 계산 및 통계
-    positions_data = []
-    distances = []
-    for pos in test.positions:
-        distance = math.sqrt(pos.error_x**2 + pos.error_y**2 + pos.error_z**2)
-        distances.append(distance)
-        positions_data.append({
+    errors = np.array([[p.error_x, p.error_y, p.error_z] for p in test.positions], dtype=np.float64).reshape(-1, 3)
+    distances = np.sqrt((errors ** 2).sum(axis=1))
+    positions_data = [
+        {
             "position": pos.position,
             "error_x": pos.error_x,
             "error_y": pos.error_y,
             "error_z": pos.error_z,
             "distance": round(distance, 3)
-        })
+        }
+        for pos, distance in zip(test.positions, distances.tolist())
+    ]
 
     data = {
-        "id": get_next_id(tests),
         "device_id": device_id,
         "calibration_id": test.calibration_id,
         "positions": positions_data,
-        "avg_error": round(sum(distances) / len(distances), 3) if distances else 0,
-        "max_error": round(max(distances), 3) if distances else 0,
+        "avg_error": round(float(distances.mean()), 3) if len(distances) else 0,
+        "max_error": round(float(distances.max()), 3) if len(distances) else 0,
         "notes": test.notes,
         "created_at": get_kst_now().isoformat()
     }
 
-    tests.append(data)
-    save_json(filepath, tests)
-    return data
+    filepath = get_calib_file(device_id, "replay")
+    created = storage.insert(filepath, data)
+    replay_analysis_cache.invalidate(device_id)
+    publish_change("create", filepath, device_id, created['id'], created)
+    return created
 
 
 @app.delete("/api/replay-tests/{test_id}")
 def delete_replay_test(test_id: int, device_id: int):
     """리플레이 테스트 삭제"""
     filepath = get_calib_file(device_id, "replay")
-    tests = load_json(filepath, [])
-
-    if not any(t['id'] == test_id for t in tests):
+    if not storage.delete(filepath, test_id):
         raise HTTPException(status_code=404, detail="Test not found")
-
-    tests = [t for t in tests if t['id'] != test_id]
-    save_json(filepath, tests)
+    replay_analysis_cache.invalidate(device_id)
+    publish_change("delete", filepath, device_id, test_id)
     return {"message": "Test deleted"}
 
 
+# ==================== Dataset Analysis ====================
+
+def resolve_actuator_calibration(device_id: int, calibration_id: Optional[int] = None):
+    """actuator 레코드 조회 (id가 없으면 최신 레코드)"""
+    filepath = get_calib_file(device_id, "actuator")
+    if calibration_id is not None:
+        record = storage.get(filepath, calibration_id)
+    else:
+        latest = storage.query(filepath, limit=1)
+        record = latest[0] if latest else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Actuator calibration not found")
+    return record
+
+
+def resolve_dataset_file(path: str, allow_dir: bool = False) -> str:
+    """DATASET_ROOT 기준 상대 경로 -> 실제 경로 (allow_dir면 데이터셋 디렉토리도 허용)"""
+    try:
+        resolved = analysis.resolve_dataset_path(DATASET_ROOT, path)
+    except AnalysisError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if not (os.path.isfile(resolved) or (allow_dir and os.path.isdir(resolved))):
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {path}")
+    return resolved
+
+
+@app.post("/api/analysis/joint-range")
+def analyze_joint_range(
+        device_id: int = Form(...), calibration_id: Optional[int] = Form(None),
+        path: Optional[str] = Form(None), bins: int = Form(analysis.DEFAULT_BINS, ge=1, le=analysis.MAX_BINS),
+        file: Optional[UploadFile] = File(None)):
+    """parquet 하나의 action / observation.state 관절 범위 분석 (DataAnalysis.jsx 형식)
+
+    file(업로드) 또는 path(CALZERO_DATASET_ROOT 기준 상대 경로) 중 하나를 준다.
+    calibration_id가 없으면 장치의 최신 actuator 캘리브레이션을 기준으로 한다.
+    path로 준 파일은 누적 결과를 저장해 두므로 같은 파일을 다른 캘리브레이션으로 다시 보면 바로 끝난다.
+    """
+    if (file is None) == (path is None):
+        raise HTTPException(status_code=422, detail="Provide either file or path")
+    calibration = resolve_actuator_calibration(device_id, calibration_id)
+    try:
+        if file is not None:
+            result = analysis.analyze_parquet(file.file, calibration.get('calibration_data'), bins)
+        else:
+            accumulator, cache = analysis_store.load(resolve_dataset_file(path))
+            result = analysis.analysis_result(accumulator, calibration.get('calibration_data'), bins)
+            result['cache'] = cache
+    except AnalysisError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    result.update(device_id=device_id, calibration_id=calibration['id'],
+                  source=file.filename if file is not None else path)
+    return result
+
+
+def run_dataset_analysis(req: DatasetAnalysisRequest, progress=None):
+    """데이터셋 전체 분석 (요청 핸들러와 작업 큐가 함께 사용)"""
+    calibration = resolve_actuator_calibration(req.device_id, req.calibration_id)
+    dataset = resolve_dataset_file(req.path, allow_dir=True)
+    accumulator, cache = analysis_store.load(dataset, progress)
+    result = analysis.analysis_result(accumulator, calibration.get('calibration_data'), req.bins,
+                                      req.include_episodes)
+    result.update(device_id=req.device_id, calibration_id=calibration['id'], source=req.path, cache=cache)
+    return result
+
+
+@app.post("/api/analysis/dataset")
+def analyze_dataset(req: DatasetAnalysisRequest):
+    """데이터셋 디렉토리의 모든 parquet 샤드를 프로세스 풀로 나눠 분석
+
+    샤드별 부분 결과(관절별 히스토그램, min/max, 에피소드별 구간 빈도)를 합쳐
+    DataAnalysis.jsx 형식의 joints와 에피소드 요약 episodes를 돌려준다.
+    누적 결과는 data/.analysis 에 저장되어 캘리브레이션 / bins만 바꾼 요청은 파일을 다시 읽지 않고,
+    샤드가 추가되면 새 샤드만 읽는다 (cache.scanned / cache.reused).
+    큰 데이터셋은 /api/jobs/analysis 로 제출하면 샤드 단위 진행률을 받을 수 있다.
+    """
+    try:
+        result = run_dataset_analysis(req)
+    except AnalysisError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # 에피소드가 많으면 본문이 커서 jsonable_encoder를 거치지 않고 바로 직렬화 (값은 이미 기본 타입)
+    return JSONResponse(result)
+
+
+# ==================== Kinematics ====================
+
+@app.post("/api/kinematics/urdf")
+def upload_urdf(urdf: UploadFile = File(...), tip: Optional[str] = Form(None)):
+    """URDF 업로드 (내용 해시로 저장, 한 번 파싱한 체인은 재사용) -> urdf_id + 관절 체인"""
+    try:
+        urdf_id, chain = urdf_store.add(urdf.file.read(), tip)
+    except KinematicsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"urdf_id": urdf_id, **chain.describe()}
+
+
+@app.post("/api/kinematics/fk")
+def forward_kinematics(req: ForwardKinematicsRequest):
+    """관절 샘플 배치 -> base 기준 TCP 포즈 (translation mm, rotation 회전 벡터 rad)
+
+    poses는 /api/calibrations/handeye/solve 의 robot_poses로 그대로 쓸 수 있다.
+    units=ticks면 device의 actuator 캘리브레이션(homing_offset, drive_mode, range)으로 각도를 구한다.
+    """
+    try:
+        chain = urdf_store.chain(req.urdf_id, req.tip)
+    except KinematicsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if chain is None:
+        raise HTTPException(status_code=404, detail="URDF not found")
+    if not req.samples:
+        raise HTTPException(status_code=422, detail="samples is empty")
+
+    calibration = None
+    if req.units == "ticks":
+        if req.device_id is None:
+            raise HTTPException(status_code=422, detail="device_id is required for units=ticks")
+        calibration = resolve_actuator_calibration(req.device_id, req.calibration_id)
+    try:
+        q = kinematics.joint_positions(req.samples, chain, req.units, req.joint_names,
+                                       calibration.get('calibration_data') if calibration else None, req.raw)
+        translations, rotations, transforms = kinematics.tcp_poses(chain, q)
+    except KinematicsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    result = {
+        "urdf_id": req.urdf_id,
+        "base": chain.base,
+        "tip": chain.tip,
+        "joints": chain.names,
+        "calibration_id": calibration['id'] if calibration else None,
+        "count": len(q),
+        "joint_positions": q.tolist(),
+        "poses": [{"translation": t, "rotation": r}
+                  for t, r in zip(translations.tolist(), rotations.tolist())],
+    }
+    if req.include_matrix:
+        result["matrices"] = transforms.tolist()
+    # 샘플이 많으면 본문이 커서 jsonable_encoder를 거치지 않고 바로 직렬화
+    return JSONResponse(result)
+
+
+# ==================== Calibration Jobs ====================
+
+def image_progress(ctx):
+    """코너 검출 진행률 -> 작업 진행률 (취소 요청이 있으면 여기서 중단)"""
+    def report(done, total, index, detected):
+        ctx.progress(done, total, f"image {index + 1}", index=index, detected=detected)
+    return report
+
+
+def intrinsic_job(ctx):
+    p = ctx.params
+    return run_intrinsic(ctx.device_id, p['camera'], p['board'], p['square_size'], p['save'], p['notes'],
+                         ctx.inputs(), progress=image_progress(ctx), before_save=ctx.check_cancelled)
+
+
+def extrinsic_job(ctx):
+    p = ctx.params
+    return run_extrinsic(ctx.device_id, p['image_cameras'], p['intrinsic_ids'], p['board'], p['square_size'],
+                         p['save'], p['notes'], ctx.inputs(), progress=image_progress(ctx),
+                         before_save=ctx.check_cancelled)
+
+
+def handeye_job(ctx):
+    req = HandEyeSolveRequest(**ctx.params)
+    ctx.progress(0, 1, "solving")
+    return run_handeye(req, before_save=ctx.check_cancelled)
+
+
+def analysis_job(ctx):
+    req = DatasetAnalysisRequest(**ctx.params)
+
+    def report(done, total, path):
+        ctx.progress(done, total, os.path.basename(path))
+    return run_dataset_analysis(req, progress=report)
+
+
+job_queue.register("intrinsic", intrinsic_job)
+job_queue.register("extrinsic", extrinsic_job)
+job_queue.register("handeye", handeye_job)
+job_queue.register("analysis", analysis_job)
+
+
+def check_board(board: str):
+    try:
+        calibration_engine.resolve_board(board)
+    except CalibrationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/api/jobs/intrinsic", status_code=202)
+def submit_intrinsic_job(
+        device_id: int = Form(...), camera: str = Form(...), board: str = Form("standard_9x6"),
+        square_size: Optional[float] = Form(None), save: bool = Form(True), notes: str = Form(""),
+        images: List[UploadFile] = File(...)):
+    """intrinsic 계산 작업 제출 (입력은 /calibrations/intrinsic/solve 와 같음)"""
+    check_board(board)
+    params = {'camera': camera, 'board': board, 'square_size': square_size, 'save': save, 'notes': notes}
+    return job_queue.submit("intrinsic", params, device_id, [image.file.read() for image in images])
+
+
+@app.post("/api/jobs/extrinsic", status_code=202)
+def submit_extrinsic_job(
+        device_id: int = Form(...), image_cameras: List[str] = Form(...),
+        intrinsic_ids: Optional[str] = Form(None), board: str = Form("standard_9x6"),
+        square_size: Optional[float] = Form(None), save: bool = Form(True), notes: str = Form(""),
+        images: List[UploadFile] = File(...)):
+    """extrinsic 계산 작업 제출 (입력은 /calibrations/extrinsic/solve 와 같음)"""
+    check_board(board)
+    params = {
+        'image_cameras': image_cameras,
+        'intrinsic_ids': resolve_extrinsic_intrinsics(device_id, image_cameras, intrinsic_ids, len(images)),
+        'board': board, 'square_size': square_size, 'save': save, 'notes': notes,
+    }
+    return job_queue.submit("extrinsic", params, device_id, [image.file.read() for image in images])
+
+
+@app.post("/api/jobs/handeye", status_code=202)
+def submit_handeye_job(req: HandEyeSolveRequest):
+    """hand-eye 계산 작업 제출"""
+    validate_handeye_request(req)
+    return job_queue.submit("handeye", req.dict(), req.device_id)
+
+
+@app.post("/api/jobs/analysis", status_code=202)
+def submit_analysis_job(req: DatasetAnalysisRequest):
+    """데이터셋 분석 작업 제출 (진행률은 샤드 단위)"""
+    resolve_actuator_calibration(req.device_id, req.calibration_id)
+    resolve_dataset_file(req.path, allow_dir=True)
+    return job_queue.submit("analysis", req.dict(), req.device_id)
+
+
+@app.get("/api/jobs")
+def get_jobs(device_id: Optional[int] = None, status: Optional[str] = None,
+             limit: int = Query(50, ge=1, le=500)):
+    return job_queue.list(device_id, status, limit)
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: int):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: int):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(request: Request, job_id: int):
+    """작업 진행률 스트림 (SSE)
+
+    진행률이 바뀔 때마다 progress 이벤트, 끝나면 상태 이름(succeeded / failed / cancelled)
+    이벤트에 작업 레코드 전체를 담아 보내고 스트림을 닫는다.
+    """
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last_update = None
+        while not await request.is_disconnected():
+            job = await asyncio.to_thread(job_queue.get, job_id)
+            if job['status'] in FINISHED_STATUSES:
+                yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+            if job['updated_at'] != last_update:
+                last_update = job['updated_at']
+                payload = {'id': job_id, 'status': job['status'], 'progress': job['progress']}
+                yield f"event: progress\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ==================== Change Events (SSE) ====================
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['action']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.get("/api/events")
+async def stream_events(request: Request, device_id: Optional[int] = None, since: Optional[int] = None):
+    """변경 이벤트 스트림 (Server-Sent Events)
+
+    device_id: 해당 장치 이벤트만 (reset 같은 전체 이벤트는 항상 포함)
+    since / Last-Event-ID: 이 seq 이후부터 재개 (없으면 지금부터)
+        브라우저 자동 재연결은 처음 URL의 since를 그대로 다시 보내므로 Last-Event-ID가 있으면 그쪽이 우선
+    보관 기간이 지난 seq로 재개하면 resync 이벤트를 보내고 현재 시점부터 이어간다.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    async def stream():
+        after = since
+        yield "retry: 3000\n\n"
+        if after is None:
+            after = await asyncio.to_thread(change_feed.last_seq)
+        elif not await asyncio.to_thread(change_feed.can_resume, after):
+            after = await asyncio.to_thread(change_feed.last_seq)
+            yield f"id: {after}\nevent: resync\ndata: {json.dumps({'seq': after})}\n\n"
+
+        idle = 0.0
+        while not await request.is_disconnected():
+            events = await asyncio.to_thread(change_feed.read_since, after, None, 500)
+            for event in events:
+                after = event['seq']
+                if device_id is None or event.get('device_id') in (device_id, None):
+                    yield format_sse(event)
+                    idle = 0.0
+            if len(events) == 500:
+                continue
+            if idle >= EVENTS_KEEPALIVE:
+                yield ": keepalive\n\n"
+                idle = 0.0
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+            idle += EVENTS_POLL_INTERVAL
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # ==================== Health Check ====================
 
 @app.get("/api/health")
@@ -655,7 +1389,7 @@ def health_check():
         "status": "ok",
         "version": "0.3.0",
         "data_dir": DATA_DIR,
-        "structure": "file-based"
+        "structure": storage.name
     }
 
 
@@ -702,57 +1436,172 @@ def create_backup():
     return backup_data
 
 
+@app.get("/api/backup/stream")
+def stream_backup(compress: str = Query("none", pattern="^(none|gzip)$")):
+    """스트리밍 백업 (NDJSON, 레코드 한 줄씩, 통계는 마지막 줄)
+
+    /api/backup 과 같은 내용을 한 번에 컬렉션 하나씩 읽어 내보내므로 장치 수와 무관하게 메모리가 일정하다.
+    compress=gzip 이면 .ndjson.gz
+    헤더 줄의 seq (X-Backup-Seq 헤더와 같음)가 다음 증분 백업의 since
+    """
+    created_at = get_kst_now()
+    # 읽기 전에 번호를 잡아 두므로 백업 도중의 변경은 다음 증분에도 들어간다 (중복 적용해도 같은 결과)
+    seq = change_feed.last_seq()
+    entries = backup.export_entries(storage, USERS_FILE, DEVICES_FILE, get_calib_file,
+                                    app.version, created_at.isoformat(), seq)
+    return backup_response(entries, "calzero-backup", created_at, compress, seq)
+
+
+def backup_response(entries, prefix, created_at, compress, seq):
+    filename = f"{prefix}-{created_at.strftime('%Y%m%d-%H%M%S')}.ndjson"
+    media_type = "application/x-ndjson"
+    if compress == "gzip":
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        backup.encode_ndjson(entries, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Backup-Seq": str(seq)},
+    )
+
+
+@app.get("/api/backup/incremental")
+def stream_incremental_backup(since: int = Query(..., ge=0),
+                              compress: str = Query("none", pattern="^(none|gzip)$")):
+    """증분 백업 (since 이후 생성 / 수정 / 삭제 / 활성화된 레코드만, NDJSON)
+
+    since는 앞 백업(전체 또는 증분)의 seq. 변경 피드 보관 범위(CALZERO_EVENTS_KEEP)를 벗어났거나
+    그 사이에 초기화 / 복원이 있었으면 410 - 전체 백업을 새로 받아야 한다.
+    """
+    if since > change_feed.last_seq():
+        raise HTTPException(status_code=422, detail="Unknown backup seq")
+    events = change_feed.read_since(since)
+    # 읽은 뒤에 확인해야 그 사이 정리된 경우도 잡힌다
+    if not change_feed.can_resume(since):
+        raise HTTPException(status_code=410, detail="Backup seq is older than the retained change history; take a full backup")
+    if any(event['action'] == 'reset' for event in events):
+        raise HTTPException(status_code=410, detail="Data was reset or restored since this backup; take a full backup")
+
+    created_at = get_kst_now()
+    seq = events[-1]['seq'] if events else since
+    entries = backup.incremental_entries(storage, USERS_FILE, events, since, seq,
+                                         app.version, created_at.isoformat())
+    return backup_response(entries, f"calzero-backup-incr-{since}-{seq}", created_at, compress, seq)
+
+
 @app.post("/api/restore")
 def restore_backup(backup_data: dict):
-    """백업 데이터 복원"""
+    """백업 데이터 복원 (/api/backup 의 JSON 형식)
+
+    /api/restore/stream 과 같이 검증한 뒤 restore_session() 으로 한 번에 교체하므로
+    실패하면 기존 데이터가 그대로 남는다.
+    """
     try:
-        # 버전 확인
-        version = backup_data.get("version", "unknown")
-
-        # 사용자 복원 (비밀번호 해시 유지)
-        if "users" in backup_data:
-            save_json(USERS_FILE, backup_data["users"])
-
-        # 장치 복원
-        if "devices" in backup_data:
-            save_json(DEVICES_FILE, backup_data["devices"])
-
-        # 캘리브레이션 복원
-        if "calibrations" in backup_data:
-            for device_key, device_calibs in backup_data["calibrations"].items():
-                # device_key: "device_1", "device_2", ...
-                device_id = int(device_key.replace("device_", ""))
-                device_dir = get_device_calib_dir(device_id)
-                os.makedirs(device_dir, exist_ok=True)
-
-                for calib_type, calibs in device_calibs.items():
-                    filepath = get_calib_file(device_id, calib_type)
-                    save_json(filepath, calibs)
-
-        return {
-            "success": True,
-            "message": "백업이 복원되었습니다.",
-            "version": version,
-            "stats": backup_data.get("stats", {})
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"복원 실패: {str(e)}")
+        with storage.restore_session() as session:
+            header, stats = backup.restore_entries(
+                backup.legacy_entries(backup_data), session, validate_backup_record,
+                USERS_FILE, DEVICES_FILE, get_calib_file,
+            )
+    except backup.BackupError as e:
+        raise HTTPException(status_code=400, detail=f"복원 실패: {e}")
+
+    actuator_stats.invalidate()
+    replay_analysis_cache.invalidate()
+    publish_change("reset", None)
+
+    return {
+        "success": True,
+        "message": "백업이 복원되었습니다.",
+        "version": header.get("version", "unknown"),
+        "stats": stats,
+    }
+
+
+def validate_backup_record(kind, record, calib_type):
+    """백업 레코드 검증 (잘못되면 ValueError)"""
+    if not isinstance(record, dict):
+        raise ValueError("data must be an object")
+    if not isinstance(record.get("id"), int) or isinstance(record.get("id"), bool):
+        raise ValueError("data.id must be an integer")
+    if kind == "user":
+        BackupUserRecord.model_validate(record)
+    else:
+        BACKUP_RECORD_SCHEMAS[calib_type or kind].model_validate(record)
+
+
+@app.post("/api/restore/stream")
+def restore_backup_stream(file: UploadFile = File(...)):
+    """스트리밍 복원 (/api/backup/stream 의 .ndjson / .ndjson.gz)
+
+    한 줄씩 읽으며 스키마로 검증하고 임시 디렉토리(SQLite는 트랜잭션)에 쓴 뒤 마지막에 한 번에 교체한다.
+    중간에 잘못된 줄이 있거나 파일이 잘려 있으면 기존 데이터는 그대로 남는다.
+    사용자는 백업에 있을 때만 교체한다.
+    """
+    try:
+        with storage.restore_session() as session:
+            header, stats = backup.restore_entries(
+                backup.read_ndjson(backup.open_upload(file.file)), session, validate_backup_record,
+                USERS_FILE, DEVICES_FILE, get_calib_file,
+            )
+    except backup.BackupError as e:
+        raise HTTPException(status_code=422, detail=f"복원 실패: {e}")
+
+    actuator_stats.invalidate()
+    replay_analysis_cache.invalidate()
+    publish_change("reset", None)
+
+    return {
+        "success": True,
+        "message": "백업이 복원되었습니다.",
+        "version": header.get("version", "unknown"),
+        "stats": stats,
+    }
+
+
+@app.post("/api/restore/chain")
+def restore_backup_chain(base: UploadFile = File(...), increments: List[UploadFile] = File([])):
+    """전체 백업 + 증분 백업들(오래된 순)을 합쳐 복원
+
+    증분은 각각 앞 백업의 seq부터 이어져야 한다 (겹치는 건 괜찮고, 빠진 구간이 있으면 422).
+    /api/restore/stream 과 같이 한 번에 교체하므로 실패하면 기존 데이터가 그대로 남는다.
+    """
+    try:
+        with storage.restore_session() as session:
+            header, stats = backup.restore_chain(
+                backup.read_ndjson(backup.open_upload(base.file), base.filename),
+                [backup.read_ndjson(backup.open_upload(f.file), f.filename) for f in increments],
+                session, validate_backup_record, USERS_FILE, DEVICES_FILE, get_calib_file,
+            )
+    except backup.BackupError as e:
+        raise HTTPException(status_code=422, detail=f"복원 실패: {e}")
+
+    actuator_stats.invalidate()
+    replay_analysis_cache.invalidate()
+    publish_change("reset", None)
+
+    return {
+        "success": True,
+        "message": "백업이 복원되었습니다.",
+        "version": header.get("version", "unknown"),
+        "stats": stats,
+    }
 
 
 @app.delete("/api/reset")
 def reset_all_data():
     """전체 데이터 초기화 (위험!)"""
     try:
-        # 캘리브레이션 디렉토리 삭제
-        if os.path.exists(CALIBRATIONS_DIR):
-            shutil.rmtree(CALIBRATIONS_DIR)
-        os.makedirs(CALIBRATIONS_DIR, exist_ok=True)
+        # 캘리브레이션 삭제
+        storage.reset_calibrations()
 
         # 장치 초기화
         save_json(DEVICES_FILE, [])
 
         # 사용자는 유지 (로그인 필요하므로)
 
+        actuator_stats.invalidate()
+        publish_change("reset", None)
+
         return {"success": True, "message": "모든 데이터가 초기화되었습니다."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"초기화 실패: {str(e)}")
@@ -763,25 +1612,34 @@ def reset_all_data():
 @app.on_event("startup")
 def startup_event():
     ensure_data_dirs()
+    storage.prepare()
+    job_queue.prepare()
+    job_queue.start()
 
     # 기본 사용자 생성
-    users = load_json(USERS_FILE, [])
-    if not users:
-        users.append({
-            'id': 1,
-            'email': 'test@test.com',
-            'password': hash_password('test1234'),
-            'name': 'Test User',
-            'role': 'admin',
-            'created_at': get_kst_now().isoformat()
-        })
-        save_json(USERS_FILE, users)
-        print("✅ Sample user created (test@test.com / test1234)")
-
-    print(f"📁 Data directory: {DATA_DIR}")
+    with storage.lock(USERS_FILE):
+        if not load_json(USERS_FILE, []):
+            storage.insert(USERS_FILE, {
+                'id': 1,
+                'email': 'test@test.com',
+                'password': hash_password('test1234'),
+                'name': 'Test User',
+                'role': 'admin',
+                'created_at': get_kst_now().isoformat()
+            })
+            print("✅ Sample user created (test@test.com / test1234)")
+
+    print(f"📁 Data directory: {DATA_DIR} ({storage.name})")
     print("🚀 CalZero API v0.3.0 started")
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    job_queue.stop()
+    calibration_engine.shutdown_pool()
+    analysis.shutdown_pool()
+
+
 # ==================== Frontend Static Files ====================
 
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
@@ -797,8 +1655,15 @@ if os.path.exists(STATIC_DIR):
             return FileResponse(file_path)
         return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
+
 if __name__ == "__main__":
     import uvicorn
 
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = web_concurrency()
+    if workers > 1:
+        # 워커 프로세스마다 앱을 다시 import 해야 하므로 import 문자열로 넘긴다.
+        # 캐시 무효화와 ID 할당은 저장소의 파일 시그니처 / 파일 잠금으로 워커 간에 맞춰진다.
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, app_dir=BASE_DIR)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
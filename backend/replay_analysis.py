@@ -0,0 +1,191 @@
+"""
+CalZero 리플레이 테스트 분석
+
+ReplayAnalysis.jsx가 테스트 목록을 돌며 계산하던 min/max/avg 를 서버에서 NumPy로 한 번에 계산하고
+분포 통계를 더한다.
+- 오차 거리 분포: p50 / p95 / p99, 평균, 표준편차
+- 축별 편향: error_x / y / z 평균 (체계적인 오프셋)
+- 위치별 반복 정밀도: 같은 position 번호의 오차 벡터가 평균에서 흩어진 정도 (RMS)
+- 캘리브레이션별 분포와 캘리브레이션과의 상관
+    eta_squared: 테스트 평균 오차 분산 중 calibration_id 그룹 차이로 설명되는 비율
+    spearman: calibration_id 순서(최신일수록 큼)와 테스트 평균 오차의 순위 상관
+결과는 장치별로 컬렉션 버전과 함께 메모리에 두고, 테스트가 추가/삭제되면 다시 계산한다.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+CACHE_SIZE = 64
+
+
+def _round(value, digits=3):
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def distribution(distances):
+    """오차 거리 배열 -> 분포 요약"""
+    if not len(distances):
+        return None
+    p = np.percentile(distances, PERCENTILES)
+    return {
+        "count": int(len(distances)),
+        "mean": _round(distances.mean()),
+        "std": _round(distances.std()),
+        "min": _round(distances.min()),
+        "max": _round(distances.max()),
+        **{f"p{q}": _round(v) for q, v in zip(PERCENTILES, p)},
+    }
+
+
+def position_arrays(tests):
+    """테스트 목록 -> (test_index (P,), position (P,), errors (P, 3))"""
+    counts = [len(t.get('positions') or []) for t in tests]
+    rows = [(p.get('position', 0), p.get('error_x', 0), p.get('error_y', 0), p.get('error_z', 0))
+            for t in tests for p in (t.get('positions') or [])]
+    table = np.asarray(rows, dtype=np.float64).reshape(-1, 4)
+    test_index = np.repeat(np.arange(len(tests)), counts)
+    return test_index, table[:, 0].astype(np.int64), table[:, 1:]
+
+
+def _rankdata(values):
+    """평균 순위 (동점은 평균)"""
+    order = np.argsort(values, kind='mergesort')
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=ranks)
+    return sums[inverse] / counts[inverse]
+
+
+def spearman(x, y):
+    if len(x) < 3:
+        return None
+    rx, ry = _rankdata(x), _rankdata(y)
+    if rx.std() == 0 or ry.std() == 0:
+        return None
+    return _round(np.corrcoef(rx, ry)[0, 1], 4)
+
+
+def analyze(tests):
+    """장치의 리플레이 테스트 목록 -> 분석 결과 dict (tests는 최신순 그대로 받아도 됨)"""
+    tests = sorted(tests, key=lambda t: (t.get('created_at') or '', t.get('id') or 0))
+    test_index, positions, errors = position_arrays(tests)
+    distances = np.sqrt((errors ** 2).sum(axis=1))
+    n_tests = len(tests)
+
+    # 테스트별 min / avg / max (ReplayAnalysis.jsx 범위 차트)
+    counts = np.bincount(test_index, minlength=n_tests)
+    sums = np.bincount(test_index, weights=distances, minlength=n_tests)
+    test_avg = np.divide(sums, counts, out=np.zeros(n_tests), where=counts > 0)
+    test_min = np.full(n_tests, np.inf)
+    test_max = np.full(n_tests, -np.inf)
+    np.minimum.at(test_min, test_index, distances)
+    np.maximum.at(test_max, test_index, distances)
+    has_positions = counts > 0
+
+    # 위치별 편향 / 반복 정밀도
+    by_position = []
+    if len(positions):
+        ids, inverse, pos_counts = np.unique(positions, return_inverse=True, return_counts=True)
+        mean = np.stack([np.bincount(inverse, weights=errors[:, a]) for a in range(3)], axis=1) / pos_counts[:, None]
+        spread = ((errors - mean[inverse]) ** 2).sum(axis=1)
+        repeatability = np.sqrt(np.bincount(inverse, weights=spread) / pos_counts)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(pos_counts)[:-1]
+        for k, group in enumerate(np.split(distances[order], bounds)):
+            by_position.append({
+                "position": int(ids[k]),
+                "count": int(pos_counts[k]),
+                "bias": [_round(v) for v in mean[k]],
+                "repeatability": _round(repeatability[k]),
+                "distance": distribution(group),
+            })
+
+    # 캘리브레이션별 분포 (연결된 calibration_id, 없으면 null)
+    calib_ids = np.array([t.get('calibration_id') if t.get('calibration_id') is not None else -1
+                          for t in tests], dtype=np.int64)
+    point_calib = calib_ids[test_index]
+    by_calibration = []
+    for calib_id in np.unique(calib_ids):
+        selected = point_calib == calib_id
+        group_tests = (calib_ids == calib_id) & has_positions
+        by_calibration.append({
+            "calibration_id": None if calib_id < 0 else int(calib_id),
+            "tests": int((calib_ids == calib_id).sum()),
+            "distance": distribution(distances[selected]),
+            "bias": [_round(v) for v in errors[selected].mean(axis=0)] if selected.any() else None,
+            "avg_error": _round(test_avg[group_tests].mean()) if group_tests.any() else None,
+        })
+
+    # 캘리브레이션과의 상관 (연결된 테스트만)
+    linked = (calib_ids >= 0) & has_positions
+    eta_squared = None
+    if linked.sum() >= 2:
+        values = test_avg[linked]
+        _, groups = np.unique(calib_ids[linked], return_inverse=True)
+        group_mean = np.bincount(groups, weights=values) / np.bincount(groups)
+        total = ((values - values.mean()) ** 2).sum()
+        between = (np.bincount(groups) * (group_mean - values.mean()) ** 2).sum()
+        eta_squared = _round(between / total, 4) if total > 0 else None
+
+    return {
+        "tests": n_tests,
+        "positions": int(len(distances)),
+        "distance": distribution(distances),
+        "bias": {axis: _round(errors[:, a].mean()) for a, axis in enumerate("xyz")} if len(errors) else None,
+        "bias_std": {axis: _round(errors[:, a].std()) for a, axis in enumerate("xyz")} if len(errors) else None,
+        "test_avg_error": distribution(test_avg[has_positions]),
+        "by_test": [
+            {
+                "id": t.get('id'),
+                "calibration_id": t.get('calibration_id'),
+                "created_at": t.get('created_at'),
+                "min_error": _round(test_min[i]) if has_positions[i] else None,
+                "avg_error": _round(test_avg[i]) if has_positions[i] else None,
+                "max_error": _round(test_max[i]) if has_positions[i] else None,
+            }
+            for i, t in enumerate(tests)
+        ],
+        "by_position": by_position,
+        "by_calibration": by_calibration,
+        "calibration_correlation": {
+            "linked_tests": int(linked.sum()),
+            "eta_squared": eta_squared,
+            "spearman": spearman(calib_ids[linked].astype(np.float64), test_avg[linked]),
+        },
+    }
+
+
+class ReplayAnalysisCache:
+    """장치별 분석 결과 (컬렉션 버전이 바뀌면 다시 계산, LRU)"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, device_id, version_tag, load):
+        """load() -> 테스트 목록 (버전이 다를 때만 호출)"""
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None and entry[0] == version_tag:
+                self._entries.move_to_end(device_id)
+                return entry[1]
+        result = analyze(load())
+        with self._lock:
+            self._entries[device_id] = (version_tag, result)
+            self._entries.move_to_end(device_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, device_id=None):
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id, None)
@@ -0,0 +1,556 @@
+"""
+SQLite 저장소 백엔드
+
+users / devices / calibrations 세 테이블에 레코드를 JSON 그대로 보관하고,
+조회에 쓰이는 컬럼(created_at, camera, is_active)만 따로 뽑아 인덱스를 건다.
+외부 서비스 없이 동작하므로 오프라인 환경에서도 사용할 수 있다.
+
+기존 JSON 데이터 이전:
+    python sqlite_storage.py migrate [--db PATH]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from storage import CALIB_TYPES, DuplicateRecordError, LockRegistry, StorageBackend
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    email TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS calibrations (
+    device_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT '',
+    camera TEXT,
+    is_active INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (device_id, type, id)
+);
+CREATE INDEX IF NOT EXISTS idx_calib_device_type_created
+    ON calibrations (device_id, type, created_at);
+CREATE INDEX IF NOT EXISTS idx_calib_device_camera_active
+    ON calibrations (device_id, camera, is_active);
+CREATE INDEX IF NOT EXISTS idx_calib_type_created
+    ON calibrations (type, created_at);
+CREATE INDEX IF NOT EXISTS idx_calib_type_camera_created
+    ON calibrations (type, camera, created_at);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS collection_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# iter_records()가 한 번에 읽는 행 수
+ITER_BATCH_ROWS = 500
+
+_CALIB_PATH_RE = re.compile(r"calibrations/device_(\d+)/(\w+)\.json")
+
+
+class _SqliteRestore:
+    """SqliteStorage.restore_session()의 writer (사용자는 첫 레코드가 올 때 비운다)"""
+
+    def __init__(self, storage, conn):
+        self.storage = storage
+        self.conn = conn
+        self.max_ids = {}
+        self.has_users = False
+        conn.execute("DELETE FROM calibrations")
+        conn.execute("DELETE FROM devices")
+
+    def add(self, filepath, record):
+        key = self.storage._resolve(filepath)
+        if key[0] == "users" and not self.has_users:
+            self.conn.execute("DELETE FROM users")
+            self.has_users = True
+        self.storage._insert_row(self.conn, *key, record)
+        self.max_ids[key] = max(self.max_ids.get(key, 0), record.get("id", 0))
+
+    def finish(self):
+        for key, max_id in self.max_ids.items():
+            self.storage._reserve_ids(self.conn, *key, max_id)
+        self.conn.execute(
+            "UPDATE collection_versions SET version = version + 1, updated_at = ? "
+            "WHERE name LIKE 'calibrations/%' OR name LIKE 'fleet/%' OR name IN ('users', 'devices')",
+            (time.time(),),
+        )
+        self.conn.execute(
+            "INSERT OR IGNORE INTO collection_versions (name, version, updated_at) VALUES ('devices', 1, ?)",
+            (time.time(),),
+        )
+        for table, device_id, calib_type in self.max_ids:
+            if table == "calibrations":
+                for name in (self.storage._sequence_name(table, device_id, calib_type), f"fleet/{calib_type}"):
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO collection_versions (name, version, updated_at) VALUES (?, 1, ?)",
+                        (name, time.time()),
+                    )
+
+
+class SqliteStorage(StorageBackend):
+    """SQLite 기반 저장소"""
+
+    name = "sqlite"
+
+    def __init__(self, data_dir, db_path, legacy_db_path=None):
+        self.data_dir = data_dir
+        self.db_path = db_path
+        self.legacy_db_path = legacy_db_path
+        self._local = threading.local()
+        self._locks = LockRegistry(os.path.join(data_dir, ".locks"), data_dir)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        self._ensure_unique_email()
+
+    def _ensure_unique_email(self):
+        """users.email UNIQUE 인덱스 (이전 DB에 중복이 있으면 일반 인덱스로 두고 경고)"""
+        conn = self._conn()
+        try:
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_unique ON users (email)")
+            conn.execute("DROP INDEX IF EXISTS idx_users_email")
+        except sqlite3.IntegrityError:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)")
+            print("⚠️ users 테이블에 중복 email이 있어 UNIQUE 인덱스를 만들지 못했습니다 (가입은 파일 잠금으로만 직렬화)")
+
+    # ---------- 연결 / 트랜잭션 ----------
+
+    def _conn(self):
+        """스레드별 연결 (autocommit 모드, 트랜잭션은 _write()로 명시)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lock(self, filepath):
+        """컬렉션 단위 프로세스 간 잠금 (JsonStorage와 같은 data/.locks 파일 잠금)"""
+        return self._locks(filepath)
+
+    @contextmanager
+    def _write(self):
+        """쓰기 트랜잭션 (BEGIN IMMEDIATE로 다른 쓰기와 직렬화)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _resolve(self, filepath):
+        """JSON 레이아웃 경로 -> (table, device_id, calib_type)"""
+        rel = os.path.relpath(filepath, self.data_dir).replace(os.sep, "/")
+        if rel == "users.json":
+            return "users", None, None
+        if rel == "devices.json":
+            return "devices", None, None
+        m = _CALIB_PATH_RE.fullmatch(rel)
+        if m:
+            return "calibrations", int(m.group(1)), m.group(2)
+        raise ValueError(f"Unknown collection path: {filepath}")
+
+    @staticmethod
+    def _sequence_name(table, device_id, calib_type):
+        """JsonStorage의 collection_name()과 같은 이름 규칙"""
+        if table == "calibrations":
+            return f"calibrations/device_{device_id}/{calib_type}"
+        return table
+
+    def _next_id(self, conn, table, device_id, calib_type):
+        """시퀀스에서 id 발급 (쓰기 트랜잭션 안에서 호출)"""
+        name = self._sequence_name(table, device_id, calib_type)
+        row = conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            where, params = self._where(table, device_id, calib_type)
+            current = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table} WHERE {where}", params).fetchone()[0]
+        else:
+            current = row[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO sequences (name, value) VALUES (?, ?)", (name, current + 1)
+        )
+        return current + 1
+
+    def _reserve_ids(self, conn, table, device_id, calib_type, max_id):
+        """외부에서 지정된 id까지 시퀀스를 올린다"""
+        conn.execute(
+            "INSERT INTO sequences (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+            (self._sequence_name(table, device_id, calib_type), max_id),
+        )
+
+    def _rebuild_sequences(self, conn):
+        """데이터의 최대 id로 시퀀스 재구성 (기존 값보다 작아지지는 않음)"""
+        for table in ("users", "devices"):
+            max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            self._reserve_ids(conn, table, None, None, max_id)
+        rows = conn.execute(
+            "SELECT device_id, type, MAX(id) FROM calibrations GROUP BY device_id, type"
+        ).fetchall()
+        for device_id, calib_type, max_id in rows:
+            self._reserve_ids(conn, "calibrations", device_id, calib_type, max_id)
+
+    def _bump_versions(self, conn, table, device_id, calib_type):
+        """컬렉션(과 캘리브레이션이면 전체 장치 목록)의 버전 증가"""
+        names = [self._sequence_name(table, device_id, calib_type)]
+        if table == "calibrations":
+            names.append(f"fleet/{calib_type}")
+        now = time.time()
+        for name in names:
+            conn.execute(
+                "INSERT INTO collection_versions (name, version, updated_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+                (name, now),
+            )
+
+    def _version(self, name):
+        row = self._conn().execute(
+            "SELECT version, updated_at FROM collection_versions WHERE name = ?", (name,)
+        ).fetchone()
+        return (str(row[0]), row[1]) if row else ("0", None)
+
+    def version(self, filepath):
+        return self._version(self._sequence_name(*self._resolve(filepath)))
+
+    def fleet_version(self, calib_type):
+        return self._version(f"fleet/{calib_type}")
+
+    @staticmethod
+    def _where(table, device_id, calib_type):
+        if table == "calibrations":
+            return "device_id = ? AND type = ?", (device_id, calib_type)
+        return "1 = 1", ()
+
+    def _select(self, filepath, extra="", params=(), order="id"):
+        table, device_id, calib_type = self._resolve(filepath)
+        where, base = self._where(table, device_id, calib_type)
+        rows = self._conn().execute(
+            f"SELECT data FROM {table} WHERE {where}{extra} ORDER BY {order}",
+            base + tuple(params),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _insert_row(self, conn, table, device_id, calib_type, record):
+        data = json.dumps(record, ensure_ascii=False)
+        if table == "users":
+            # OR REPLACE는 email이 같은 다른 사용자를 지워버리므로 id 충돌만 덮어쓴다
+            try:
+                conn.execute(
+                    "INSERT INTO users (id, email, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET email = excluded.email, data = excluded.data",
+                    (record["id"], record.get("email"), data),
+                )
+            except sqlite3.IntegrityError as e:
+                raise DuplicateRecordError(f"Email already registered: {record.get('email')}") from e
+        elif table == "devices":
+            conn.execute(
+                "INSERT OR REPLACE INTO devices (id, data) VALUES (?, ?)",
+                (record["id"], data),
+            )
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO calibrations "
+                "(device_id, type, id, created_at, camera, is_active, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (device_id, calib_type, record["id"], record.get("created_at", ""),
+                 record.get("camera"), int(bool(record.get("is_active"))), data),
+            )
+
+    # ---------- StorageBackend ----------
+
+    def load(self, filepath, default):
+        items = self._select(filepath)
+        return items if items else default
+
+    def iter_records(self, filepath):
+        table, device_id, calib_type = self._resolve(filepath)
+        where, params = self._where(table, device_id, calib_type)
+        # id 구간으로 나눠 읽는다 (스트리밍 응답은 호출마다 스레드가 다를 수 있어 커서를 유지하지 않음)
+        last_id = None
+        while True:
+            extra, page = ("", ()) if last_id is None else (" AND id > ?", (last_id,))
+            rows = self._conn().execute(
+                f"SELECT id, data FROM {table} WHERE {where}{extra} ORDER BY id LIMIT ?",
+                params + page + (ITER_BATCH_ROWS,),
+            ).fetchall()
+            for row_id, data in rows:
+                yield json.loads(data)
+            if len(rows) < ITER_BATCH_ROWS:
+                return
+            last_id = rows[-1][0]
+
+    def save(self, filepath, items):
+        table, device_id, calib_type = self._resolve(filepath)
+        where, params = self._where(table, device_id, calib_type)
+        with self._write() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE {where}", params)
+            for record in items:
+                self._insert_row(conn, table, device_id, calib_type, record)
+            max_id = max((record["id"] for record in items), default=0)
+            if max_id:
+                self._reserve_ids(conn, table, device_id, calib_type, max_id)
+            self._bump_versions(conn, table, device_id, calib_type)
+
+    def get(self, filepath, record_id):
+        items = self._select(filepath, " AND id = ?", (record_id,))
+        return items[0] if items else None
+
+    def find_one(self, filepath, field, value):
+        table, _, _ = self._resolve(filepath)
+        if table == "users" and field == "email":
+            items = self._select(filepath, " AND email = ?", (value,))
+        else:
+            items = [item for item in self._select(filepath) if item.get(field) == value]
+        return items[0] if items else None
+
+    @staticmethod
+    def _page_filters(camera, before, limit, since):
+        """query()/query_fleet() 공통 조건 -> (추가 WHERE, ORDER/LIMIT, 파라미터)"""
+        extra, params = "", []
+        if camera:
+            extra += " AND camera = ?"
+            params.append(camera)
+        if since:
+            extra += " AND created_at >= ?"
+            params.append(since)
+        if before is not None:
+            before = tuple(before)
+            if len(before) == 1:
+                extra += " AND created_at < ?"
+            else:
+                extra += " AND (created_at, device_id, id) < (?, ?, ?)"
+            params.extend(before)
+        order = "created_at DESC, device_id DESC, id DESC"
+        if limit:
+            order += " LIMIT ?"
+            params.append(limit)
+        return extra, order, params
+
+    def query(self, filepath, camera=None, before=None, limit=None, since=None):
+        extra, order, params = self._page_filters(camera, before, limit, since)
+        return self._select(filepath, extra, params, order=order)
+
+    def query_fleet(self, calib_type, camera=None, before=None, limit=None, since=None):
+        extra, order, params = self._page_filters(camera, before, limit, since)
+        rows = self._conn().execute(
+            f"SELECT data FROM calibrations WHERE type = ?{extra} ORDER BY {order}",
+            [calib_type] + params,
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def insert(self, filepath, record, activate_scope=None):
+        table, device_id, calib_type = self._resolve(filepath)
+        if activate_scope and (table != "calibrations" or activate_scope != "camera"):
+            raise ValueError("activation is only supported for calibrations scoped by camera")
+        with self._write() as conn:
+            if "id" not in record:
+                record = {**record, "id": self._next_id(conn, table, device_id, calib_type)}
+            else:
+                self._reserve_ids(conn, table, device_id, calib_type, record["id"])
+            if activate_scope and record.get("is_active"):
+                self._deactivate(conn, device_id, calib_type, record.get("camera"))
+            self._insert_row(conn, table, device_id, calib_type, record)
+            self._bump_versions(conn, table, device_id, calib_type)
+        return record
+
+    def update(self, filepath, record_id, changes):
+        table, device_id, calib_type = self._resolve(filepath)
+        where, params = self._where(table, device_id, calib_type)
+        with self._write() as conn:
+            row = conn.execute(
+                f"SELECT data FROM {table} WHERE {where} AND id = ?", params + (record_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = {**json.loads(row[0]), **changes}
+            self._insert_row(conn, table, device_id, calib_type, record)
+            self._bump_versions(conn, table, device_id, calib_type)
+        return record
+
+    def delete(self, filepath, record_id):
+        table, device_id, calib_type = self._resolve(filepath)
+        where, params = self._where(table, device_id, calib_type)
+        with self._write() as conn:
+            cur = conn.execute(f"DELETE FROM {table} WHERE {where} AND id = ?", params + (record_id,))
+            if cur.rowcount:
+                self._bump_versions(conn, table, device_id, calib_type)
+        return cur.rowcount > 0
+
+    def set_active(self, filepath, record_id, scope_field="camera"):
+        table, device_id, calib_type = self._resolve(filepath)
+        if table != "calibrations" or scope_field != "camera":
+            raise ValueError("set_active is only supported for calibrations scoped by camera")
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT camera FROM calibrations WHERE device_id = ? AND type = ? AND id = ?",
+                (device_id, calib_type, record_id),
+            ).fetchone()
+            if row is None:
+                return False
+            self._deactivate(conn, device_id, calib_type, row[0], record_id)
+            self._bump_versions(conn, table, device_id, calib_type)
+        return True
+
+    def _deactivate(self, conn, device_id, calib_type, camera, active_id=None):
+        """같은 camera의 활성 레코드를 해제하고 active_id만 활성화 (쓰기 트랜잭션 안에서 호출)"""
+        rows = conn.execute(
+            "SELECT id, data FROM calibrations "
+            "WHERE device_id = ? AND camera IS ? AND type = ? AND (is_active = 1 OR id = ?)",
+            (device_id, camera, calib_type, active_id),
+        ).fetchall()
+        for rid, data in rows:
+            record = json.loads(data)
+            record["is_active"] = rid == active_id
+            self._insert_row(conn, "calibrations", device_id, calib_type, record)
+
+    def drop_device(self, device_id):
+        with self._write() as conn:
+            conn.execute("DELETE FROM calibrations WHERE device_id = ?", (device_id,))
+            for calib_type in CALIB_TYPES:
+                self._bump_versions(conn, "calibrations", device_id, calib_type)
+
+    def reset_calibrations(self):
+        with self._write() as conn:
+            conn.execute("DELETE FROM calibrations")
+            conn.execute(
+                "UPDATE collection_versions SET version = version + 1, updated_at = ? "
+                "WHERE name LIKE 'calibrations/%' OR name LIKE 'fleet/%'",
+                (time.time(),),
+            )
+
+    @contextmanager
+    def restore_session(self):
+        """한 쓰기 트랜잭션 안에서 전체 교체 (예외가 나면 ROLLBACK이라 기존 데이터 유지)"""
+        with self._write() as conn:
+            session = _SqliteRestore(self, conn)
+            yield session
+            session.finish()
+
+    def prepare(self):
+        """DB가 비어 있으면 JSON 데이터를 한 번 이전"""
+        if not self.is_migrated():
+            counts = self.migrate_from_json(self.legacy_db_path)
+            print(f"✅ Migrated JSON data to SQLite: {counts}")
+
+    # ---------- 마이그레이션 ----------
+
+    def is_migrated(self):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'migrated_at'").fetchone()
+        return row is not None
+
+    def migrate_from_json(self, legacy_db_path=None):
+        """JSON 트리(data/)와 예전 단일 파일 DB(calzero_db.json)를 한 번에 이전
+
+        같은 컬렉션에 이미 있는 id는 건너뛴다 (JSON 트리가 우선).
+        반환값은 테이블별 이전된 레코드 수.
+        """
+        counts = {"users": 0, "devices": 0, "calibrations": 0}
+        calib_dir = os.path.join(self.data_dir, "calibrations")
+
+        def read(path, default):
+            if not os.path.exists(path):
+                return default
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_at'").fetchone():
+                return counts
+
+            def add(table, device_id, calib_type, record):
+                where, params = self._where(table, device_id, calib_type)
+                exists = conn.execute(
+                    f"SELECT 1 FROM {table} WHERE {where} AND id = ?", params + (record["id"],)
+                ).fetchone()
+                if table == "users" and not exists:
+                    exists = conn.execute(
+                        "SELECT 1 FROM users WHERE email = ?", (record.get("email"),)
+                    ).fetchone()
+                if exists:
+                    return
+                self._insert_row(conn, table, device_id, calib_type, record)
+                counts[table] += 1
+
+            # 1) 현재 JSON 트리
+            for record in read(os.path.join(self.data_dir, "users.json"), []):
+                add("users", None, None, record)
+            for record in read(os.path.join(self.data_dir, "devices.json"), []):
+                add("devices", None, None, record)
+            if os.path.isdir(calib_dir):
+                for entry in sorted(os.listdir(calib_dir)):
+                    m = re.fullmatch(r"device_(\d+)", entry)
+                    if not m:
+                        continue
+                    for calib_type in CALIB_TYPES:
+                        path = os.path.join(calib_dir, entry, f"{calib_type}.json")
+                        for record in read(path, []):
+                            add("calibrations", int(m.group(1)), calib_type, record)
+
+            # 2) 예전 단일 파일 DB: {"users": {"1": {...}}, "actuator_calibrations": {...}, ...}
+            legacy = read(legacy_db_path, {}) if legacy_db_path else {}
+            for record in legacy.get("users", {}).values():
+                add("users", None, None, record)
+            for record in legacy.get("devices", {}).values():
+                add("devices", None, None, record)
+            for calib_type in CALIB_TYPES:
+                for record in legacy.get(f"{calib_type}_calibrations", {}).values():
+                    if "device_id" in record:
+                        add("calibrations", int(record["device_id"]), calib_type, record)
+
+            self._rebuild_sequences(conn)
+            self._bump_versions(conn, "users", None, None)
+            self._bump_versions(conn, "devices", None, None)
+            for device_id, calib_type in conn.execute(
+                    "SELECT DISTINCT device_id, type FROM calibrations").fetchall():
+                self._bump_versions(conn, "calibrations", device_id, calib_type)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_at', ?)",
+                (datetime.now().isoformat(),),
+            )
+        return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(base_dir, "data")
+
+    parser = argparse.ArgumentParser(description="CalZero SQLite 저장소 도구")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default=os.getenv("CALZERO_SQLITE_PATH", os.path.join(data_dir, "calzero.sqlite3")))
+    parser.add_argument("--legacy", default=os.path.join(base_dir, "calzero_db.json"))
+    args = parser.parse_args()
+
+    counts = SqliteStorage(data_dir, args.db, args.legacy).migrate_from_json(args.legacy)
+    print(f"✅ Migrated: {counts}")
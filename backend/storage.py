@@ -0,0 +1,1095 @@
+"""
+CalZero 저장소 계층
+
+StorageBackend가 컬렉션 단위 읽기/쓰기 인터페이스를 정의하고, 기본 구현인
+JsonStorage는 data/ 아래 JSON 파일을 그대로 사용한다. CALZERO_STORAGE=journal
+이면 변경분을 JSON-lines 저널에 덧붙이는 JournalStorage, sqlite이면
+sqlite_storage.SqliteStorage를 사용한다.
+
+JSON 파일을 파싱한 결과를 프로세스 메모리에 보관하고, 파일 시그니처
+(inode, mtime, size)가 바뀐 경우에만 다시 읽는다. 저장은 임시 파일에 쓴 뒤
+rename으로 교체하므로 읽는 쪽은 잠금 없이도 항상 완전한 파일을 본다.
+읽기-수정-쓰기는 파일별 잠금(스레드 + fcntl.flock)으로 직렬화해 여러 uvicorn
+워커가 같은 파일을 갱신해도 변경이 유실되지 않는다.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용
+    fcntl = None
+
+
+# ==================== 오류 ====================
+
+class StorageError(Exception):
+    """저장소 오류"""
+
+
+class DuplicateRecordError(StorageError):
+    """고유해야 하는 값(사용자 email 등)이 이미 있음"""
+
+
+class CorruptDataError(StorageError):
+    """데이터 파일을 해석할 수 없음 (잘린 파일, 손상된 저널 등)"""
+
+    def __init__(self, filepath, reason):
+        super().__init__(f"{filepath}: {reason}")
+        self.filepath = filepath
+        self.reason = reason
+
+
+# ==================== 원자적 쓰기 / 잠금 ====================
+
+def atomic_write_bytes(filepath, payload):
+    """같은 디렉토리의 임시 파일에 쓰고 fsync 후 rename으로 교체"""
+    directory = os.path.dirname(filepath)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(filepath)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filepath)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def atomic_write_json(filepath, data):
+    """JSON을 원자적으로 저장"""
+    payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    atomic_write_bytes(filepath, payload)
+
+
+class _PathLock:
+    """경로 하나에 대한 재진입 가능한 잠금 (스레드 + 프로세스 간)"""
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+class LockRegistry:
+    """파일별 잠금 관리
+
+    잠금 파일은 데이터 디렉토리와 분리된 lock_dir에 두므로 장치 디렉토리를
+    통째로 지워도 잠금이 함께 사라지지 않는다.
+    """
+
+    def __init__(self, lock_dir, base_dir):
+        self.lock_dir = lock_dir
+        self.base_dir = base_dir
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def __call__(self, filepath):
+        with self._guard:
+            lock = self._locks.get(filepath)
+            if lock is None:
+                rel = os.path.relpath(filepath, self.base_dir).replace(os.sep, "__")
+                lock = self._locks[filepath] = _PathLock(os.path.join(self.lock_dir, f"{rel}.lock"))
+            return lock
+
+
+# ==================== ID 시퀀스 ====================
+
+def collection_name(filepath, data_dir):
+    """컬렉션 경로 -> 이름 (예: calibrations/device_7/actuator)"""
+    rel = os.path.relpath(filepath, data_dir).replace(os.sep, "/")
+    return os.path.splitext(rel)[0]
+
+
+class SequenceStore:
+    """컬렉션별 단조 증가 ID 시퀀스 (<seq_dir>/<컬렉션>.seq)
+
+    마지막으로 발급한 id를 저장하므로 최신 레코드를 지워도 id가 재사용되지 않는다.
+    파일이 없으면 seed()로 데이터의 최대 id를 구해 이어서 발급한다 (최초 1회).
+    호출자는 해당 컬렉션의 잠금을 보유하고 있어야 한다.
+    """
+
+    def __init__(self, seq_dir):
+        self.seq_dir = seq_dir
+
+    def _path(self, name):
+        return os.path.join(self.seq_dir, name.replace("/", "__") + ".seq")
+
+    def current(self, name):
+        """마지막으로 발급한 id (시퀀스가 없으면 None)"""
+        try:
+            with open(self._path(name), 'rb') as f:
+                raw = f.read().strip()
+        except FileNotFoundError:
+            return None
+        try:
+            return int(raw)
+        except ValueError as e:
+            raise CorruptDataError(self._path(name), str(e)) from e
+
+    def _write(self, name, value):
+        atomic_write_bytes(self._path(name), str(value).encode('ascii'))
+
+    def allocate(self, name, seed):
+        """다음 id 발급"""
+        value = self.current(name)
+        if value is None:
+            value = seed()
+        value += 1
+        self._write(name, value)
+        return value
+
+    def ensure_at_least(self, name, value):
+        """외부에서 id가 지정된 레코드가 들어오면 시퀀스를 그 이상으로 맞춘다"""
+        current = self.current(name)
+        if current is None or current < value:
+            self._write(name, value)
+
+
+# ==================== 캐시 ====================
+
+def file_signature(st):
+    """os.stat 결과로부터 변경 감지용 시그니처 생성
+
+    원자적 저장은 매번 새 inode를 만들고, 다른 프로세스가 쓴 경우에도
+    (inode, mtime, ctime, size) 중 하나는 반드시 바뀐다.
+    """
+    return (st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+
+
+class _CacheEntry:
+    __slots__ = ("signature", "data", "derived")
+
+    def __init__(self, signature, data):
+        self.signature = signature
+        self.data = data
+        self.derived = {}
+
+
+class JsonFileCache:
+    """파싱된 JSON 파일 캐시
+
+    load()가 돌려주는 객체는 캐시와 공유되므로 호출자는 읽기 전용으로 다뤄야 한다.
+    수정이 필요하면 복사본을 만든 뒤 save()로 저장한다.
+    파싱과 저장은 파일별 잠금으로만 직렬화하고, 전역 잠금은 항목을 바꿔 넣을 때만 잡는다.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._path_locks = {}
+        self._lock = threading.Lock()
+
+    def _path_lock(self, filepath):
+        with self._lock:
+            lock = self._path_locks.get(filepath)
+            if lock is None:
+                lock = self._path_locks[filepath] = threading.Lock()
+            return lock
+
+    def _current(self, filepath):
+        """최신 캐시 항목 반환 (파일이 없으면 None)"""
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(filepath, None)
+            return None
+
+        entry = self._entries.get(filepath)
+        if entry is not None and entry.signature == file_signature(st):
+            return entry
+
+        with self._path_lock(filepath):
+            entry = self._entries.get(filepath)
+            if entry is not None and entry.signature == file_signature(st):
+                return entry
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    # 열린 파일 기준으로 시그니처를 잡아야 읽는 도중의 교체를 놓치지 않는다
+                    signature = file_signature(os.fstat(f.fileno()))
+                    data = json.load(f)
+            except FileNotFoundError:
+                return None
+            except ValueError as e:
+                raise CorruptDataError(filepath, str(e)) from e
+            entry = _CacheEntry(signature, data)
+            with self._lock:
+                self._entries[filepath] = entry
+            return entry
+
+    def load(self, filepath, default):
+        """파일 내용 반환 (파일이 없으면 default, 손상되었으면 CorruptDataError)"""
+        entry = self._current(filepath)
+        return default if entry is None else entry.data
+
+    def peek(self, filepath, default):
+        """파일 내용 반환 (캐시에 없으면 읽기만 하고 캐시에 넣지 않는다, 백업처럼 한 번 훑을 때)"""
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return default
+        entry = self._entries.get(filepath)
+        if entry is not None and entry.signature == file_signature(st):
+            return entry.data
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+        except ValueError as e:
+            raise CorruptDataError(filepath, str(e)) from e
+
+    def derived(self, filepath, key, build):
+        """파일 내용에서 만든 파생 값 (파일이 바뀌면 다시 만든다, 파일이 없으면 None)"""
+        entry = self._current(filepath)
+        if entry is None or not isinstance(entry.data, list):
+            return None
+
+        value = entry.derived.get(key)
+        if value is None:
+            value = entry.derived[key] = build(entry.data)
+        return value
+
+    def index(self, filepath, field='id'):
+        """field 값 -> 항목 사전 반환"""
+        index = self.derived(
+            filepath, ('index', field),
+            lambda data: {item[field]: item for item in data if field in item},
+        )
+        return index or {}
+
+    def save(self, filepath, data):
+        """파일에 원자적으로 쓰고 캐시 갱신"""
+        with self._path_lock(filepath):
+            atomic_write_json(filepath, data)
+            signature = file_signature(os.stat(filepath))
+            stored = list(data) if isinstance(data, list) else data
+            with self._lock:
+                self._entries[filepath] = _CacheEntry(signature, stored)
+
+    def invalidate(self, filepath=None):
+        """캐시 항목 제거 (filepath가 없으면 전체, 디렉토리면 하위 전체)"""
+        with self._lock:
+            if filepath is None:
+                self._entries.clear()
+                return
+            prefix = os.path.join(filepath, "")
+            for key in list(self._entries):
+                if key == filepath or key.startswith(prefix):
+                    del self._entries[key]
+
+
+file_cache = JsonFileCache()
+
+
+# ==================== 백엔드 인터페이스 ====================
+
+CALIB_TYPES = ["actuator", "intrinsic", "extrinsic", "handeye", "replay"]
+
+
+def record_sort_key(item):
+    """최신순 정렬/커서 키 (created_at, device_id, id)
+
+    id는 장치별로 매겨지므로 전체 장치 목록에서도 순서가 유일하도록 device_id를 포함한다.
+    """
+    return (item.get('created_at', ''), item.get('device_id') or 0, item.get('id', 0))
+
+
+def sort_newest_first(items):
+    """created_at 내림차순 정렬 (같으면 device_id, id 내림차순)"""
+    return sorted(items, key=record_sort_key, reverse=True)
+
+
+def _first_below(items, bound):
+    """최신순 items에서 키가 bound보다 작은 첫 위치 (이진 탐색)"""
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if record_sort_key(items[mid]) >= bound:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def page_newest_first(items, before=None, limit=None, since=None):
+    """최신순으로 정렬된 items에서 키가 before보다 작고 created_at >= since인 레코드 limit개
+
+    before는 커서 키 또는 (until,) 처럼 앞부분만 있는 튜플이어도 된다.
+    """
+    start = _first_below(items, tuple(before)) if before is not None else 0
+    end = _first_below(items, (since,)) if since else len(items)
+    if limit:
+        end = min(end, start + limit)
+    return items[start:end]
+
+
+# ==================== 전체 장치 인덱스 ====================
+
+class _FleetEntry:
+    __slots__ = ("signatures", "slices", "items", "derived")
+
+    def __init__(self, signatures, slices, items):
+        self.signatures = signatures
+        self.slices = slices
+        self.items = items
+        self.derived = {}
+
+
+class FleetIndex:
+    """캘리브레이션 종류별 전체 장치 최신순 인덱스
+
+    (created_at, device_id, id) 내림차순 목록과 장치별 구간, 그 장치 파일의 버전 태그를 메모리에 둔다.
+    조회 때마다 호출자가 넘긴 장치별 태그와 비교해 바뀐 장치 구간만 다시 읽으므로
+    다른 프로세스의 쓰기나 파일 직접 수정도 다음 조회에 반영된다.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._guard = threading.Lock()
+
+    def invalidate(self):
+        """메모리 인덱스 비우기 (다음 조회 때 전체를 다시 읽는다)"""
+        with self._guard:
+            self._entries.clear()
+
+    def items(self, calib_type, signatures, load, camera=None):
+        """최신순 전체 목록
+
+        signatures: {device_id: 버전 태그}, load(device_id) -> 그 장치의 최신순 목록 (태그가 바뀐 장치만 호출)
+        """
+        with self._guard:
+            entry = self._entries.get(calib_type)
+        if entry is None or entry.signatures != signatures:
+            previous = entry or _FleetEntry({}, {}, [])
+            slices = {
+                device_id: (previous.slices[device_id] if previous.signatures.get(device_id) == tag
+                            else load(device_id))
+                for device_id, tag in signatures.items()
+            }
+            merged = list(heapq.merge(*slices.values(), key=record_sort_key, reverse=True))
+            entry = _FleetEntry(dict(signatures), slices, merged)
+            with self._guard:
+                self._entries[calib_type] = entry
+        if not camera:
+            return entry.items
+        items = entry.derived.get(camera)
+        if items is None:
+            items = entry.derived[camera] = [c for c in entry.items if c.get('camera') == camera]
+        return items
+
+
+class StorageBackend:
+    """저장소 백엔드 인터페이스
+
+    컬렉션은 JSON 레이아웃의 파일 경로로 식별한다
+    (users.json, devices.json, calibrations/device_<id>/<type>.json).
+    """
+
+    name = "abstract"
+
+    def prepare(self):
+        """서버 기동 시 한 번 호출 (스키마 준비, 마이그레이션 등)"""
+
+    @contextmanager
+    def lock(self, filepath):
+        """컬렉션 단위 배타 잠금 (여러 연산을 묶어 읽기-수정-쓰기할 때 사용)"""
+        yield
+
+    def load(self, filepath, default):
+        """컬렉션 전체 반환 (저장 순서)"""
+        raise NotImplementedError
+
+    def save(self, filepath, items):
+        """컬렉션 전체 교체"""
+        raise NotImplementedError
+
+    def iter_records(self, filepath):
+        """컬렉션 레코드를 저장 순서로 하나씩 (전체를 한 번 훑는 백업용, 캐시를 채우지 않는다)"""
+        yield from self.load(filepath, [])
+
+    def get(self, filepath, record_id):
+        """id로 레코드 조회 (없으면 None)"""
+        raise NotImplementedError
+
+    def find_one(self, filepath, field, value):
+        """field == value 인 첫 레코드 조회 (없으면 None)"""
+        raise NotImplementedError
+
+    def query(self, filepath, camera=None, before=None, limit=None, since=None):
+        """레코드 목록을 최신순으로 반환
+
+        before: record_sort_key() 커서. 이 키보다 오래된 레코드만 반환한다.
+        limit: 최대 개수 (None이면 전체)
+        since: created_at 하한 (포함)
+        """
+        raise NotImplementedError
+
+    def query_fleet(self, calib_type, camera=None, before=None, limit=None, since=None):
+        """전체 장치의 calib_type 레코드를 최신순으로 반환 (인자는 query()와 같음)"""
+        raise NotImplementedError
+
+    def version(self, filepath):
+        """컬렉션 버전 (tag, last_modified)
+
+        tag는 내용이 바뀌면 반드시 바뀌는 문자열, last_modified는 마지막 변경 시각
+        (epoch 초, 알 수 없으면 None). ETag / Last-Modified 계산에 쓴다.
+        """
+        raise NotImplementedError
+
+    def fleet_version(self, calib_type):
+        """전체 장치 calib_type 목록의 버전 (version()과 같은 형식)"""
+        raise NotImplementedError
+
+    def insert(self, filepath, record, activate_scope=None):
+        """레코드 추가 (id가 없으면 컬렉션 시퀀스에서 할당) 후 저장된 레코드 반환
+
+        activate_scope가 있고 record가 is_active면 같은 activate_scope 값을 가진 다른 레코드를
+        같은 쓰기에서 비활성화한다 (insert 후 set_active를 따로 부르면 그 사이 활성 레코드가 둘이 된다).
+        """
+        raise NotImplementedError
+
+    def update(self, filepath, record_id, changes):
+        """레코드 일부 필드 갱신 후 갱신된 레코드 반환 (없으면 None)"""
+        raise NotImplementedError
+
+    def delete(self, filepath, record_id):
+        """레코드 삭제 (삭제했으면 True)"""
+        raise NotImplementedError
+
+    def set_active(self, filepath, record_id, scope_field='camera'):
+        """같은 scope_field 값을 가진 레코드 중 record_id만 활성화 (없으면 False)"""
+        raise NotImplementedError
+
+    def drop_device(self, device_id):
+        """장치의 모든 캘리브레이션 삭제"""
+        raise NotImplementedError
+
+    def reset_calibrations(self):
+        """모든 장치의 캘리브레이션 삭제"""
+        raise NotImplementedError
+
+    def restore_session(self):
+        """전체 복원 (context manager) -> session.add(filepath, record)
+
+        블록이 정상 종료되면 받은 레코드로 장치 / 캘리브레이션 전체(사용자는 받은 경우만)를 한 번에 교체하고,
+        예외가 나면 기존 데이터를 그대로 둔다. 같은 컬렉션의 레코드는 연속으로 들어와야 한다.
+        """
+        raise NotImplementedError
+
+
+# ==================== JSON 파일 백엔드 ====================
+
+class JsonStorage(StorageBackend):
+    """파일 기반 저장소 (기존 data/ 디렉토리 레이아웃)"""
+
+    name = "file-based"
+
+    def __init__(self, data_dir, cache=None):
+        self.data_dir = data_dir
+        self.calibrations_dir = os.path.join(data_dir, "calibrations")
+        self.cache = cache or file_cache
+        self._file_locks = LockRegistry(os.path.join(data_dir, ".locks"), data_dir)
+        self.sequences = SequenceStore(os.path.join(data_dir, ".sequences"))
+        self.fleet = FleetIndex()
+
+    def lock(self, filepath):
+        return self._file_locks(filepath)
+
+    def load(self, filepath, default):
+        return self.cache.load(filepath, default)
+
+    def iter_records(self, filepath):
+        yield from self.cache.peek(filepath, [])
+
+    def _next_id(self, filepath, items):
+        """시퀀스에서 id 발급 (호출자가 잠금 보유)"""
+        return self.sequences.allocate(
+            collection_name(filepath, self.data_dir),
+            lambda: max((item.get('id', 0) for item in items), default=0),
+        )
+
+    def _reserve_ids(self, filepath, items):
+        """저장되는 레코드의 최대 id까지 시퀀스를 올린다 (호출자가 잠금 보유)"""
+        max_id = max((item.get('id', 0) for item in items), default=0)
+        if max_id:
+            self.sequences.ensure_at_least(collection_name(filepath, self.data_dir), max_id)
+
+    def save(self, filepath, items):
+        with self.lock(filepath):
+            self._reserve_ids(filepath, items)
+            self.cache.save(filepath, items)
+
+    def get(self, filepath, record_id):
+        return self.cache.index(filepath, 'id').get(record_id)
+
+    def find_one(self, filepath, field, value):
+        return self.cache.index(filepath, field).get(value)
+
+    def query(self, filepath, camera=None, before=None, limit=None, since=None):
+        items = self.cache.derived(
+            filepath, ('sorted', camera),
+            lambda data: sort_newest_first(c for c in data if not camera or c.get('camera') == camera),
+        )
+        return page_newest_first(items or [], before, limit, since)
+
+    def _fleet_file(self, device_id, calib_type):
+        return os.path.join(self.calibrations_dir, f"device_{device_id}", f"{calib_type}.json")
+
+    def _fleet_versions(self, calib_type):
+        """장치 디렉토리를 훑어 {device_id: (버전 태그, 수정 시각)} (파일이 없는 장치는 제외)"""
+        versions = {}
+        if os.path.isdir(self.calibrations_dir):
+            for entry in os.listdir(self.calibrations_dir):
+                m = re.fullmatch(r"device_(\d+)", entry)
+                if m:
+                    device_id = int(m.group(1))
+                    tag, mtime = self.version(self._fleet_file(device_id, calib_type))
+                    if mtime is not None:
+                        versions[device_id] = (tag, mtime)
+        return versions
+
+    def query_fleet(self, calib_type, camera=None, before=None, limit=None, since=None):
+        signatures = {device_id: tag for device_id, (tag, _) in self._fleet_versions(calib_type).items()}
+        items = self.fleet.items(
+            calib_type, signatures,
+            lambda device_id: self.query(self._fleet_file(device_id, calib_type)), camera,
+        )
+        return page_newest_first(items, before, limit, since)
+
+    def version(self, filepath):
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return "none", None
+        return "-".join(map(str, file_signature(st))), st.st_mtime
+
+    def fleet_version(self, calib_type):
+        # 장치 파일 버전 태그를 합친 값이라 API 밖의 수정(다른 프로세스, 직접 편집)도 바뀐다
+        versions = self._fleet_versions(calib_type)
+        if not versions:
+            return "none", None
+        digest = hashlib.sha1(repr(sorted(versions.items())).encode('utf-8')).hexdigest()[:16]
+        return digest, max(mtime for _, mtime in versions.values())
+
+    def insert(self, filepath, record, activate_scope=None):
+        with self.lock(filepath):
+            items = list(self.cache.load(filepath, []))
+            if 'id' not in record:
+                record = {**record, 'id': self._next_id(filepath, items)}
+            else:
+                self._reserve_ids(filepath, [record])
+            if activate_scope and record.get('is_active'):
+                scope = record.get(activate_scope)
+                items = [{**item, 'is_active': False} if item.get(activate_scope) == scope and item.get('is_active')
+                         else item for item in items]
+            items.append(record)
+            self.cache.save(filepath, items)
+        return record
+
+    def update(self, filepath, record_id, changes):
+        with self.lock(filepath):
+            items = list(self.cache.load(filepath, []))
+            idx = next((i for i, item in enumerate(items) if item.get('id') == record_id), None)
+            if idx is None:
+                return None
+            items[idx] = {**items[idx], **changes}
+            self.cache.save(filepath, items)
+        return items[idx]
+
+    def delete(self, filepath, record_id):
+        with self.lock(filepath):
+            items = self.cache.load(filepath, [])
+            remaining = [item for item in items if item.get('id') != record_id]
+            if len(remaining) == len(items):
+                return False
+            self.cache.save(filepath, remaining)
+        return True
+
+    def set_active(self, filepath, record_id, scope_field='camera'):
+        with self.lock(filepath):
+            items = self.cache.load(filepath, [])
+            target = next((item for item in items if item.get('id') == record_id), None)
+            if target is None:
+                return False
+            scope = target.get(scope_field)
+            self.cache.save(filepath, [
+                {**item, 'is_active': item.get('id') == record_id} if item.get(scope_field) == scope else item
+                for item in items
+            ])
+        return True
+
+    def drop_device(self, device_id):
+        device_dir = os.path.join(self.calibrations_dir, f"device_{device_id}")
+        if os.path.exists(device_dir):
+            shutil.rmtree(device_dir)
+
+    def reset_calibrations(self):
+        if os.path.exists(self.calibrations_dir):
+            shutil.rmtree(self.calibrations_dir)
+        os.makedirs(self.calibrations_dir, exist_ok=True)
+
+    def restore_session(self):
+        return _StagedRestore(self)
+
+    def _collection_files(self, filepath):
+        """컬렉션을 이루는 파일들 (복원 시 함께 교체)"""
+        return [filepath]
+
+
+# ==================== 스테이징 복원 ====================
+
+# 복원 시 컬렉션 파일을 쓰는 스레드 수
+RESTORE_WORKERS = int(os.getenv("CALZERO_RESTORE_WORKERS", "4"))
+
+
+class _StagedRestore:
+    """JSON 레이아웃 복원: data/.restore-*/ 에 컬렉션 파일을 스레드 풀로 쓴 뒤 rename으로 교체
+
+    - 컬렉션이 끝날 때마다(다음 컬렉션 레코드가 오면) 그 파일 쓰기를 풀에 넘기므로
+      메모리에는 컬렉션 하나와 쓰는 중인 파일 몇 개만 남는다
+    - 교체 순서: 기존 calibrations/, devices.json, (users.json) 을 스테이징의 previous/로 옮기고
+      새 파일을 제자리로 옮긴다. 중간에 실패하면 옮긴 것을 되돌린다
+    """
+
+    def __init__(self, storage, workers=RESTORE_WORKERS):
+        self.storage = storage
+        self.workers = workers
+        self.staging = None
+        self._pool = None
+        self._pending = set()
+        self._current = None
+        self._buffer = []
+        self._done = set()
+        self._max_ids = {}
+
+    def __enter__(self):
+        self.staging = tempfile.mkdtemp(prefix=".restore-", dir=self.storage.data_dir)
+        os.makedirs(os.path.join(self.staging, "calibrations"))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="restore")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._flush()
+                self._drain(0)
+                self._swap()
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            shutil.rmtree(self.staging, ignore_errors=True)
+        return False
+
+    def add(self, filepath, record):
+        rel = os.path.relpath(filepath, self.storage.data_dir)
+        if rel != self._current:
+            self._flush()
+            if rel in self._done:
+                raise StorageError(f"Records for {collection_name(filepath, self.storage.data_dir)} are not contiguous")
+            self._current = rel
+        self._buffer.append(record)
+        name = collection_name(filepath, self.storage.data_dir)
+        self._max_ids[name] = max(self._max_ids.get(name, 0), record.get('id', 0))
+
+    def _flush(self):
+        if self._current is None:
+            return
+        # 쓰는 중인 파일이 너무 많으면 하나가 끝날 때까지 기다린다 (메모리 상한)
+        self._drain(self.workers * 2)
+        self._pending.add(self._pool.submit(atomic_write_json, os.path.join(self.staging, self._current), self._buffer))
+        self._done.add(self._current)
+        self._current, self._buffer = None, []
+
+    def _drain(self, limit):
+        while len(self._pending) > limit:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+
+    def _swap(self):
+        storage = self.storage
+        data_dir = storage.data_dir
+        previous = os.path.join(self.staging, "previous")
+        os.makedirs(previous)
+        moves = [("calibrations", True)]
+        for name in ("devices.json", "users.json"):
+            # 장치 목록은 항상 교체, 사용자는 백업에 있을 때만 (로그인 계정을 지우지 않도록)
+            if name == "devices.json" or name in self._done:
+                moves.append((name, name in self._done))
+
+        locks = [storage.lock(os.path.join(data_dir, name)) for name in ("users.json", "devices.json")]
+        with locks[0], locks[1]:
+            undo = []
+            try:
+                for name, staged in moves:
+                    target = os.path.join(data_dir, name)
+                    for path in storage._collection_files(target):
+                        if os.path.exists(path):
+                            aside = os.path.join(previous, os.path.basename(path))
+                            os.replace(path, aside)
+                            undo.append((aside, path))
+                    if staged:
+                        os.replace(os.path.join(self.staging, name), target)
+                        undo.append((target, None))
+                    elif name == "devices.json":
+                        atomic_write_json(target, [])
+                        undo.append((target, None))
+            except BaseException:
+                for src, dst in reversed(undo):
+                    if dst is None:
+                        if os.path.isdir(src):
+                            shutil.rmtree(src, ignore_errors=True)
+                        elif os.path.exists(src):
+                            os.remove(src)
+                    else:
+                        os.replace(src, dst)
+                raise
+            finally:
+                storage.cache.invalidate()
+                storage.fleet.invalidate()
+            for name, max_id in self._max_ids.items():
+                storage.sequences.ensure_at_least(name, max_id)
+
+
+# ==================== JSON 저널 백엔드 ====================
+
+JOURNAL_COMPACT_OPS = int(os.getenv("CALZERO_JOURNAL_COMPACT_OPS", "500"))
+
+
+def journal_path(filepath):
+    """스냅샷(<type>.json)에 대응하는 저널 파일 경로(<type>.jsonl)"""
+    return os.path.splitext(filepath)[0] + ".jsonl"
+
+
+def _activate(items, record_id, field):
+    """field 값이 같은 레코드 중 record_id만 활성화"""
+    target = items.get(record_id)
+    if target is None:
+        return
+    scope = target.get(field)
+    for rid, item in items.items():
+        active = rid == record_id
+        if item.get(field) == scope and bool(item.get("is_active")) != active:
+            items[rid] = {**item, "is_active": active}
+
+
+def apply_journal_op(items, op):
+    """저널 연산 하나를 id -> 레코드 사전에 적용
+
+    모든 연산은 같은 결과 상태에 다시 적용해도 결과가 같다 (압축 도중 읽기 대비).
+    """
+    kind = op["op"]
+    if kind == "insert":
+        items[op["record"]["id"]] = op["record"]
+        if op.get("activate") and op["record"].get("is_active"):
+            _activate(items, op["record"]["id"], op["activate"])
+    elif kind == "update":
+        if op["id"] in items:
+            items[op["id"]] = {**items[op["id"]], **op["changes"]}
+    elif kind == "delete":
+        items.pop(op["id"], None)
+    elif kind == "activate":
+        _activate(items, op["id"], op.get("scope", "camera"))
+    else:
+        raise ValueError(f"Unknown journal op: {kind}")
+
+
+class _JournalState:
+    """스냅샷 + 저널을 재생한 메모리 상태"""
+
+    __slots__ = ("snapshot_signature", "journal_inode", "offset", "items", "ops", "derived")
+
+    def __init__(self, snapshot_signature, journal_inode, items):
+        self.snapshot_signature = snapshot_signature
+        self.journal_inode = journal_inode
+        self.offset = 0
+        self.items = items
+        self.ops = 0
+        self.derived = {}
+
+
+class JournalStorage(JsonStorage):
+    """JSON 스냅샷 + 추가 전용 JSON-lines 저널
+
+    insert / update / delete / is_active 변경은 <type>.jsonl에 한 줄씩 덧붙이고,
+    저널이 JOURNAL_COMPACT_OPS 줄을 넘으면 백그라운드 스레드가 스냅샷으로 압축한다.
+    스냅샷 형식은 JsonStorage와 같으므로 압축 후에는 json 모드로 되돌릴 수 있다.
+    """
+
+    name = "journal"
+
+    def __init__(self, data_dir, compact_ops=JOURNAL_COMPACT_OPS):
+        super().__init__(data_dir)
+        self.compact_ops = compact_ops
+        self._states = {}
+        self._state_locks = {}
+        self._guard = threading.Lock()
+        self._compact_queue = queue.Queue()
+        self._compact_pending = set()
+        self._compactor = None
+
+    # ---------- 상태 관리 ----------
+
+    def _state_lock(self, filepath):
+        """메모리 상태 갱신용 스레드 잠금 (쓰기 직렬화는 lock()이 담당)"""
+        with self._guard:
+            lock = self._state_locks.get(filepath)
+            if lock is None:
+                lock = self._state_locks[filepath] = threading.RLock()
+            return lock
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def _read_snapshot(self, filepath):
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                signature = file_signature(os.fstat(f.fileno()))
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, {}
+        except ValueError as e:
+            raise CorruptDataError(filepath, str(e)) from e
+        return signature, {item['id']: item for item in data}
+
+    def _tail(self, state, jpath):
+        """저널에서 state.offset 이후에 추가된 줄을 적용"""
+        with open(jpath, 'rb') as f:
+            f.seek(state.offset)
+            chunk = f.read()
+        # 마지막 줄이 개행 없이 끝나면 아직 쓰는 중(또는 쓰다 중단된) 줄이므로 보류
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                op = json.loads(line)
+            except ValueError as e:
+                raise CorruptDataError(jpath, f"bad journal line after offset {state.offset}: {e}") from e
+            apply_journal_op(state.items, op)
+            state.ops += 1
+        if end:
+            state.offset += end
+            state.derived = {}
+
+    def _state(self, filepath):
+        """최신 상태 반환 (다른 프로세스의 압축/추가도 반영)"""
+        jpath = journal_path(filepath)
+        with self._state_lock(filepath):
+            snapshot_st = self._stat(filepath)
+            journal_st = self._stat(jpath)
+            snapshot_signature = file_signature(snapshot_st) if snapshot_st else None
+            journal_inode = journal_st.st_ino if journal_st else None
+            journal_size = journal_st.st_size if journal_st else 0
+
+            state = self._states.get(filepath)
+            if (state is None
+                    or state.snapshot_signature != snapshot_signature
+                    or state.journal_inode != journal_inode
+                    or journal_size < state.offset):
+                snapshot_signature, items = self._read_snapshot(filepath)
+                state = _JournalState(snapshot_signature, journal_inode, items)
+                self._states[filepath] = state
+
+            if journal_size > state.offset:
+                self._tail(state, jpath)
+            return state
+
+    def version(self, filepath):
+        snapshot_tag, snapshot_mtime = super().version(filepath)
+        journal_tag, journal_mtime = super().version(journal_path(filepath))
+        mtimes = [t for t in (snapshot_mtime, journal_mtime) if t is not None]
+        return f"{snapshot_tag}+{journal_tag}", max(mtimes) if mtimes else None
+
+    def _derived(self, state, key, build):
+        value = state.derived.get(key)
+        if value is None:
+            value = state.derived[key] = build()
+        return value
+
+    def _append(self, filepath, op):
+        """저널에 연산 한 줄 추가 후 메모리 상태에 적용 (호출자가 잠금 보유)"""
+        jpath = journal_path(filepath)
+        state = self._state(filepath)
+        os.makedirs(os.path.dirname(jpath), exist_ok=True)
+        with open(jpath, 'ab') as f:
+            # 중단된 이전 쓰기가 남긴 미완성 줄은 잘라낸다
+            if f.tell() > state.offset:
+                f.truncate(state.offset)
+            f.write(json.dumps(op, ensure_ascii=False).encode('utf-8') + b'\n')
+        # 우리 줄까지 반영 (그 사이 다른 프로세스가 추가한 줄도 함께 읽힘)
+        state = self._state(filepath)
+        if state.ops >= self.compact_ops:
+            self._schedule_compaction(filepath)
+        return state
+
+    # ---------- 압축 ----------
+
+    def _write_snapshot(self, filepath, items):
+        """스냅샷을 원자적으로 교체하고 저널을 비운다 (호출자가 잠금 보유)"""
+        atomic_write_json(filepath, items)
+        jpath = journal_path(filepath)
+        if os.path.exists(jpath):
+            atomic_write_bytes(jpath, b'')
+        with self._state_lock(filepath):
+            self._states.pop(filepath, None)
+
+    def compact(self, filepath):
+        """저널을 스냅샷에 합치고 비운다"""
+        with self.lock(filepath):
+            state = self._state(filepath)
+            if state.ops:
+                self._write_snapshot(filepath, list(state.items.values()))
+
+    def _schedule_compaction(self, filepath):
+        with self._guard:
+            if filepath in self._compact_pending:
+                return
+            self._compact_pending.add(filepath)
+            if self._compactor is None:
+                self._compactor = threading.Thread(
+                    target=self._compaction_worker, name="journal-compactor", daemon=True
+                )
+                self._compactor.start()
+        self._compact_queue.put(filepath)
+
+    def _compaction_worker(self):
+        while True:
+            filepath = self._compact_queue.get()
+            with self._guard:
+                self._compact_pending.discard(filepath)
+            try:
+                self.compact(filepath)
+            except (OSError, StorageError) as e:
+                print(f"⚠️ Journal compaction failed for {filepath}: {e}")
+
+    # ---------- StorageBackend ----------
+
+    def load(self, filepath, default):
+        state = self._state(filepath)
+        if not state.items and state.snapshot_signature is None:
+            return default
+        return self._derived(state, 'list', lambda: list(state.items.values()))
+
+    def iter_records(self, filepath):
+        # 저널 상태는 스냅샷 + 저널을 합쳐야 하므로 load()를 그대로 쓴다
+        yield from self.load(filepath, [])
+
+    def _collection_files(self, filepath):
+        return [filepath, journal_path(filepath)]
+
+    def save(self, filepath, items):
+        with self.lock(filepath):
+            self._reserve_ids(filepath, items)
+            self._write_snapshot(filepath, list(items))
+
+    def get(self, filepath, record_id):
+        return self._state(filepath).items.get(record_id)
+
+    def find_one(self, filepath, field, value):
+        state = self._state(filepath)
+        index = self._derived(
+            state, ('index', field),
+            lambda: {item[field]: item for item in state.items.values() if field in item},
+        )
+        return index.get(value)
+
+    def query(self, filepath, camera=None, before=None, limit=None, since=None):
+        state = self._state(filepath)
+        items = self._derived(
+            state, ('sorted', camera),
+            lambda: sort_newest_first(c for c in state.items.values() if not camera or c.get('camera') == camera),
+        )
+        return page_newest_first(items, before, limit, since)
+
+    def insert(self, filepath, record, activate_scope=None):
+        with self.lock(filepath):
+            if 'id' not in record:
+                items = self._state(filepath).items
+                record = {**record, 'id': self._next_id(filepath, items.values())}
+            else:
+                self._reserve_ids(filepath, [record])
+            op = {"op": "insert", "record": record}
+            if activate_scope:
+                op["activate"] = activate_scope
+            self._append(filepath, op)
+        return record
+
+    def update(self, filepath, record_id, changes):
+        with self.lock(filepath):
+            if record_id not in self._state(filepath).items:
+                return None
+            state = self._append(filepath, {"op": "update", "id": record_id, "changes": changes})
+            return state.items.get(record_id)
+
+    def delete(self, filepath, record_id):
+        with self.lock(filepath):
+            if record_id not in self._state(filepath).items:
+                return False
+            self._append(filepath, {"op": "delete", "id": record_id})
+        return True
+
+    def set_active(self, filepath, record_id, scope_field='camera'):
+        with self.lock(filepath):
+            if record_id not in self._state(filepath).items:
+                return False
+            self._append(filepath, {"op": "activate", "id": record_id, "scope": scope_field})
+        return True
+
+
+# ==================== 백엔드 선택 ====================
+
+def create_storage(data_dir, legacy_db_path=None):
+    """CALZERO_STORAGE 환경변수(json | journal | sqlite)에 맞는 백엔드 생성"""
+    kind = os.getenv("CALZERO_STORAGE", "json").lower()
+    if kind == "json":
+        return JsonStorage(data_dir)
+    if kind == "journal":
+        return JournalStorage(data_dir)
+    if kind == "sqlite":
+        from sqlite_storage import SqliteStorage
+        db_path = os.getenv("CALZERO_SQLITE_PATH", os.path.join(data_dir, "calzero.sqlite3"))
+        return SqliteStorage(data_dir, db_path, legacy_db_path)
+    raise ValueError(f"Unknown CALZERO_STORAGE: {kind}")
@@ -0,0 +1,22 @@
+"""
+CalZero 프로세스 수 설정
+
+- WEB_CONCURRENCY: API 워커 프로세스 수 (정수 또는 "auto" = CPU 코어 수)
+- 계산용 프로세스 풀(코너 검출, 데이터셋 분석)은 API 워커마다 따로 만들어지므로
+  따로 지정하지 않으면 CPU 코어 수를 워커 수로 나눈 크기로 만든다 (워커 x 코어 개수만큼 늘어나지 않도록)
+"""
+
+import os
+
+
+def web_concurrency():
+    """WEB_CONCURRENCY 환경변수로 워커 수 결정 ('auto'면 CPU 코어 수)"""
+    value = os.getenv("WEB_CONCURRENCY", "1")
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def pool_size(env_name):
+    """계산 풀 크기 (env_name이 0이 아니면 그 값, 아니면 코어 수 / 워커 수)"""
+    return int(os.getenv(env_name, "0")) or max(1, (os.cpu_count() or 1) // web_concurrency())
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import Login from './components/common/Login'
 import DeviceList from './components/common/DeviceList'
 import CalibrationHistory from './components/actuator/CalibrationHistory'
@@ -62,6 +62,14 @@ const subMenus = {
   ],
 }
 
+const HISTORY_PAGE_SIZE = 50
+const FULL_HISTORY_PAGE_SIZE = 1000
+// 전체 기록으로 집계하는 화면 → 필요한 히스토리 타입
+const FULL_HISTORY_MENUS = {
+  'data-analysis': ['actuator'],
+  'stats': ['actuator'],
+}
+
 function App() {
   const [user, setUser] = useState(null)
   const [selectedDevice, setSelectedDevice] = useState(null)
@@ -71,6 +79,9 @@ function App() {
   const [extrinsicCalibrations, setExtrinsicCalibrations] = useState([])
   const [handEyeCalibrations, setHandEyeCalibrations] = useState([])
   const [replayTests, setReplayTests] = useState([])
+  const [nextCursors, setNextCursors] = useState({})
+  const loadedDeviceRef = useRef(null)
+  const fullLoadsRef = useRef(new Set())
   const [activeTopMenu, setActiveTopMenu] = useState('actuator')
   const [activeSubMenu, setActiveSubMenu] = useState('calibration')
   const [activeSettingsMenu, setActiveSettingsMenu] = useState(null) // null이면 Settings 비활성
@@ -89,6 +100,11 @@ function App() {
     if (selectedDevice) loadCalibrations(selectedDevice.id)
   }, [selectedDevice])
 
+  useEffect(() => {
+    if (activeTopMenu !== 'actuator') return
+    (FULL_HISTORY_MENUS[activeSubMenu] || []).forEach(type => { if (nextCursors[type]) loadFullHistory(type) })
+  }, [activeTopMenu, activeSubMenu, nextCursors])
+
   const loadInitialData = async () => {
     setIsLoading(true)
     try {
@@ -103,21 +119,61 @@ function App() {
     setIsLoading(false)
   }
 
+  const historySetters = {
+    actuator: setCalibrations, intrinsic: setIntrinsicCalibrations,
+    extrinsic: setExtrinsicCalibrations, handeye: setHandEyeCalibrations,
+    replay: setReplayTests,
+  }
+
+  // 히스토리는 HISTORY_PAGE_SIZE 단위로 받아오고, 다음 커서는 타입별로 보관한다
   const loadCalibrations = async (deviceId) => {
+    loadedDeviceRef.current = deviceId
     try {
-      const [actuator, intrinsic, extrinsic, handeye, replay] = await Promise.all([
-        api.actuator.list(deviceId), api.intrinsic.list(deviceId),
-        api.extrinsic.list(deviceId), api.handeye.list(deviceId),
-        api.replay.list(deviceId),
-      ])
-      setCalibrations(actuator)
-      setIntrinsicCalibrations(intrinsic)
-      setExtrinsicCalibrations(extrinsic)
-      setHandEyeCalibrations(handeye)
-      setReplayTests(replay)
+      const types = Object.keys(historySetters)
+      const pages = await Promise.all(types.map(type => api[type].page(deviceId, { limit: HISTORY_PAGE_SIZE })))
+      if (loadedDeviceRef.current !== deviceId) return
+      const cursors = {}
+      types.forEach((type, i) => {
+        historySetters[type](pages[i].items)
+        cursors[type] = pages[i].nextCursor
+      })
+      setNextCursors(cursors)
     } catch (error) { console.error('Failed to load calibrations:', error) }
   }
 
+  const loadMoreHistory = async (type) => {
+    const deviceId = loadedDeviceRef.current
+    const cursor = nextCursors[type]
+    if (!deviceId || !cursor) return
+    try {
+      const { items, nextCursor } = await api[type].page(deviceId, { limit: HISTORY_PAGE_SIZE, cursor })
+      if (loadedDeviceRef.current !== deviceId) return
+      historySetters[type](prev => [...prev, ...items])
+      setNextCursors(prev => ({ ...prev, [type]: nextCursor }))
+    } catch (error) { console.error(`Failed to load more ${type} history:`, error) }
+  }
+
+  // 통계/분석 화면은 전체 기록이 필요하므로 남은 페이지를 끝까지 받아온다
+  const loadFullHistory = async (type) => {
+    const deviceId = loadedDeviceRef.current
+    let cursor = nextCursors[type]
+    const key = `${deviceId}:${type}`
+    if (!deviceId || !cursor || fullLoadsRef.current.has(key)) return
+    fullLoadsRef.current.add(key)
+    try {
+      const rest = []
+      while (cursor) {
+        const { items, nextCursor } = await api[type].page(deviceId, { limit: FULL_HISTORY_PAGE_SIZE, cursor })
+        if (loadedDeviceRef.current !== deviceId) return
+        rest.push(...items)
+        cursor = nextCursor
+      }
+      historySetters[type](prev => [...prev, ...rest])
+      setNextCursors(prev => ({ ...prev, [type]: null }))
+    } catch (error) { console.error(`Failed to load ${type} history:`, error) }
+    finally { fullLoadsRef.current.delete(key) }
+  }
+
   const handleLogin = (userData, token, remember) => {
     setUser(userData)
     if (remember) {
@@ -263,8 +319,8 @@ function App() {
     if (activeTopMenu === 'actuator') {
       switch (activeSubMenu) {
         case 'calibration': return <CalibrationHistory device={selectedDevice} calibrations={calibrations} onSave={handleActuatorCalibrationSave} onDelete={handleActuatorCalibrationDelete} setActiveSubMenu={setActiveSubMenu} />
-        case 'history': return <ActuatorHistory device={selectedDevice} calibrations={calibrations} onDelete={handleActuatorCalibrationDelete} />
-        case 'replay-analysis': return <ReplayAnalysis device={selectedDevice} calibrations={calibrations} replayTests={replayTests} onSave={handleReplayTestSave} onDelete={handleReplayTestDelete} />
+        case 'history': return <ActuatorHistory device={selectedDevice} calibrations={calibrations} hasMore={!!nextCursors.actuator} onLoadMore={() => loadMoreHistory('actuator')} onDelete={handleActuatorCalibrationDelete} />
+        case 'replay-analysis': return <ReplayAnalysis device={selectedDevice} calibrations={calibrations} replayTests={replayTests} onSave={handleReplayTestSave} onDelete={handleReplayTestDelete} hasMore={!!nextCursors.replay} onLoadMore={() => loadMoreHistory('replay')} />
         case 'data-analysis': return <DataAnalysis device={selectedDevice} calibrations={calibrations} />
         case 'stats': return <CalibrationStats calibrations={calibrations} />
         default: return null
@@ -274,11 +330,11 @@ function App() {
     if (activeTopMenu === 'camera') {
       switch (activeSubMenu) {
         case 'intrinsic': return <IntrinsicCalculation device={selectedDevice} onCalibrationComplete={handleIntrinsicCalibrationSave} />
-        case 'intrinsic-history': return <IntrinsicHistory device={selectedDevice} calibrations={intrinsicCalibrations} onDelete={handleIntrinsicCalibrationDelete} />
+        case 'intrinsic-history': return <IntrinsicHistory device={selectedDevice} calibrations={intrinsicCalibrations} hasMore={!!nextCursors.intrinsic} onLoadMore={() => loadMoreHistory('intrinsic')} onDelete={handleIntrinsicCalibrationDelete} />
         case 'extrinsic': return <ExtrinsicCalculation device={selectedDevice} intrinsicCalibrations={intrinsicCalibrations} onCalibrationComplete={handleExtrinsicCalibrationSave} />
-        case 'extrinsic-history': return <ExtrinsicHistory device={selectedDevice} calibrations={extrinsicCalibrations} onDelete={handleExtrinsicCalibrationDelete} />
+        case 'extrinsic-history': return <ExtrinsicHistory device={selectedDevice} calibrations={extrinsicCalibrations} hasMore={!!nextCursors.extrinsic} onLoadMore={() => loadMoreHistory('extrinsic')} onDelete={handleExtrinsicCalibrationDelete} />
         case 'hand-eye': return <HandEyeCalculation device={selectedDevice} intrinsicCalibrations={intrinsicCalibrations} onCalibrationComplete={handleHandEyeCalibrationSave} />
-        case 'hand-eye-history': return <HandEyeHistory device={selectedDevice} calibrations={handEyeCalibrations} onDelete={handleHandEyeCalibrationDelete} onActivate={handleHandEyeActivate} />
+        case 'hand-eye-history': return <HandEyeHistory device={selectedDevice} calibrations={handEyeCalibrations} hasMore={!!nextCursors.handeye} onLoadMore={() => loadMoreHistory('handeye')} onDelete={handleHandEyeCalibrationDelete} onActivate={handleHandEyeActivate} />
         default: return null
       }
     }
@@ -1,7 +1,8 @@
 import { useState, useEffect } from 'react'
 import ExportButton from '../common/ExportButton'
+import LoadMoreButton from '../common/LoadMoreButton'
 
-function ActuatorHistory({ device, calibrations, onDelete }) {
+function ActuatorHistory({ device, calibrations, onDelete, hasMore, onLoadMore }) {
   const [selectedCalibration, setSelectedCalibration] = useState(null)
   const [isDeleting, setIsDeleting] = useState(false)
 
@@ -195,6 +196,7 @@ function ActuatorHistory({ device, calibrations, onDelete }) {
                   {calib.notes && <p className="text-gray-400 text-xs mt-1">{calib.notes}</p>}
                 </div>
               ))}
+              <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
             </div>
           )}
         </div>
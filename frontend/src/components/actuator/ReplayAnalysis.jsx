@@ -1,12 +1,16 @@
 import { useState, useEffect } from 'react'
+import api from '../../utils/api'
+import LoadMoreButton from '../common/LoadMoreButton'
 
-function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete }) {
+function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete, hasMore, onLoadMore }) {
   const [showForm, setShowForm] = useState(false)
   const [selectedTest, setSelectedTest] = useState(null)
   const [selectedCalibrationId, setSelectedCalibrationId] = useState('')
   const [notes, setNotes] = useState('')
   const [isSaving, setIsSaving] = useState(false)
   const [isDeleting, setIsDeleting] = useState(false)
+  // 서버 집계 (/api/replay-tests/analytics): 테스트 수, 테스트별 min/avg/max, 평균 오차 분포
+  const [fetchedAnalytics, setAnalytics] = useState(null)
 
   // 품질 판정 기준 (localStorage 저장)
   const [thresholdNormal, setThresholdNormal] = useState(() => {
@@ -45,6 +49,21 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
     }
   }, [deviceTests])
 
+  // 목록이 바뀌면(저장/삭제) 집계를 다시 받는다 (변경 없으면 ETag로 304)
+  useEffect(() => {
+    if (!device) return
+    let cancelled = false
+    api.replay.analytics(device.id)
+      .then(data => { if (!cancelled) setAnalytics(data) })
+      .catch(error => console.error('Failed to load replay analytics:', error))
+    return () => { cancelled = true }
+  }, [device, replayTests])
+
+  const analytics = fetchedAnalytics?.device_id === device?.id ? fetchedAnalytics : null
+  const testCount = analytics?.tests ?? deviceTests.length
+  // by_test는 오래된 순 -> 차트는 최근 10개를 위에서부터
+  const recentTests = (analytics?.by_test || []).slice(-10).reverse()
+
   // 임계값 저장
   useEffect(() => {
     localStorage.setItem('replay_threshold_normal', thresholdNormal.toString())
@@ -160,7 +179,7 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
             <div className="flex items-center justify-between">
               <h2 className="text-xl font-bold text-white mb-2">리플레이 분석</h2>
               <span className="px-3 py-1 bg-cyan-500/20 text-cyan-400 text-sm rounded-full">
-                {deviceTests.length}개 기록
+                {testCount}개 기록
               </span>
             </div>
             <p className="text-gray-300 text-sm leading-relaxed">
@@ -344,7 +363,7 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
           <div className="bg-gray-800 rounded-xl border border-gray-700 p-4">
             <div className="flex items-center justify-between mb-3">
               <h3 className="text-white font-bold flex items-center gap-2">📋 테스트 이력</h3>
-              <span className="text-gray-500 text-sm">{deviceTests.length}개</span>
+              <span className="text-gray-500 text-sm">{testCount}개</span>
             </div>
             {deviceTests.length === 0 ? (
               <div className="text-center py-8">
@@ -392,6 +411,7 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
                     </div>
                   )
                 })}
+                <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
               </div>
             )}
           </div>
@@ -473,20 +493,20 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
               </div>
 
               {/* 오차 추이 분석 - 2개 이상이면 표시 */}
-              {deviceTests.length >= 2 && (
+              {testCount >= 2 && recentTests.length > 0 && (
                 <div className="bg-gray-800 rounded-xl border border-gray-700 p-4">
                   <div className="flex items-center justify-between mb-3">
                     <h3 className="text-white font-bold flex items-center gap-2">
                       <span className="text-lg">📈</span> 오차 추이 분석
                     </h3>
                     <div className="flex items-center gap-2">
-                      {deviceTests.length < 5 && (
+                      {testCount < 5 && (
                         <span className="text-xs px-2 py-1 bg-amber-500/20 text-amber-400 rounded-full">
                           참고용 (5개 미만)
                         </span>
                       )}
                       <span className="text-xs px-2 py-1 bg-cyan-500/20 text-cyan-400 rounded-full">
-                        {deviceTests.length}개 데이터
+                        {testCount}개 데이터
                       </span>
                     </div>
                   </div>
@@ -515,11 +535,8 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
 
                   {/* Min-평균-Max 범위 막대 그래프 - 최근이 상단 */}
                   {(() => {
-                    // 전체 범위 계산 (모든 테스트의 min/max 포함)
-                    const allMinErrors = deviceTests.map(t => Math.min(...t.positions.map(p => p.distance)))
-                    const allMaxErrors = deviceTests.map(t => t.max_error)
-                    const globalMin = 0
-                    const globalMax = Math.max(...allMaxErrors, thresholdWarning * 1.5)
+                    // 전체 범위 (서버 집계의 전체 최대 오차 기준)
+                    const globalMax = Math.max(analytics.distance?.max || 0, thresholdWarning * 1.5)
 
                     return (
                       <div className="space-y-1">
@@ -534,10 +551,10 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
                           <span className="w-20"></span>
                         </div>
 
-                        {deviceTests.slice(0, 10).map((test) => {
-                          const minError = Math.min(...test.positions.map(p => p.distance))
-                          const avgError = test.avg_error
-                          const maxError = test.max_error
+                        {recentTests.map((test) => {
+                          const minError = test.min_error ?? 0
+                          const avgError = test.avg_error ?? 0
+                          const maxError = test.max_error ?? 0
                           const quality = getQualityStatus(avgError)
                           const isSelected = selectedTest?.id === test.id
 
@@ -563,7 +580,10 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
                           return (
                             <div
                               key={test.id}
-                              onClick={() => setSelectedTest(test)}
+                              onClick={() => {
+                                const loaded = deviceTests.find(t => t.id === test.id)
+                                if (loaded) setSelectedTest(loaded)
+                              }}
                               className={`flex items-center gap-2 py-1.5 px-2 rounded-lg cursor-pointer transition ${
                                 isSelected
                                   ? 'bg-cyan-500/20 ring-1 ring-cyan-500/50'
@@ -661,19 +681,19 @@ function ReplayAnalysis({ device, calibrations, replayTests, onSave, onDelete })
                     <div>
                       <div className="text-gray-400 text-xs">전체 평균</div>
                       <div className="text-white font-mono font-bold">
-                        {(deviceTests.reduce((sum, t) => sum + t.avg_error, 0) / deviceTests.length).toFixed(2)}mm
+                        {(analytics.test_avg_error?.mean ?? 0).toFixed(2)}mm
                       </div>
                     </div>
                     <div>
                       <div className="text-gray-400 text-xs">최저 평균</div>
                       <div className="text-emerald-400 font-mono font-bold">
-                        {Math.min(...deviceTests.map(t => t.avg_error)).toFixed(2)}mm
+                        {(analytics.test_avg_error?.min ?? 0).toFixed(2)}mm
                       </div>
                     </div>
                     <div>
                       <div className="text-gray-400 text-xs">최고 평균</div>
                       <div className="text-rose-400 font-mono font-bold">
-                        {Math.max(...deviceTests.map(t => t.avg_error)).toFixed(2)}mm
+                        {(analytics.test_avg_error?.max ?? 0).toFixed(2)}mm
                       </div>
                     </div>
                   </div>
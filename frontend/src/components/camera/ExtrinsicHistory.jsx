@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
+import LoadMoreButton from '../common/LoadMoreButton'
 
-function ExtrinsicHistory({ device, calibrations, onDelete }) {
+function ExtrinsicHistory({ device, calibrations, onDelete, hasMore, onLoadMore }) {
   const [selectedCamera, setSelectedCamera] = useState('front_cam')
   const [selectedItem, setSelectedItem] = useState(null)
   const [compareMode, setCompareMode] = useState(false)
@@ -233,6 +234,7 @@ function ExtrinsicHistory({ device, calibrations, onDelete }) {
                   </div>
                 )
               })}
+              <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
             </div>
           )}
         </div>
@@ -1,6 +1,7 @@
 import { useState } from 'react'
+import LoadMoreButton from '../common/LoadMoreButton'
 
-function HandEyeHistory({ device, calibrations, setCalibrations }) {
+function HandEyeHistory({ device, calibrations, setCalibrations, hasMore, onLoadMore }) {
   const [selectedCamera, setSelectedCamera] = useState('all')
   const [selectedCalib, setSelectedCalib] = useState(null)
 
@@ -211,6 +212,7 @@ function HandEyeHistory({ device, calibrations, setCalibrations }) {
                   {calib.notes && <p className="text-gray-500 text-[10px] mt-1 truncate">{calib.notes}</p>}
                 </button>
               ))}
+              <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
             </div>
           )}
         </div>
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
+import LoadMoreButton from '../common/LoadMoreButton'
 
-function IntrinsicHistory({ device, calibrations, onDelete }) {
+function IntrinsicHistory({ device, calibrations, onDelete, hasMore, onLoadMore }) {
   const [selectedCamera, setSelectedCamera] = useState('front_cam')
   const [selectedItem, setSelectedItem] = useState(null)
   const [compareMode, setCompareMode] = useState(false)
@@ -265,6 +266,7 @@ function IntrinsicHistory({ device, calibrations, onDelete }) {
                   </div>
                 )
               })}
+              <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
             </div>
           )}
         </div>
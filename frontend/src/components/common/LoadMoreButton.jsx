@@ -0,0 +1,28 @@
+import { useState } from 'react'
+
+function LoadMoreButton({ hasMore, onLoadMore }) {
+  const [isLoading, setIsLoading] = useState(false)
+
+  if (!hasMore) return null
+
+  const handleClick = async () => {
+    setIsLoading(true)
+    try {
+      await onLoadMore()
+    } finally {
+      setIsLoading(false)
+    }
+  }
+
+  return (
+    <button
+      onClick={handleClick}
+      disabled={isLoading}
+      className="w-full py-2 text-xs text-gray-400 hover:text-white bg-gray-900 hover:bg-gray-700 border border-gray-700 rounded-lg transition disabled:opacity-50"
+    >
+      {isLoading ? '불러오는 중...' : '더 보기'}
+    </button>
+  )
+}
+
+export default LoadMoreButton
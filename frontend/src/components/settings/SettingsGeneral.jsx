@@ -1,6 +1,22 @@
 import { useState, useRef } from 'react'
 import api from '../../utils/api'
 
+// gzip NDJSON 스트림의 마지막 줄(통계)만 남기며 끝까지 읽는다
+async function readLastNdjsonLine(gzipStream) {
+  const reader = gzipStream
+    .pipeThrough(new DecompressionStream('gzip'))
+    .pipeThrough(new TextDecoderStream())
+    .getReader()
+  let tail = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    tail = (tail + value).slice(-64 * 1024)
+  }
+  const lines = tail.trim().split('\n')
+  return JSON.parse(lines[lines.length - 1])
+}
+
 function SettingsGeneral() {
   const [isBackingUp, setIsBackingUp] = useState(false)
   const [isRestoring, setIsRestoring] = useState(false)
@@ -14,20 +30,27 @@ function SettingsGeneral() {
     setMessage(null)
 
     try {
-      const backupData = await api.backup.create()
+      // 스트리밍 백업(.ndjson.gz)을 받으면서 한쪽은 파일로, 한쪽은 마지막 통계 줄 읽기에 쓴다
+      const response = await api.backup.stream('gzip')
+      const [fileStream, statsStream] = response.body.tee()
+      const [blob, stats] = await Promise.all([
+        new Response(fileStream).blob(),
+        readLastNdjsonLine(statsStream),
+      ])
+      if (stats.kind !== 'stats') {
+        throw new Error('백업 스트림이 중간에 끊겼습니다.')
+      }
 
-      // JSON 파일로 다운로드
-      const blob = new Blob([JSON.stringify(backupData, null, 2)], { type: 'application/json' })
       const url = URL.createObjectURL(blob)
       const a = document.createElement('a')
       a.href = url
-      a.download = `calzero_backup_${new Date().toISOString().split('T')[0]}.json`
+      a.download = `calzero_backup_${new Date().toISOString().split('T')[0]}.ndjson.gz`
       a.click()
       URL.revokeObjectURL(url)
 
       setLastBackup({
         date: new Date().toLocaleString('ko-KR'),
-        stats: backupData.stats
+        stats
       })
       setMessage({ type: 'success', text: '백업이 완료되었습니다.' })
     } catch (err) {
@@ -56,16 +79,18 @@ function SettingsGeneral() {
     setMessage(null)
 
     try {
-      const content = await file.text()
-      const backupData = JSON.parse(content)
-
-      // 버전 확인
-      if (!backupData.version) {
-        throw new Error('유효하지 않은 백업 파일입니다.')
+      // .ndjson / .ndjson.gz 는 스트리밍 복원, 예전 .json 백업은 서버가 같은 방식으로 검증 후 한 번에 교체
+      let result
+      if (file.name.endsWith('.json')) {
+        const backupData = JSON.parse(await file.text())
+        if (!backupData.version) {
+          throw new Error('유효하지 않은 백업 파일입니다.')
+        }
+        result = await api.backup.restore(backupData)
+      } else {
+        result = await api.backup.restoreStream(file)
       }
 
-      const result = await api.backup.restore(backupData)
-
       setMessage({
         type: 'success',
         text: `복원 완료! (장치 ${result.stats?.devices_count || 0}개, 캘리브레이션 ${result.stats?.calibrations_count || 0}개)`
@@ -150,7 +175,7 @@ function SettingsGeneral() {
           <span>💾</span> 데이터 백업 / 복원
         </h3>
         <p className="text-gray-500 text-sm mb-4">
-          장치, 캘리브레이션 데이터를 JSON 파일로 백업하거나 복원합니다.
+          장치, 캘리브레이션 데이터를 파일로 백업하거나 복원합니다. 복원 중 오류가 나면 기존 데이터는 그대로 유지됩니다.
         </p>
 
         <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
@@ -161,7 +186,7 @@ function SettingsGeneral() {
               <span className="text-white font-medium">백업 다운로드</span>
             </div>
             <p className="text-gray-500 text-xs mb-3">
-              모든 데이터를 JSON 파일로 다운로드합니다.
+              모든 데이터를 압축된 NDJSON 파일(.ndjson.gz)로 다운로드합니다.
             </p>
             <button
               onClick={handleBackup}
@@ -192,7 +217,7 @@ function SettingsGeneral() {
               type="file"
               ref={fileInputRef}
               className="hidden"
-              accept=".json"
+              accept=".gz,.ndjson,.json"
               onChange={handleFileSelect}
             />
             <button
@@ -3,26 +3,87 @@ const API_BASE = import.meta.env.PROD
   ? 'https://calzero-api.onrender.com/api'  // 배포용
   : 'http://localhost:8000/api'              // 로컬용
 
-async function fetchAPI(endpoint, options = {}) {
+// 쿼리 문자열 생성 (undefined/null/빈 값은 제외)
+function buildQuery(params = {}) {
+  const search = new URLSearchParams()
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') search.append(key, value)
+  })
+  const query = search.toString()
+  return query ? `?${query}` : ''
+}
+
+// 조건부 GET 캐시: URL(+인증) -> { etag, body, headers }
+// 서버가 304를 주면 저장해 둔 본문으로 응답을 다시 만든다
+const CONDITIONAL_CACHE_SIZE = 200
+const conditionalCache = new Map()
+
+function rememberResponse(key, etag, body, headers) {
+  conditionalCache.delete(key)
+  conditionalCache.set(key, { etag, body, headers })
+  if (conditionalCache.size > CONDITIONAL_CACHE_SIZE) {
+    conditionalCache.delete(conditionalCache.keys().next().value)
+  }
+}
+
+async function request(endpoint, options = {}) {
   const url = `${API_BASE}${endpoint}`
+  const isGet = !options.method || options.method.toUpperCase() === 'GET'
+  const cacheKey = isGet ? `${url}|${options.headers?.Authorization || ''}` : null
+  const cached = isGet ? conditionalCache.get(cacheKey) : undefined
+
   const config = {
+    ...options,
     headers: {
-      'Content-Type': 'application/json',
+      // FormData는 브라우저가 multipart boundary를 직접 설정
+      ...(options.body instanceof FormData ? {} : { 'Content-Type': 'application/json' }),
+      ...(cached ? { 'If-None-Match': cached.etag } : {}),
       ...options.headers,
     },
-    ...options,
   }
 
   const response = await fetch(url, config)
-  
+
+  if (response.status === 304 && cached) {
+    return new Response(cached.body, { status: 200, headers: cached.headers })
+  }
+
   if (!response.ok) {
     const errorData = await response.json().catch(() => ({}))
     throw new Error(errorData.detail || `HTTP ${response.status}`)
   }
 
+  const etag = response.headers.get('ETag')
+  if (isGet && etag) {
+    rememberResponse(cacheKey, etag, await response.clone().text(), new Headers(response.headers))
+  }
+
+  return response
+}
+
+async function fetchAPI(endpoint, options = {}) {
+  const response = await request(endpoint, options)
   return response.json()
 }
 
+// 필드 + 파일 목록 -> FormData (배열 값은 같은 키로 여러 번 추가)
+function buildForm(fields = {}) {
+  const form = new FormData()
+  Object.entries(fields).forEach(([key, value]) => {
+    if (value === undefined || value === null) return
+    if (Array.isArray(value)) value.forEach((item) => form.append(key, item))
+    else form.append(key, value)
+  })
+  return form
+}
+
+// 커서 페이지 조회: params = { limit, cursor, fields, ... }
+// 반환값: { items, nextCursor } (nextCursor가 null이면 마지막 페이지)
+async function fetchPage(endpoint, params = {}) {
+  const response = await request(`${endpoint}${buildQuery(params)}`)
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
+}
+
 export default {
   // Device API
   devices: {
@@ -41,7 +102,12 @@ export default {
 
   // Actuator Calibration API
   actuator: {
-    list: (deviceId) => fetchAPI(`/calibrations/actuator?device_id=${deviceId}`),
+    list: (deviceId, params = {}) => fetchAPI(`/calibrations/actuator${buildQuery({ device_id: deviceId, ...params })}`),
+    page: (deviceId, params = {}) => fetchPage('/calibrations/actuator', { device_id: deviceId, ...params }),
+    // 관절별 homing_offset / range 통계 (서버 누적 집계): { scope: fleet | type | device, device_type, device_id }
+    stats: (params = {}) => fetchAPI(`/calibrations/actuator/stats${buildQuery(params)}`),
+    // 관절별 드리프트 판정 (device_id가 없으면 전체 장치 + flagged 목록)
+    drift: (deviceId) => fetchAPI(`/calibrations/actuator/drift${buildQuery({ device_id: deviceId })}`),
     create: (data) => fetchAPI('/calibrations/actuator', {
       method: 'POST',
       body: JSON.stringify(data),
@@ -56,7 +122,8 @@ export default {
 
   // Intrinsic Calibration API
   intrinsic: {
-    list: (deviceId) => fetchAPI(`/calibrations/intrinsic?device_id=${deviceId}`),
+    list: (deviceId, params = {}) => fetchAPI(`/calibrations/intrinsic${buildQuery({ device_id: deviceId, ...params })}`),
+    page: (deviceId, params = {}) => fetchPage('/calibrations/intrinsic', { device_id: deviceId, ...params }),
     create: (data) => fetchAPI('/calibrations/intrinsic', {
       method: 'POST',
       body: JSON.stringify(data),
@@ -64,6 +131,11 @@ export default {
     delete: (id, deviceId) => fetchAPI(`/calibrations/intrinsic/${id}?device_id=${deviceId}`, { 
       method: 'DELETE' 
     }),
+    // 서버 계산: { device_id, camera, board, square_size, save, notes, images: File[] }
+    solve: (fields) => fetchAPI('/calibrations/intrinsic/solve', {
+      method: 'POST',
+      body: buildForm(fields),
+    }),
     activate: (id, deviceId) => fetchAPI(`/calibrations/intrinsic/${id}/activate?device_id=${deviceId}`, {
       method: 'PUT',
     }),
@@ -71,11 +143,17 @@ export default {
 
   // Extrinsic Calibration API
   extrinsic: {
-    list: (deviceId) => fetchAPI(`/calibrations/extrinsic?device_id=${deviceId}`),
+    list: (deviceId, params = {}) => fetchAPI(`/calibrations/extrinsic${buildQuery({ device_id: deviceId, ...params })}`),
+    page: (deviceId, params = {}) => fetchPage('/calibrations/extrinsic', { device_id: deviceId, ...params }),
     create: (data) => fetchAPI('/calibrations/extrinsic', {
       method: 'POST',
       body: JSON.stringify(data),
     }),
+    // 서버 계산 (여러 카메라): { device_id, image_cameras: string[], intrinsic_ids: JSON, board, square_size, images: File[] }
+    solve: (fields) => fetchAPI('/calibrations/extrinsic/solve', {
+      method: 'POST',
+      body: buildForm(fields),
+    }),
     delete: (id, deviceId) => fetchAPI(`/calibrations/extrinsic/${id}?device_id=${deviceId}`, { 
       method: 'DELETE' 
     }),
@@ -86,11 +164,17 @@ export default {
 
   // Hand-Eye Calibration API
   handeye: {
-    list: (deviceId) => fetchAPI(`/calibrations/handeye?device_id=${deviceId}`),
+    list: (deviceId, params = {}) => fetchAPI(`/calibrations/handeye${buildQuery({ device_id: deviceId, ...params })}`),
+    page: (deviceId, params = {}) => fetchPage('/calibrations/handeye', { device_id: deviceId, ...params }),
     create: (data) => fetchAPI('/calibrations/handeye', {
       method: 'POST',
       body: JSON.stringify(data),
     }),
+    // 서버 계산: { device_id, camera, type, robot_poses, target_poses, methods, save, is_active }
+    solve: (data) => fetchAPI('/calibrations/handeye/solve', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    }),
     delete: (id, deviceId) => fetchAPI(`/calibrations/handeye/${id}?device_id=${deviceId}`, {
       method: 'DELETE'
     }),
@@ -101,7 +185,10 @@ export default {
 
   // Replay Test API
   replay: {
-    list: (deviceId) => fetchAPI(`/replay-tests?device_id=${deviceId}`),
+    list: (deviceId, params = {}) => fetchAPI(`/replay-tests${buildQuery({ device_id: deviceId, ...params })}`),
+    page: (deviceId, params = {}) => fetchPage('/replay-tests', { device_id: deviceId, ...params }),
+    // 오차 분포 (p50/p95/p99), 축별 편향, 위치별 반복 정밀도, 캘리브레이션별 분포 / 상관
+    analytics: (deviceId) => fetchAPI(`/replay-tests/analytics${buildQuery({ device_id: deviceId })}`),
     create: (data) => fetchAPI('/replay-tests', {
       method: 'POST',
       body: JSON.stringify(data),
@@ -111,6 +198,22 @@ export default {
     }),
   },
 
+  // Dataset Analysis API (parquet 관절 범위 분석, 결과는 DataAnalysis.jsx histogramData 형식)
+  analysis: {
+    // fields: { device_id, calibration_id, bins, file: File } 또는 { ..., path: 'repo/data/chunk-000/file-000.parquet' }
+    jointRange: (fields) => fetchAPI('/analysis/joint-range', { method: 'POST', body: buildForm(fields) }),
+    // 데이터셋 디렉토리 전체 (샤드 병렬, 누적 결과는 서버에 저장): { device_id, path, calibration_id, bins, include_episodes }
+    dataset: (data) => fetchAPI('/analysis/dataset', { method: 'POST', body: JSON.stringify(data) }),
+  },
+
+  // Kinematics API (서버 정기구학)
+  kinematics: {
+    // URDF 업로드 -> { urdf_id, base, tip, joints }: { urdf: File, tip }
+    uploadUrdf: (fields) => fetchAPI('/kinematics/urdf', { method: 'POST', body: buildForm(fields) }),
+    // { urdf_id, tip, samples: number[][], units: ticks | deg | rad, device_id, calibration_id } -> { poses: [{ translation, rotation }] }
+    fk: (data) => fetchAPI('/kinematics/fk', { method: 'POST', body: JSON.stringify(data) }),
+  },
+
   // Auth API
   auth: {
     login: (email, password) => fetchAPI('/auth/login', {
@@ -129,10 +232,59 @@ export default {
   // Backup/Restore API
   backup: {
     create: () => fetchAPI('/backup'),
+    // 스트리밍 백업 (NDJSON, compress: 'gzip'이면 .ndjson.gz) -> Response (response.blob()으로 저장)
+    stream: (compress) => request(`/backup/stream${buildQuery({ compress })}`),
+    // 예전 JSON 백업(/api/backup 형식) 복원 - 서버에서 검증 후 restore_session으로 한 번에 교체
     restore: (data) => fetchAPI('/restore', {
       method: 'POST',
       body: JSON.stringify(data),
     }),
+    // 증분 백업 (since: 앞 백업의 seq, 응답 X-Backup-Seq가 다음 since) -> Response, 410이면 전체 백업 필요
+    incremental: (since, compress) => request(`/backup/incremental${buildQuery({ since, compress })}`),
+    // 스트리밍 복원 (.ndjson / .ndjson.gz 파일, 검증 실패 시 기존 데이터 유지)
+    restoreStream: (file) => fetchAPI('/restore/stream', {
+      method: 'POST',
+      body: buildForm({ file }),
+    }),
+    // 전체 백업 + 증분 백업 파일들(오래된 순)을 합쳐 복원
+    restoreChain: (base, increments = []) => fetchAPI('/restore/chain', {
+      method: 'POST',
+      body: buildForm({ base, increments }),
+    }),
     reset: () => fetchAPI('/reset', { method: 'DELETE' }),
   },
+
+  // Calibration Jobs API (오래 걸리는 계산은 작업으로 제출 후 진행률 구독)
+  jobs: {
+    intrinsic: (fields) => fetchAPI('/jobs/intrinsic', { method: 'POST', body: buildForm(fields) }),
+    extrinsic: (fields) => fetchAPI('/jobs/extrinsic', { method: 'POST', body: buildForm(fields) }),
+    handeye: (data) => fetchAPI('/jobs/handeye', { method: 'POST', body: JSON.stringify(data) }),
+    analysis: (data) => fetchAPI('/jobs/analysis', { method: 'POST', body: JSON.stringify(data) }),
+    list: (params = {}) => fetchAPI(`/jobs${buildQuery(params)}`),
+    get: (id) => fetchAPI(`/jobs/${id}`),
+    cancel: (id) => fetchAPI(`/jobs/${id}/cancel`, { method: 'POST' }),
+    // onEvent({ type: progress | succeeded | failed | cancelled, ...data }), 끝나면 자동으로 닫힌다
+    subscribe: (id, onEvent) => {
+      const source = new EventSource(`${API_BASE}/jobs/${id}/events`)
+      const types = ['progress', 'succeeded', 'failed', 'cancelled']
+      types.forEach((type) => source.addEventListener(type, (e) => {
+        onEvent({ type, ...JSON.parse(e.data) })
+        if (type !== 'progress') source.close()
+      }))
+      return () => source.close()
+    },
+  },
+
+  // Change Events (SSE)
+  // onEvent(event): event.action = create | update | delete | activate | reset | resync
+  // 연결이 끊기면 브라우저가 Last-Event-ID로 자동 재개한다. 반환값은 구독 해제 함수
+  events: {
+    subscribe: (onEvent, { deviceId, since } = {}) => {
+      const source = new EventSource(`${API_BASE}/events${buildQuery({ device_id: deviceId, since })}`)
+      const handle = (e) => onEvent({ action: e.type, ...JSON.parse(e.data) })
+      const types = ['create', 'update', 'delete', 'activate', 'reset', 'resync']
+      types.forEach((type) => source.addEventListener(type, handle))
+      return () => source.close()
+    },
+  },
 }